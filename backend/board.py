@@ -0,0 +1,115 @@
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from data.properties import PROPERTIES, HOUSE_COSTS
+
+BOARD_SIZE = 40
+
+class Square(NamedTuple):
+    """Immutable data of one board square, shared by every game"""
+    id: int
+    name: str
+    type: str
+    description: str
+    color: Optional[str] = None
+    price: Optional[int] = None
+    rent: Optional[Tuple[int, ...]] = None
+    group: Optional[str] = None
+    amount: Optional[int] = None
+    house_cost: Optional[int] = None
+    # Group counted for rent: color group, or railroad/utility
+    owner_group: Optional[str] = None
+
+def _compile_square(prop: Dict[str, Any]) -> Square:
+    if prop["type"] == "property":
+        owner_group = prop.get("group")
+    elif prop["type"] in ("railroad", "utility"):
+        owner_group = prop["type"]
+    else:
+        owner_group = None
+    rent = prop.get("rent")
+    return Square(
+        id=prop["id"],
+        name=prop["name"],
+        type=prop["type"],
+        description=prop["description"],
+        color=prop.get("color"),
+        price=prop.get("price"),
+        rent=tuple(rent) if rent else None,
+        group=prop.get("group"),
+        amount=prop.get("amount"),
+        house_cost=HOUSE_COSTS.get(prop.get("group")) if prop["type"] == "property" else None,
+        owner_group=owner_group,
+    )
+
+def _compile_board() -> Tuple[Square, ...]:
+    squares = sorted((_compile_square(prop) for prop in PROPERTIES), key=lambda s: s.id)
+    if [s.id for s in squares] != list(range(BOARD_SIZE)):
+        raise ValueError("PROPERTIES must define every square from 0 to 39 exactly once")
+    return tuple(squares)
+
+# Static board indexed by position, compiled once at import
+BOARD: Tuple[Square, ...] = _compile_board()
+
+# Ownership group -> positions of its squares
+GROUP_MEMBERS: Dict[str, Tuple[int, ...]] = {}
+for _square in BOARD:
+    if _square.owner_group:
+        GROUP_MEMBERS[_square.owner_group] = GROUP_MEMBERS.get(_square.owner_group, ()) + (_square.id,)
+del _square
+
+class BoardState:
+    """Mutable per-game square state stored as compact arrays indexed by position"""
+
+    __slots__ = ("owners", "houses", "hotel", "mortgaged")
+
+    def __init__(self):
+        self.owners: List[Optional[str]] = [None] * BOARD_SIZE
+        self.houses = bytearray(BOARD_SIZE)
+        self.hotel = bytearray(BOARD_SIZE)
+        self.mortgaged = bytearray(BOARD_SIZE)
+
+    @classmethod
+    def from_properties(cls, properties: Iterable[Any]) -> "BoardState":
+        """Build board state from Property objects or their dict form"""
+        board = cls()
+        for prop in properties:
+            if not isinstance(prop, dict):
+                prop = prop.dict()
+            position = prop["id"]
+            board.owners[position] = prop.get("owner")
+            board.houses[position] = prop.get("houses") or 0
+            board.hotel[position] = bool(prop.get("hotel"))
+            board.mortgaged[position] = bool(prop.get("mortgaged"))
+        return board
+
+    def copy(self) -> "BoardState":
+        """Copy the mutable arrays; static square data stays shared"""
+        board = BoardState.__new__(BoardState)
+        board.owners = self.owners.copy()
+        board.houses = bytearray(self.houses)
+        board.hotel = bytearray(self.hotel)
+        board.mortgaged = bytearray(self.mortgaged)
+        return board
+
+    def view(self, position: int):
+        """Build the API Property view of a square"""
+        from models import Property
+
+        square = BOARD[position]
+        return Property.model_construct(
+            id=square.id,
+            name=square.name,
+            type=square.type,
+            color=square.color,
+            price=square.price,
+            rent=list(square.rent) if square.rent else None,
+            group=square.group,
+            description=square.description,
+            owner=self.owners[position],
+            mortgaged=bool(self.mortgaged[position]),
+            houses=self.houses[position],
+            hotel=bool(self.hotel[position]),
+        )
+
+    def views(self) -> list:
+        """Build Property views for the whole board"""
+        return [self.view(position) for position in range(BOARD_SIZE)]
@@ -0,0 +1,365 @@
+"""Server-side bot players driven by expected-value tables
+
+The tables are computed once from the board data: expected landings per
+turn on every square (landing_analysis) times the rent at every build
+level. Decisions read a BotView, a plain copy of the board and the bot's
+seat, so they can run on a worker thread while the room waits, never on
+the event loop itself.
+
+    python bots.py --turns 20000 --workers 4   # bot turns per second per worker
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from board import BOARD, BOARD_SIZE, GROUP_MEMBERS
+from game_engine import JAIL_FINE, MAX_HOUSES, MonopolyGameEngine
+from game_index import COLOR_GROUPS
+from landing_analysis import landing_frequencies
+from metrics import registry
+from models import GameState, Player
+
+logger = logging.getLogger(__name__)
+
+# Rounds of opponent turns a square, developed to three houses, must pay for itself within
+BOT_BUY_PAYBACK_ROUNDS = float(os.environ.get("BOT_BUY_PAYBACK_ROUNDS", "25"))
+# Rounds of opponent turns houses must pay for themselves within
+BOT_BUILD_PAYBACK_ROUNDS = float(os.environ.get("BOT_BUILD_PAYBACK_ROUNDS", "15"))
+# Turns over which leaving jail is valued
+BOT_JAIL_HORIZON_TURNS = float(os.environ.get("BOT_JAIL_HORIZON_TURNS", "20"))
+# Cash a bot keeps on top of the largest rent it could owe
+BOT_CASH_RESERVE = int(os.environ.get("BOT_CASH_RESERVE", "1000"))
+# Seconds one decision may take before the bot falls back to passing
+BOT_DECISION_BUDGET = float(os.environ.get("BOT_DECISION_BUDGET", "0.25"))
+# Threads making bot decisions
+BOT_WORKERS = int(os.environ.get("BOT_WORKERS", "2"))
+# Seconds before each bot turn, so people can follow the game
+BOT_TURN_DELAY = float(os.environ.get("BOT_TURN_DELAY", "1.0"))
+
+GO_SALARY = 2000
+# Rent level of three houses, where color groups earn most per rupee spent
+THREE_HOUSES_LEVEL = 4
+# Rolls per turn including the extra rolls after doubles
+ROLLS_PER_TURN = 1 + 1 / 6 + 1 / 36
+MAX_BUILDS_PER_TURN = 12
+
+BOT_NAMES = ["Ashoka", "Razia", "Akbar", "Lakshmibai", "Shivaji", "Chand Bibi"]
+BOT_AVATAR = "🤖"
+
+bot_turns = registry.counter("bot_turns_total", "Turns played by server-side bots")
+decision_seconds = registry.histogram(
+    "bot_decision_seconds", "Time from asking for a bot decision to getting it", ("decision",))
+decision_timeouts = registry.counter(
+    "bot_decision_timeouts_total", "Bot decisions that ran out of time and fell back to passing", ("decision",))
+
+class EvTables:
+    """Expected landings and rent per build level for every square"""
+
+    def __init__(self):
+        landings, mean_totals = landing_frequencies()
+        # Expected landings of one token per turn
+        self.landings: Tuple[float, ...] = tuple(float(value) for value in landings)
+        # Rent per level: properties unimproved, monopoly, 1-4 houses, hotel;
+        # railroads and utilities by how many of that kind the owner has
+        levels = []
+        for square in BOARD:
+            if square.type == "property":
+                rent = square.rent
+                levels.append((rent[0], rent[0] * 2) + tuple(rent[1:6]))
+            elif square.type == "railroad":
+                levels.append(tuple(square.rent))
+            elif square.type == "utility":
+                levels.append((4 * float(mean_totals[square.id]), 10 * float(mean_totals[square.id])))
+            else:
+                levels.append(())
+        self.rents: Tuple[Tuple[float, ...], ...] = tuple(levels)
+
+    def expected_rent(self, position: int, level: int) -> float:
+        """Rent an owner expects per opponent turn from a square at a level"""
+        return self.landings[position] * self.rents[position][level]
+
+    def build_payback(self, position: int, level: int) -> float:
+        """Opponent turns for houses on a square to pay for themselves, from a rent level
+
+        Early houses add little rent on their own, so each step is judged
+        by the best payback of building on to any higher level.
+        """
+        square = BOARD[position]
+        current = self.expected_rent(position, level)
+        best = float("inf")
+        for target in range(level + 1, len(self.rents[position])):
+            gain = self.expected_rent(position, target) - current
+            if gain > 0:
+                best = min(best, (target - level) * square.house_cost / gain)
+        return best
+
+# Built once at import, shared by every bot
+EV_TABLES = EvTables()
+
+class BotView(NamedTuple):
+    """What a bot decision needs, copied out of the game"""
+    player_id: str
+    money: int
+    position: int
+    in_jail: bool
+    jail_cards: int
+    opponents: int
+    owners: Tuple[Optional[str], ...]
+    houses: bytes
+    hotel: bytes
+    mortgaged: bytes
+    houses_remaining: int
+    hotels_remaining: int
+
+    @classmethod
+    def of(cls, game: GameState, player_id: str) -> "BotView":
+        player = game._index.player(player_id)
+        board = game._board
+        return cls(player_id, player.money, player.position, player.in_jail, player.get_out_of_jail_cards,
+                   len(game.players) - 1, tuple(board.owners), bytes(board.houses), bytes(board.hotel),
+                   bytes(board.mortgaged), game.houses_remaining, game.hotels_remaining)
+
+def _owned_count(owners, owner_id: str, group: str) -> int:
+    return sum(owners[member] == owner_id for member in GROUP_MEMBERS[group])
+
+def rent_level(owners, houses, hotel, position: int, owner_id: str) -> int:
+    """Index into EV_TABLES.rents of a square's rent if owner_id owned it"""
+    square = BOARD[position]
+    if square.type != "property":
+        return _owned_count(owners, owner_id, square.owner_group) - 1
+    if hotel[position]:
+        return 6
+    if houses[position]:
+        return 1 + houses[position]
+    members = GROUP_MEMBERS[square.owner_group]
+    return 1 if all(owners[member] == owner_id for member in members) else 0
+
+def square_rent(view: BotView, position: int) -> float:
+    """Rent currently charged on an owned square"""
+    owner_id = view.owners[position]
+    if owner_id is None or view.mortgaged[position]:
+        return 0.0
+    return EV_TABLES.rents[position][rent_level(view.owners, view.houses, view.hotel, position, owner_id)]
+
+def cash_reserve(view: BotView) -> float:
+    """Cash to keep: the largest rent an opponent could charge, plus a margin"""
+    worst = max((square_rent(view, position) for position, owner_id in enumerate(view.owners)
+                 if owner_id is not None and owner_id != view.player_id), default=0.0)
+    return worst + BOT_CASH_RESERVE
+
+def roll_value(view: BotView) -> float:
+    """Expected cash from one more roll: GO salary against rent owed to opponents"""
+    value = GO_SALARY * 7 / BOARD_SIZE
+    landings = EV_TABLES.landings
+    for position, owner_id in enumerate(view.owners):
+        if owner_id is not None and owner_id != view.player_id:
+            value -= landings[position] / ROLLS_PER_TURN * square_rent(view, position)
+    return value
+
+def decide_jail(view: BotView) -> bool:
+    """Whether to leave jail this turn
+
+    In jail a bot loses the extra roll for doubles, so leaving is worth
+    the expected value of those rolls over the horizon, which turns
+    negative once the board is full of opponents' rent.
+    """
+    if not view.in_jail:
+        return False
+    value = BOT_JAIL_HORIZON_TURNS / 6 * roll_value(view)
+    if view.jail_cards:
+        return value > 0
+    return value > JAIL_FINE and view.money - JAIL_FINE >= cash_reserve(view)
+
+def decide_buy(view: BotView, position: int) -> bool:
+    """Whether to buy the unowned square the bot stands on
+
+    A purchase keeps its value as an asset, so with cash to spare a bot
+    always buys. Closer to its reserve it buys only squares that complete
+    or block a color group, or that pay back quickly once developed.
+    """
+    square = BOARD[position]
+    if not square.price or view.owners[position] is not None:
+        return False
+    reserve = cash_reserve(view)
+    if view.money - square.price < reserve:
+        return False
+    if view.money - square.price >= 3 * reserve:
+        return True
+
+    group = square.owner_group
+    members = GROUP_MEMBERS[group]
+    owners = view.owners[:position] + (view.player_id,) + view.owners[position + 1:]
+    if group in COLOR_GROUPS:
+        # Completing a group, or keeping an opponent from completing it, is worth more than the rent
+        opponents_there = {owners[member] for member in members} - {view.player_id, None}
+        if _owned_count(owners, view.player_id, group) == len(members):
+            return True
+        if len(opponents_there) == 1 and sum(owners[member] is None for member in members) == 0:
+            return True
+
+    if square.house_cost:
+        level, cost = THREE_HOUSES_LEVEL, square.price + 3 * square.house_cost
+    else:
+        level, cost = rent_level(owners, view.houses, view.hotel, position, view.player_id), square.price
+    income = EV_TABLES.expected_rent(position, level) * max(1, view.opponents)
+    return income > 0 and cost / income <= BOT_BUY_PAYBACK_ROUNDS
+
+def plan_builds(view: BotView, deadline: Optional[float] = None) -> List[Tuple[str, int]]:
+    """Houses and hotels to build this turn, best payback first
+
+    Returns ("house" | "hotel", position) steps following the engine's
+    even-building rule. Stops early once deadline (time.monotonic) passes.
+    """
+    player_id = view.player_id
+    houses, hotel = bytearray(view.houses), bytearray(view.hotel)
+    money = view.money
+    houses_left, hotels_left = view.houses_remaining, view.hotels_remaining
+    reserve = cash_reserve(view)
+    groups = [group for group in COLOR_GROUPS
+              if _owned_count(view.owners, player_id, group) == len(GROUP_MEMBERS[group])
+              and not any(view.mortgaged[member] for member in GROUP_MEMBERS[group])]
+    opponents = max(1, view.opponents)
+
+    steps = []
+    while len(steps) < MAX_BUILDS_PER_TURN:
+        if deadline is not None and time.monotonic() > deadline:
+            break
+        best = None
+        for group in groups:
+            members = GROUP_MEMBERS[group]
+            cost = BOARD[members[0]].house_cost
+            if money - cost < reserve:
+                continue
+            lowest = min(MAX_HOUSES + 1 if hotel[member] else houses[member] for member in members)
+            for position in members:
+                if hotel[position] or houses[position] != lowest:
+                    continue
+                if houses[position] == MAX_HOUSES:
+                    if not hotels_left:
+                        continue
+                    action = "hotel"
+                elif houses_left:
+                    action = "house"
+                else:
+                    continue
+                payback = EV_TABLES.build_payback(position, 1 + houses[position]) / opponents
+                if payback <= BOT_BUILD_PAYBACK_ROUNDS and (best is None or payback < best[0]):
+                    best = (payback, action, position, cost)
+        if best is None:
+            break
+
+        _, action, position, cost = best
+        money -= cost
+        if action == "hotel":
+            houses[position] = 0
+            hotel[position] = 1
+            houses_left += MAX_HOUSES
+            hotels_left -= 1
+        else:
+            houses[position] += 1
+            houses_left -= 1
+        steps.append((action, position))
+    return steps
+
+class BotPool:
+    """Runs bot decisions on worker threads, each within a time budget"""
+
+    def __init__(self, workers: int = BOT_WORKERS, budget: float = BOT_DECISION_BUDGET):
+        self.budget = budget
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bot")
+
+    def deadline(self) -> float:
+        """time.monotonic() by which a decision started now must finish"""
+        return time.monotonic() + self.budget
+
+    async def decide(self, decision: str, fn: Callable, *args, default=None):
+        """Run fn(*args) off the event loop; default when it takes longer than the budget"""
+        start = time.perf_counter()
+        future = asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        try:
+            return await asyncio.wait_for(future, self.budget)
+        except asyncio.TimeoutError:
+            decision_timeouts.inc(decision)
+            logger.warning(f"Bot {decision} decision exceeded {self.budget}s, passing")
+            return default
+        finally:
+            decision_seconds.observe(time.perf_counter() - start, decision)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+def make_bot(seat: int, color: str) -> Player:
+    """A ready bot player for an empty seat"""
+    return Player(
+        name=f"{BOT_NAMES[seat % len(BOT_NAMES)]} (bot)",
+        avatar=BOT_AVATAR,
+        color=color,
+        ready=True,
+        is_bot=True
+    )
+
+def play_turn(engine: MonopolyGameEngine, room_code: str, player_id: str):
+    """Play one bot turn directly on the engine, deciding inline
+
+    The headless counterpart of the server's bot turn, used to measure
+    decision and engine throughput without sockets or threads.
+    """
+    game = engine.games[room_code]
+    if decide_jail(BotView.of(game, player_id)):
+        engine.pay_jail_fine(room_code, player_id)
+    _, _, total = engine.roll_dice(room_code, player_id)
+    # A third double goes straight to jail without moving
+    if game.turn_phase == "move":
+        position = engine.move_player(room_code, player_id, total)
+        if decide_buy(BotView.of(game, player_id), position):
+            engine.buy_property(room_code, player_id, position)
+    for action, target in plan_builds(BotView.of(game, player_id)):
+        build = engine.build_hotel if action == "hotel" else engine.build_house
+        build(room_code, player_id, target)
+    engine.end_turn(room_code, player_id)
+
+def measure_turns(turns: int, players: int = 4, seed: int = 0) -> dict:
+    """Play bot-only games until `turns` turns are done; report turns per second"""
+    engine = MonopolyGameEngine(rng=random.Random(seed))
+    done = games = 0
+    start = time.perf_counter()
+    while done < turns:
+        room_code = f"BOTS{seed}-{games}"
+        roster = [make_bot(seat, "") for seat in range(players)]
+        game = engine.create_game(room_code, roster, seed=seed * 100003 + games)
+        games += 1
+        # A bot turn never charges rent, so games do not end by themselves; cap their length
+        for _ in range(min(turns - done, 500)):
+            play_turn(engine, room_code, game.players[game.current_player].id)
+            done += 1
+        engine.remove_game(room_code)
+    elapsed = time.perf_counter() - start
+    return {"turns": done, "games": games, "seconds": elapsed, "turns_per_second": done / elapsed if elapsed else 0.0}
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure bot turns per second per worker")
+    parser.add_argument("--turns", type=int, default=20000, help="turns per worker")
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        results = list(executor.map(measure_turns, [args.turns] * args.workers, [args.players] * args.workers,
+                                    range(args.workers)))
+    per_worker = [result["turns_per_second"] for result in results]
+    print(json.dumps({
+        "workers": args.workers,
+        "turns": sum(result["turns"] for result in results),
+        "turns_per_second_per_worker": per_worker,
+        "mean_turns_per_second_per_worker": sum(per_worker) / len(per_worker),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Chance and community chest cards compiled to effect functions
+
+Every card is turned into a single closure when the module loads, chosen
+from CARD_COMPILERS by card type and specialised on the card's fields, so
+drawing a card costs one dict lookup and one call instead of re-reading
+the card model:
+
+    collect/pay      amount, paid by or to every other player when from_all
+    collectFromAll   amount from every other player
+    move             absolute position, relative spaces, or the nearest
+                     square of a target type; collect_go pays GO on the way
+                     and pay_double doubles the rent owed at a target
+    repairs          house and hotel cost per building owned
+    goToJail, jailFree
+"""
+from typing import TYPE_CHECKING, Callable, Dict, List, Union
+
+from board import BOARD, BOARD_SIZE
+from data.properties import CHANCE_CARDS, COMMUNITY_CHEST_CARDS
+from models import Card, GameState, Player
+
+if TYPE_CHECKING:
+    from game_engine import MonopolyGameEngine
+
+GO_SALARY = 2000
+
+CardEffect = Callable[["MonopolyGameEngine", GameState, Player], None]
+
+def _pass_go(game: GameState, player: Player):
+    player.money += GO_SALARY
+    game._log.add("passed_go", player.id, GO_SALARY, name=player.name)
+
+def _transfer(engine: "MonopolyGameEngine", game: GameState, payer: Player, payee: Player, amount: int):
+    """Pay another player, going bankrupt to them if the payer cannot cover it"""
+    if payer.money >= amount:
+        payer.money -= amount
+        payee.money += amount
+        game._changes.mark_player(payer.id, payee.id)
+        game._log.add("paid_player", payer.id, amount, name=payer.name, target=payee.id, target_name=payee.name)
+    else:
+        engine.handle_bankruptcy(game, payer, payee)
+
+def _charge(engine: "MonopolyGameEngine", game: GameState, player: Player, amount: int, log_type: str,
+            **data):
+    """Pay the bank, going bankrupt to it if the player cannot cover it"""
+    if player.money < amount:
+        engine.handle_bankruptcy(game, player, None)
+        return
+    player.money -= amount
+    game._changes.mark_player(player.id)
+    game._log.add(log_type, player.id, amount, name=player.name, **data)
+
+def _compile_bank(card: Card, sign: int) -> CardEffect:
+    amount = card.amount or 0
+
+    if sign < 0:
+        def effect(engine, game, player):
+            _charge(engine, game, player, amount, "paid")
+
+        return effect
+
+    def effect(engine, game, player):
+        player.money += amount
+        game._changes.mark_player(player.id)
+        game._log.add("collected", player.id, amount, name=player.name)
+
+    return effect
+
+def _compile_collect_from_all(card: Card) -> CardEffect:
+    amount = card.amount or 0
+
+    def effect(engine, game, player):
+        for other in list(game.players):
+            if other is not player and not game.game_ended:
+                _transfer(engine, game, other, player, amount)
+
+    return effect
+
+def _compile_pay_all(card: Card) -> CardEffect:
+    amount = card.amount or 0
+
+    def effect(engine, game, player):
+        for other in list(game.players):
+            if other is not player and game._index.player(player.id) and not game.game_ended:
+                _transfer(engine, game, player, other, amount)
+
+    return effect
+
+def _compile_collect(card: Card) -> CardEffect:
+    return _compile_collect_from_all(card) if card.from_all else _compile_bank(card, 1)
+
+def _compile_pay(card: Card) -> CardEffect:
+    return _compile_pay_all(card) if card.from_all else _compile_bank(card, -1)
+
+def nearest_squares(target: str) -> List[int]:
+    """For each position, the next square ahead whose type or group is target"""
+    matches = [square.id for square in BOARD if target in (square.type, square.group)]
+    if not matches:
+        raise ValueError(f"No board square matches card target '{target}'")
+    return [
+        min(matches, key=lambda square_id: (square_id - position - 1) % BOARD_SIZE)
+        for position in range(BOARD_SIZE)
+    ]
+
+def _compile_move(card: Card) -> CardEffect:
+    collect_go = bool(card.collect_go)
+
+    if card.target is not None:
+        destinations = nearest_squares(card.target)
+        multiplier = 2 if card.pay_double else 1
+
+        def effect(engine, game, player):
+            old_position = player.position
+            destination = destinations[old_position]
+            if collect_go and destination <= old_position:
+                _pass_go(game, player)
+            player.position = destination
+            game._changes.mark_player(player.id)
+            game._log.add("moved_to", player.id, name=player.name, to_position=destination)
+
+            # Rent at the target is part of the card
+            owner = game._index.player(game._board.owners[destination])
+            if owner and owner is not player:
+                _transfer(engine, game, player, owner, engine.square_rent(game, destination) * multiplier)
+
+        return effect
+
+    if card.spaces is not None:
+        spaces = card.spaces
+
+        def effect(engine, game, player):
+            old_position = player.position
+            destination = (old_position + spaces) % BOARD_SIZE
+            if collect_go and spaces > 0 and destination < old_position:
+                _pass_go(game, player)
+            player.position = destination
+            game._changes.mark_player(player.id)
+            game._log.add("moved", player.id, name=player.name, from_position=old_position, to_position=destination)
+
+        return effect
+
+    if card.position is not None:
+        destination = card.position
+
+        def effect(engine, game, player):
+            if collect_go and destination < player.position:
+                _pass_go(game, player)
+            player.position = destination
+            game._changes.mark_player(player.id)
+            game._log.add("moved_to", player.id, name=player.name, to_position=destination)
+
+        return effect
+
+    raise ValueError(f"Move card {card.id} has no position, spaces or target")
+
+def _compile_repairs(card: Card) -> CardEffect:
+    house_cost = card.house or 0
+    hotel_cost = card.hotel or 0
+
+    def effect(engine, game, player):
+        board = game._board
+        owned = game._index.owned_by(player.id)
+        hotels = sum(1 for position in owned if board.hotel[position])
+        houses = sum(board.houses[position] for position in owned if not board.hotel[position])
+        amount = houses * house_cost + hotels * hotel_cost
+        _charge(engine, game, player, amount, "repairs", houses=houses, hotels=hotels)
+
+    return effect
+
+def _compile_go_to_jail(card: Card) -> CardEffect:
+    def effect(engine, game, player):
+        engine._send_to_jail(game, player)
+
+    return effect
+
+def _compile_jail_free(card: Card) -> CardEffect:
+    def effect(engine, game, player):
+        player.get_out_of_jail_cards += 1
+        game._changes.mark_player(player.id)
+        game._log.add("jail_free_card", player.id, name=player.name)
+
+    return effect
+
+# Card type -> function building that card's effect
+CARD_COMPILERS: Dict[str, Callable[[Card], CardEffect]] = {
+    "collect": _compile_collect,
+    "collectFromAll": _compile_collect_from_all,
+    "pay": _compile_pay,
+    "move": _compile_move,
+    "repairs": _compile_repairs,
+    "goToJail": _compile_go_to_jail,
+    "jailFree": _compile_jail_free,
+}
+
+def compile_card(card: Union[Card, dict]) -> CardEffect:
+    """Build the effect function of a card"""
+    if isinstance(card, dict):
+        card = Card(**card)
+    compiler = CARD_COMPILERS.get(card.type)
+    if compiler is None:
+        raise ValueError(f"Unknown card type '{card.type}' on card {card.id}")
+    return compiler(card)
+
+def compile_deck(cards: List[Union[Card, dict]]) -> Dict[int, CardEffect]:
+    """Compile a deck into a card id -> effect table"""
+    table = {}
+    for card in cards:
+        card_id = card["id"] if isinstance(card, dict) else card.id
+        table[card_id] = compile_card(card)
+    return table
+
+CHANCE_EFFECTS = compile_deck(CHANCE_CARDS)
+COMMUNITY_CHEST_EFFECTS = compile_deck(COMMUNITY_CHEST_CARDS)
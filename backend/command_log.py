@@ -0,0 +1,83 @@
+import functools
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from metrics import command_errors, command_seconds
+
+class CommandEvent(NamedTuple):
+    """An accepted engine command"""
+    command: str
+    # GameState.version when the command was applied
+    version: int
+    args: Tuple[Any, ...]
+
+class CommandLog:
+    """Everything needed to rebuild a game: seed, starting players and accepted commands"""
+
+    __slots__ = ("seed", "players", "events", "replaying")
+
+    def __init__(self, seed: int = 0, players: Optional[List[dict]] = None):
+        self.seed = seed
+        self.players: List[dict] = players or []
+        self.events: List[CommandEvent] = []
+        # Set while commands are re-applied, so replay does not record them again
+        self.replaying = False
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def record(self, command: str, version: int, args: Tuple[Any, ...]):
+        if not self.replaying:
+            self.events.append(CommandEvent(command, version, args))
+
+    def fork(self) -> "CommandLog":
+        """Log that goes on from this one; only the list of events is copied, never the events"""
+        log = CommandLog(self.seed, self.players)
+        log.events = self.events.copy()
+        return log
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "seed": self.seed,
+            "players": self.players,
+            "events": [[event.command, event.version, list(event.args)] for event in self.events],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CommandLog":
+        log = cls(data["seed"], data["players"])
+        log.events = [CommandEvent(command, version, tuple(args)) for command, version, args in data["events"]]
+        return log
+
+def command(method):
+    """Record a successful engine call on the game's command log
+
+    Only the outermost call is recorded: engine methods must use internal
+    helpers rather than other decorated methods, or replay would apply the
+    nested effect twice. Each call is timed into engine_command_seconds and
+    invalidates the game's cached snapshot.
+    """
+    name = method.__name__
+    # Resolved once, so timing a call is two clock reads and one observe
+    seconds = command_seconds.child(name)
+    perf_counter = time.perf_counter
+
+    @functools.wraps(method)
+    def wrapper(self, room_code: str, *args):
+        start = perf_counter()
+        try:
+            result = method(self, room_code, *args)
+        except Exception:
+            command_errors.inc(name)
+            raise
+        finally:
+            seconds.observe(perf_counter() - start)
+            # Even a failed command may have changed something before raising
+            game = self.games.get(room_code)
+            if game is not None:
+                game.touch()
+        if game is not None:
+            game._commands.record(name, game.version, args)
+        return result
+
+    return wrapper
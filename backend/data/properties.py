@@ -52,6 +52,18 @@ PROPERTIES = [
     {"id": 39, "name": "JAMMU & KASHMIR", "type": "property", "color": "darkblue", "price": 4000, "rent": [500, 2000, 6000, 14000, 17000, 20000], "group": "darkblue", "description": "Paradise on Earth"}
 ]
 
+# Cost of one house (a hotel costs one more house) per color group
+HOUSE_COSTS = {
+    "brown": 500,
+    "lightblue": 500,
+    "pink": 1000,
+    "orange": 1000,
+    "red": 1500,
+    "yellow": 1500,
+    "green": 2000,
+    "darkblue": 2000
+}
+
 CHANCE_CARDS = [
     {"id": 1, "title": "Advance to GO", "description": "Collect ₹2000 as you pass GO", "type": "move", "position": 0, "collect_go": True},
     {"id": 2, "title": "Bank Error in Your Favor", "description": "Collect ₹2000", "type": "collect", "amount": 2000},
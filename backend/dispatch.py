@@ -0,0 +1,199 @@
+"""Websocket message dispatch table, payload validation and flood control
+
+Handlers register per message type with the schema of their payload, the
+rate-limit bucket they draw from and whether queued duplicates coalesce.
+The connection's own worker checks every frame against this table before
+it reaches a room queue, so malformed or excessive input never costs the
+room owner anything.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Multiplies every rate limit; 0 disables limiting (e.g. for load tests)
+RATE_LIMIT_SCALE = float(os.environ.get("WS_RATE_LIMIT_SCALE", "1"))
+# Messages a connection may have waiting behind the one being handled
+INBOX_MAX_PENDING = int(os.environ.get("WS_INBOX_MAX_PENDING", "32"))
+# Seconds between rate-limit error replies to one connection
+REJECT_REPORT_INTERVAL = 1.0
+
+# Bucket -> (tokens per second, burst); every message also draws from "connection"
+RATE_LIMITS: Dict[str, Tuple[float, float]] = {
+    "connection": (30, 60),
+    "lobby": (1, 5),
+    "room": (5, 10),
+    "game": (10, 20),
+    "chat": (2, 5),
+}
+
+Handler = Callable[[str, str, dict], Awaitable[None]]
+
+rejected_messages = registry.counter(
+    "ws_rejected_messages_total", "Inbound messages dropped before dispatch", ("type", "reason"))
+coalesced_messages = registry.counter(
+    "ws_coalesced_messages_total", "Queued inbound messages replaced by a newer one", ("type",))
+
+class RejectedMessage(ValueError):
+    """An inbound message that is not dispatched"""
+
+    def __init__(self, message: str, reason: str):
+        super().__init__(message)
+        self.reason = reason
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic() if now is None else now
+
+    def take(self, now: float) -> bool:
+        """Spend one token if available, refilling for the time elapsed"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+class ConnectionLimits:
+    """Token buckets of one connection, created on first use"""
+
+    def __init__(self, scale: float = RATE_LIMIT_SCALE):
+        self.scale = scale
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.last_reported = 0.0
+
+    def allow(self, bucket: str, now: float) -> bool:
+        if self.scale <= 0:
+            return True
+        for name in ("connection", bucket):
+            token_bucket = self.buckets.get(name)
+            if token_bucket is None:
+                rate, burst = RATE_LIMITS[name]
+                # Created at the caller's clock reading, so the first burst is not cut short
+                token_bucket = self.buckets[name] = TokenBucket(rate * self.scale, burst * self.scale, now)
+            if not token_bucket.take(now):
+                return False
+        return True
+
+    def should_report(self, now: float) -> bool:
+        """Whether to tell the client about a rejection, at most once per interval"""
+        if now - self.last_reported >= REJECT_REPORT_INTERVAL:
+            self.last_reported = now
+            return True
+        return False
+
+class MessageSpec:
+    __slots__ = ("message_type", "handler", "schema", "bucket", "coalesce")
+
+    def __init__(self, message_type: str, handler: Handler, schema: Optional[Type[BaseModel]],
+                 bucket: str, coalesce: bool):
+        self.message_type = message_type
+        self.handler = handler
+        self.schema = schema
+        self.bucket = bucket
+        self.coalesce = coalesce
+
+class Dispatcher:
+    """Message type -> handler table"""
+
+    def __init__(self):
+        self.specs: Dict[str, MessageSpec] = {}
+
+    def handles(self, message_type: str, schema: Optional[Type[BaseModel]] = None,
+                bucket: str = "game", coalesce: bool = False):
+        """Register a handler(room_code, player_id, message) for a message type
+
+        coalesce lets a newer message replace an identical-type one still
+        queued right before it, for messages where only the latest matters.
+        """
+        if bucket not in RATE_LIMITS:
+            raise ValueError(f"Unknown rate limit bucket '{bucket}'")
+
+        def register(handler: Handler) -> Handler:
+            self.specs[message_type] = MessageSpec(message_type, handler, schema, bucket, coalesce)
+            return handler
+
+        return register
+
+    def accept(self, message: dict, limits: ConnectionLimits) -> Tuple[MessageSpec, dict]:
+        """Check a message against the table and the connection's limits
+
+        Returns the spec and the normalized message, or raises RejectedMessage.
+        """
+        message_type = message.get("type") if isinstance(message, dict) else None
+        spec = self.specs.get(message_type)
+        if spec is None:
+            # Still charged to the connection, so floods of junk are limited too
+            limits.allow("connection", time.monotonic())
+            raise RejectedMessage(f"Unknown message type '{message_type}'", "unknown")
+        if not limits.allow(spec.bucket, time.monotonic()):
+            raise RejectedMessage(f"Too many {message_type} messages, slow down", "rate_limited")
+        if spec.schema is None:
+            return spec, {"type": message_type}
+
+        try:
+            payload = spec.schema.model_validate(message).model_dump()
+        except ValidationError as e:
+            problems = "; ".join(
+                f"{'.'.join(str(part) for part in error['loc']) or 'message'}: {error['msg']}"
+                for error in e.errors()
+            )
+            raise RejectedMessage(f"Invalid {message_type}: {problems}", "invalid")
+        payload["type"] = message_type
+        return spec, payload
+
+class Inbox:
+    """Accepted messages of one connection, handled in order by one task
+
+    Frames keep being read while earlier messages run, so a coalescing
+    message can replace a same-type one still waiting at the tail of the
+    queue, and a backlog is bounded instead of piling up on the room.
+    """
+
+    def __init__(self, run: Callable[[dict], Awaitable[None]], max_pending: int = INBOX_MAX_PENDING):
+        self.run = run
+        self.max_pending = max_pending
+        self.pending: Deque[Tuple[MessageSpec, dict]] = deque()
+        self._task: Optional[asyncio.Task] = None
+
+    def put(self, spec: MessageSpec, message: dict):
+        """Queue a message, raising RejectedMessage when the backlog is full"""
+        if spec.coalesce and self.pending and self.pending[-1][0] is spec:
+            self.pending[-1] = (spec, message)
+            coalesced_messages.inc(spec.message_type)
+            return
+        if len(self.pending) >= self.max_pending:
+            raise RejectedMessage("Too many pending messages, slow down", "backlog")
+
+        self.pending.append((spec, message))
+        if self._task is None:
+            self._task = asyncio.create_task(self._drain())
+
+    async def _drain(self):
+        try:
+            while self.pending:
+                _, message = self.pending.popleft()
+                try:
+                    await self.run(message)
+                except Exception as e:
+                    logger.error(f"Error running {message.get('type')}: {e}")
+        finally:
+            self._task = None
+
+    async def close(self):
+        """Wait for queued messages to finish"""
+        if self._task is not None:
+            await asyncio.shield(self._task)
@@ -2,37 +2,60 @@ import random
 import asyncio
 from typing import List, Dict, Optional, Tuple
 from models import GameState, Player, Property, Card, TradeOffer
-from data.properties import PROPERTIES, CHANCE_CARDS, COMMUNITY_CHEST_CARDS
+from data.properties import CHANCE_CARDS, COMMUNITY_CHEST_CARDS
+from board import BOARD, BOARD_SIZE, GROUP_MEMBERS
+from state_delta import build_patch
+from command_log import CommandLog, command
+from card_effects import CHANCE_EFFECTS, COMMUNITY_CHEST_EFFECTS, CardEffect, compile_card
+from trades import TradeBook, MAX_PENDING_PER_PLAYER
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Paid to leave jail when no Get Out of Jail Free card is held
+JAIL_FINE = 500
+# Houses a square holds before the next step is a hotel
+MAX_HOUSES = 4
+# Interest on top of the mortgage value to lift a mortgage, in percent
+MORTGAGE_INTEREST = 10
+
 class MonopolyGameEngine:
-    def __init__(self):
+    def __init__(self, rng: Optional[random.Random] = None):
         self.games: Dict[str, GameState] = {}
-        self.trades: Dict[str, TradeOffer] = {}
+        # Open trade offers of every game, indexed by sender and recipient
+        self.trades = TradeBook()
+        # Source of per-game seeds; seed it for reproducible games
+        self.rng = rng or random.Random()
 
-    def create_game(self, room_code: str, players: List[Player]) -> GameState:
+    def create_game(self, room_code: str, players: List[Player], seed: Optional[int] = None) -> GameState:
         """Create a new game state"""
-        # Initialize properties
-        properties = [Property(**prop) for prop in PROPERTIES]
+        # Each game owns an RNG so it can be replayed from its seed and commands
+        if seed is None:
+            seed = self.rng.getrandbits(63)
+        game_rng = random.Random(seed)
+        commands = CommandLog(seed, [p.dict() for p in players])
+        
+        # Board squares start unowned; static square data is shared via board.BOARD
         
         # Initialize cards
         chance_cards = [Card(**card) for card in CHANCE_CARDS]
         community_chest_cards = [Card(**card) for card in COMMUNITY_CHEST_CARDS]
         
         # Shuffle cards
-        random.shuffle(chance_cards)
-        random.shuffle(community_chest_cards)
+        game_rng.shuffle(chance_cards)
+        game_rng.shuffle(community_chest_cards)
         
         game_state = GameState(
             room_code=room_code,
             players=players,
-            properties=properties,
             chance_cards=chance_cards,
-            community_chest_cards=community_chest_cards,
-            game_log=[f"Game started with {len(players)} players"]
+            community_chest_cards=community_chest_cards
         )
+        game_state._rng = game_rng
+        game_state._commands = commands
+        game_state._log.add("game_started", count=len(players))
+        # The initial snapshot already carries the opening log entry
+        game_state._changes.reset(game_state._log.next_seq)
         
         self.games[room_code] = game_state
         return game_state
@@ -41,6 +64,39 @@ class MonopolyGameEngine:
         """Get game state for a room"""
         return self.games.get(room_code)
 
+    def remove_game(self, room_code: str) -> Optional[GameState]:
+        """Drop a game, or a fork, and any trade offers made in it"""
+        game = self.games.pop(room_code, None)
+        if game:
+            for player in game.players:
+                self.trades.remove_player(player.id, room_code)
+        return game
+
+    def fork_game(self, room_code: str, fork_code: str) -> GameState:
+        """Register a copy-on-write fork of a game under fork_code
+
+        Commands called with fork_code apply to the fork and never touch
+        the original game, so a move can be tried out and thrown away with
+        remove_game(fork_code). See GameState.fork for what is shared.
+        """
+        game = self.games.get(room_code)
+        if not game:
+            raise ValueError("Game not found")
+        if fork_code in self.games:
+            raise ValueError("Game already exists")
+        
+        fork = game.fork(fork_code)
+        self.games[fork_code] = fork
+        return fork
+
+    def collect_patch(self, room_code: str) -> Optional[dict]:
+        """Publish pending changes of a game as a versioned patch"""
+        game = self.games.get(room_code)
+        if not game:
+            return None
+        return build_patch(game, game._changes)
+
+    @command
     def roll_dice(self, room_code: str, player_id: str) -> Tuple[int, int, int]:
         """Roll dice for a player"""
         game = self.games.get(room_code)
@@ -54,220 +110,250 @@ class MonopolyGameEngine:
         if game.turn_phase != "roll":
             raise ValueError("Cannot roll dice in current phase")
         
-        dice1 = random.randint(1, 6)
-        dice2 = random.randint(1, 6)
+        dice1 = game._rng.randint(1, 6)
+        dice2 = game._rng.randint(1, 6)
         total = dice1 + dice2
         
         game.dice_values = [dice1, dice2]
         game.turn_phase = "move"
+        game._changes.mark_fields("dice_values", "turn_phase")
+        game._changes.mark_player(current_player.id)
         
         # Handle doubles
-        doubles_count = getattr(current_player, 'doubles_count', 0)
+        doubles_count = current_player.doubles_count
         if dice1 == dice2:
             doubles_count += 1
             current_player.doubles_count = doubles_count
             
             # Three doubles in a row = go to jail
             if doubles_count >= 3:
-                self.send_to_jail(room_code, player_id)
+                self._send_to_jail(game, current_player)
                 game.turn_phase = "endTurn"
                 current_player.doubles_count = 0
         else:
             current_player.doubles_count = 0
         
-        game.game_log.append(f"{current_player.name} rolled {dice1}+{dice2}={total}")
+        game._log.add("rolled", current_player.id, total, name=current_player.name, dice1=dice1, dice2=dice2)
         return dice1, dice2, total
 
+    @command
     def move_player(self, room_code: str, player_id: str, spaces: int) -> int:
         """Move a player on the board"""
         game = self.games.get(room_code)
         if not game:
             raise ValueError("Game not found")
         
-        player = next((p for p in game.players if p.id == player_id), None)
+        player = game._index.player(player_id)
         if not player:
             raise ValueError("Player not found")
         
         old_position = player.position
-        new_position = (old_position + spaces) % 40
+        new_position = (old_position + spaces) % BOARD_SIZE
         
         # Check if player passed GO
         if new_position < old_position or (old_position == 0 and spaces > 0):
             player.money += 2000
-            game.game_log.append(f"{player.name} passed GO and collected ₹2000")
+            game._log.add("passed_go", player.id, 2000, name=player.name)
         
         player.position = new_position
         game.turn_phase = "action"
+        game._changes.mark_player(player.id)
+        game._changes.mark_fields("turn_phase")
         
-        game.game_log.append(f"{player.name} moved from {old_position} to {new_position}")
+        game._log.add("moved", player.id, name=player.name, from_position=old_position, to_position=new_position)
         return new_position
 
+    @command
     def buy_property(self, room_code: str, player_id: str, property_id: int) -> bool:
         """Buy a property"""
         game = self.games.get(room_code)
         if not game:
             raise ValueError("Game not found")
         
-        player = next((p for p in game.players if p.id == player_id), None)
+        player = game._index.player(player_id)
         if not player:
             raise ValueError("Player not found")
         
-        property_obj = next((p for p in game.properties if p.id == property_id), None)
-        if not property_obj:
+        if not isinstance(property_id, int) or not 0 <= property_id < BOARD_SIZE:
             raise ValueError("Property not found")
+        square = BOARD[property_id]
         
-        if property_obj.owner:
+        if game._board.owners[property_id]:
             raise ValueError("Property already owned")
         
-        if not property_obj.price:
+        if not square.price:
             raise ValueError("Property not for sale")
         
-        if player.money < property_obj.price:
+        if player.money < square.price:
             raise ValueError("Insufficient funds")
         
         # Complete purchase
-        player.money -= property_obj.price
+        player.money -= square.price
         player.properties.append(property_id)
-        property_obj.owner = player_id
+        game._index.set_owner(game._board, property_id, player_id)
+        game._changes.mark_player(player.id)
+        game._changes.mark_property(property_id)
         
-        game.game_log.append(f"{player.name} bought {property_obj.name} for ₹{property_obj.price}")
+        game._log.add("bought", player.id, square.price, name=player.name, property=square.name, property_id=property_id)
         return True
 
+    @command
     def pay_rent(self, room_code: str, player_id: str, property_id: int) -> int:
         """Pay rent for landing on a property"""
         game = self.games.get(room_code)
         if not game:
             raise ValueError("Game not found")
         
-        player = next((p for p in game.players if p.id == player_id), None)
-        property_obj = next((p for p in game.properties if p.id == property_id), None)
+        player = game._index.player(player_id)
+        owner_id = game._board.owners[property_id] if 0 <= property_id < BOARD_SIZE else None
         
-        if not player or not property_obj or not property_obj.owner:
+        if not player or not owner_id:
             return 0
         
-        owner = next((p for p in game.players if p.id == property_obj.owner), None)
+        owner = game._index.player(owner_id)
         if not owner or owner.id == player_id:
             return 0
         
         # Calculate rent
-        rent = self.calculate_rent(property_obj, game)
+        rent = self.square_rent(game, property_id)
         
         if player.money >= rent:
             player.money -= rent
             owner.money += rent
-            game.game_log.append(f"{player.name} paid ₹{rent} rent to {owner.name}")
+            game._changes.mark_player(player.id, owner.id)
+            game._log.add("paid_rent", player.id, rent, name=player.name, target=owner.id, target_name=owner.name)
         else:
             # Player is bankrupt
             self.handle_bankruptcy(game, player, owner)
         
         return rent
 
+    @command
+    def pay_tax(self, room_code: str, player_id: str, position: int) -> int:
+        """Pay the tax of a tax square to the bank"""
+        game = self.games.get(room_code)
+        if not game:
+            raise ValueError("Game not found")
+        
+        player = game._index.player(player_id)
+        square = BOARD[position]
+        if not player or square.type != "tax":
+            return 0
+        
+        amount = square.amount or 0
+        if player.money >= amount:
+            player.money -= amount
+            game._changes.mark_player(player.id)
+            game._log.add("paid_tax", player.id, amount, name=player.name, property=square.name.lower())
+        else:
+            # Player is bankrupt to the bank
+            self.handle_bankruptcy(game, player, None)
+        
+        return amount
+
     def calculate_rent(self, property_obj: Property, game: GameState) -> int:
         """Calculate rent for a property"""
-        if property_obj.mortgaged:
+        return self.square_rent(game, property_obj.id)
+
+    def square_rent(self, game: GameState, position: int) -> int:
+        """Calculate rent for the square at a board position"""
+        board = game._board
+        if board.mortgaged[position]:
             return 0
         
-        if property_obj.type == "railroad":
+        square = BOARD[position]
+        owner_id = board.owners[position]
+        
+        if square.type == "railroad":
             # Count railroads owned by same player
-            railroads_owned = sum(1 for p in game.properties 
-                                if p.type == "railroad" and p.owner == property_obj.owner)
-            return property_obj.rent[railroads_owned - 1] if property_obj.rent else 0
+            railroads_owned = game._index.group_count(owner_id, "railroad")
+            return square.rent[railroads_owned - 1] if square.rent and railroads_owned else 0
         
-        elif property_obj.type == "utility":
+        elif square.type == "utility":
             # Utility rent based on dice roll
-            utilities_owned = sum(1 for p in game.properties 
-                                if p.type == "utility" and p.owner == property_obj.owner)
+            utilities_owned = game._index.group_count(owner_id, "utility")
             multiplier = 10 if utilities_owned == 2 else 4
             return sum(game.dice_values) * multiplier
         
-        elif property_obj.type == "property" and property_obj.rent:
-            if property_obj.hotel:
-                return property_obj.rent[5]  # Hotel rent
-            elif property_obj.houses > 0:
-                return property_obj.rent[property_obj.houses]  # House rent
+        elif square.type == "property" and square.rent:
+            if board.hotel[position]:
+                return square.rent[5]  # Hotel rent
+            elif board.houses[position] > 0:
+                return square.rent[board.houses[position]]  # House rent
             else:
                 # Check if player owns all properties in group
-                group_properties = [p for p in game.properties 
-                                  if p.group == property_obj.group and p.type == "property"]
-                owns_all = all(p.owner == property_obj.owner for p in group_properties)
-                base_rent = property_obj.rent[0]
+                owns_all = game._index.owns_group(owner_id, square.group)
+                base_rent = square.rent[0]
                 return base_rent * 2 if owns_all else base_rent
         
         return 0
 
+    @command
     def draw_chance_card(self, room_code: str, player_id: str) -> Card:
         """Draw a chance card"""
         game = self.games.get(room_code)
         if not game or not game.chance_cards:
             raise ValueError("No chance cards available")
         
-        card = game.chance_cards.pop(0)
-        game.chance_cards.append(card)  # Put it back at the end
+        # The deck never changes order; the index walks round it
+        card = game.chance_cards[game.chance_index]
+        game.chance_index = (game.chance_index + 1) % len(game.chance_cards)
+        game._changes.mark_fields("chance_index")
         
         # Execute card effect
-        self.execute_card_effect(game, player_id, card)
+        self.execute_card_effect(game, player_id, card, CHANCE_EFFECTS.get(card.id))
         
         return card
 
+    @command
     def draw_community_chest_card(self, room_code: str, player_id: str) -> Card:
         """Draw a community chest card"""
         game = self.games.get(room_code)
         if not game or not game.community_chest_cards:
             raise ValueError("No community chest cards available")
         
-        card = game.community_chest_cards.pop(0)
-        game.community_chest_cards.append(card)  # Put it back at the end
+        card = game.community_chest_cards[game.community_chest_index]
+        game.community_chest_index = (game.community_chest_index + 1) % len(game.community_chest_cards)
+        game._changes.mark_fields("community_chest_index")
         
         # Execute card effect
-        self.execute_card_effect(game, player_id, card)
+        self.execute_card_effect(game, player_id, card, COMMUNITY_CHEST_EFFECTS.get(card.id))
         
         return card
 
-    def execute_card_effect(self, game: GameState, player_id: str, card: Card):
-        """Execute the effect of a drawn card"""
-        player = next((p for p in game.players if p.id == player_id), None)
+    def execute_card_effect(self, game: GameState, player_id: str, card: Card, effect: Optional[CardEffect] = None):
+        """Execute the effect of a drawn card
+
+        Deck draws pass the card's precompiled effect; other cards are compiled here.
+        """
+        player = game._index.player(player_id)
         if not player:
             return
         
-        if card.type == "collect":
-            player.money += card.amount or 0
-            game.game_log.append(f"{player.name} collected ₹{card.amount}")
-        
-        elif card.type == "pay":
-            player.money -= card.amount or 0
-            game.game_log.append(f"{player.name} paid ₹{card.amount}")
-        
-        elif card.type == "move":
-            if card.position is not None:
-                old_position = player.position
-                player.position = card.position
-                if card.collect_go and card.position < old_position:
-                    player.money += 2000
-                    game.game_log.append(f"{player.name} passed GO and collected ₹2000")
-                game.game_log.append(f"{player.name} moved to {card.position}")
-        
-        elif card.type == "goToJail":
-            self.send_to_jail(game.room_code, player_id)
-        
-        elif card.type == "jailFree":
-            player.get_out_of_jail_cards += 1
-            game.game_log.append(f"{player.name} received a Get Out of Jail Free card")
+        game._log.add("drew_card", player.id, name=player.name, title=card.title)
+        (effect or compile_card(card))(self, game, player)
 
+    @command
     def send_to_jail(self, room_code: str, player_id: str):
         """Send a player to jail"""
         game = self.games.get(room_code)
         if not game:
             return
         
-        player = next((p for p in game.players if p.id == player_id), None)
+        player = game._index.player(player_id)
         if not player:
             return
         
+        self._send_to_jail(game, player)
+
+    def _send_to_jail(self, game: GameState, player: Player):
         player.position = 10  # Jail position
         player.in_jail = True
         player.jail_turns = 0
-        game.game_log.append(f"{player.name} was sent to jail")
+        game._changes.mark_player(player.id)
+        game._log.add("jailed", player.id, name=player.name)
 
+    @command
     def end_turn(self, room_code: str, player_id: str):
         """End current player's turn"""
         game = self.games.get(room_code)
@@ -278,44 +364,455 @@ class MonopolyGameEngine:
         if current_player.id != player_id:
             raise ValueError("Not your turn")
         
+        game._changes.mark_fields("current_player", "turn_phase")
+        
         # Check for doubles
-        if hasattr(current_player, 'doubles_count') and current_player.doubles_count > 0 and not current_player.in_jail:
+        if current_player.doubles_count > 0 and not current_player.in_jail:
             # Player gets another turn
             game.turn_phase = "roll"
-            game.game_log.append(f"{current_player.name} rolled doubles and gets another turn")
+            game._log.add("extra_turn", current_player.id, name=current_player.name)
         else:
             # Move to next player
             game.current_player = (game.current_player + 1) % len(game.players)
             game.turn_phase = "roll"
             next_player = game.players[game.current_player]
-            game.game_log.append(f"It's now {next_player.name}'s turn")
+            game._log.add("turn", next_player.id, name=next_player.name)
+
+    @command
+    def build_house(self, room_code: str, player_id: str, property_id: int) -> int:
+        """Build a house on a square of a completed color group
+
+        Houses go up evenly: a square may not get ahead of the others in
+        its group by more than one. Returns the square's house count.
+        """
+        game = self.games.get(room_code)
+        if not game:
+            raise ValueError("Game not found")
+        
+        player = game._index.player(player_id)
+        if not player:
+            raise ValueError("Player not found")
+        
+        square = self._buildable_square(game, player, property_id)
+        board = game._board
+        if board.hotel[property_id]:
+            raise ValueError("Property already has a hotel")
+        
+        if board.houses[property_id] >= MAX_HOUSES:
+            raise ValueError("Build a hotel instead")
+        
+        if any(board.houses[member] < board.houses[property_id] and not board.hotel[member]
+               for member in GROUP_MEMBERS[square.owner_group]):
+            raise ValueError("Build evenly across the color group")
+        
+        if game.houses_remaining <= 0:
+            raise ValueError("No houses left in the bank")
+        
+        if player.money < square.house_cost:
+            raise ValueError("Insufficient funds")
+        
+        player.money -= square.house_cost
+        game._index.set_buildings(board, property_id, board.houses[property_id] + 1)
+        game.houses_remaining -= 1
+        game._changes.mark_player(player.id)
+        game._changes.mark_property(property_id)
+        game._changes.mark_fields("houses_remaining")
+        
+        game._log.add("built_house", player.id, square.house_cost, name=player.name, property=square.name,
+                      property_id=property_id)
+        return board.houses[property_id]
+
+    @command
+    def build_hotel(self, room_code: str, player_id: str, property_id: int) -> bool:
+        """Replace the four houses on a square with a hotel
 
-    def handle_bankruptcy(self, game: GameState, bankrupt_player: Player, creditor: Player):
-        """Handle player bankruptcy"""
+        Every square of the group must have four houses or a hotel first;
+        the four houses go back to the bank.
+        """
+        game = self.games.get(room_code)
+        if not game:
+            raise ValueError("Game not found")
+        
+        player = game._index.player(player_id)
+        if not player:
+            raise ValueError("Player not found")
+        
+        square = self._buildable_square(game, player, property_id)
+        board = game._board
+        if board.hotel[property_id]:
+            raise ValueError("Property already has a hotel")
+        
+        if any(board.houses[member] < MAX_HOUSES and not board.hotel[member]
+               for member in GROUP_MEMBERS[square.owner_group]):
+            raise ValueError("Every property in the group needs four houses first")
+        
+        if game.hotels_remaining <= 0:
+            raise ValueError("No hotels left in the bank")
+        
+        if player.money < square.house_cost:
+            raise ValueError("Insufficient funds")
+        
+        player.money -= square.house_cost
+        game._index.set_buildings(board, property_id, 0, True)
+        game.houses_remaining += MAX_HOUSES
+        game.hotels_remaining -= 1
+        game._changes.mark_player(player.id)
+        game._changes.mark_property(property_id)
+        game._changes.mark_fields("houses_remaining", "hotels_remaining")
+        
+        game._log.add("built_hotel", player.id, square.house_cost, name=player.name, property=square.name,
+                      property_id=property_id)
+        return True
+
+    def _buildable_square(self, game: GameState, player: Player, property_id: int):
+        """Check that a player may build on a square at all"""
+        if not isinstance(property_id, int) or not 0 <= property_id < BOARD_SIZE:
+            raise ValueError("Property not found")
+        square = BOARD[property_id]
+        
+        if not square.house_cost:
+            raise ValueError("Cannot build on this square")
+        
+        if game._board.owners[property_id] != player.id:
+            raise ValueError("You don't own this property")
+        
+        if not game._index.owns_group(player.id, square.owner_group):
+            raise ValueError("You need the whole color group to build")
+        
+        if any(game._board.mortgaged[member] for member in GROUP_MEMBERS[square.owner_group]):
+            raise ValueError("Lift the mortgages in the color group first")
+        return square
+
+    @command
+    def mortgage_property(self, room_code: str, player_id: str, property_id: int) -> int:
+        """Mortgage a square for half its price; returns the amount received
+
+        Buildings anywhere in the square's color group must be sold first.
+        """
+        game = self.games.get(room_code)
+        if not game:
+            raise ValueError("Game not found")
+        
+        player = game._index.player(player_id)
+        if not player:
+            raise ValueError("Player not found")
+        
+        square = self._owned_square(game, player, property_id)
+        board = game._board
+        if board.mortgaged[property_id]:
+            raise ValueError("Property is already mortgaged")
+        
+        if any(board.houses[member] or board.hotel[member] for member in GROUP_MEMBERS[square.owner_group]):
+            raise ValueError("Sell the buildings in the color group first")
+        
+        amount = square.price // 2
+        player.money += amount
+        game._index.set_mortgaged(board, property_id, True)
+        game._changes.mark_player(player.id)
+        game._changes.mark_property(property_id)
+        
+        game._log.add("mortgaged", player.id, amount, name=player.name, property=square.name,
+                      property_id=property_id)
+        return amount
+
+    @command
+    def unmortgage_property(self, room_code: str, player_id: str, property_id: int) -> int:
+        """Lift a mortgage for its value plus MORTGAGE_INTEREST percent; returns the amount paid"""
+        game = self.games.get(room_code)
+        if not game:
+            raise ValueError("Game not found")
+        
+        player = game._index.player(player_id)
+        if not player:
+            raise ValueError("Player not found")
+        
+        square = self._owned_square(game, player, property_id)
+        if not game._board.mortgaged[property_id]:
+            raise ValueError("Property is not mortgaged")
+        
+        amount = square.price // 2 * (100 + MORTGAGE_INTEREST) // 100
+        if player.money < amount:
+            raise ValueError("Insufficient funds")
+        
+        player.money -= amount
+        game._index.set_mortgaged(game._board, property_id, False)
+        game._changes.mark_player(player.id)
+        game._changes.mark_property(property_id)
+        
+        game._log.add("unmortgaged", player.id, amount, name=player.name, property=square.name,
+                      property_id=property_id)
+        return amount
+
+    def _owned_square(self, game: GameState, player: Player, property_id: int):
+        """Check that a square can be owned and belongs to the player"""
+        if not isinstance(property_id, int) or not 0 <= property_id < BOARD_SIZE:
+            raise ValueError("Property not found")
+        square = BOARD[property_id]
+        
+        if not square.price:
+            raise ValueError("Property not for sale")
+        
+        if game._board.owners[property_id] != player.id:
+            raise ValueError("You don't own this property")
+        return square
+
+    @command
+    def pay_jail_fine(self, room_code: str, player_id: str) -> int:
+        """Leave jail at the start of a turn, using a Get Out of Jail Free card if held
+
+        Returns the amount paid. Jailed players still roll and move; being
+        in jail only forfeits the extra turn for doubles.
+        """
+        game = self.games.get(room_code)
+        if not game:
+            raise ValueError("Game not found")
+        
+        current_player = game.players[game.current_player]
+        if current_player.id != player_id:
+            raise ValueError("Not your turn")
+        
+        if not current_player.in_jail:
+            raise ValueError("You are not in jail")
+        
+        if game.turn_phase != "roll":
+            raise ValueError("Leave jail before rolling")
+        
+        if current_player.get_out_of_jail_cards > 0:
+            current_player.get_out_of_jail_cards -= 1
+            paid = 0
+            game._log.add("used_jail_card", current_player.id, name=current_player.name)
+        else:
+            if current_player.money < JAIL_FINE:
+                raise ValueError("Insufficient funds")
+            current_player.money -= JAIL_FINE
+            paid = JAIL_FINE
+            game._log.add("paid_jail_fine", current_player.id, JAIL_FINE, name=current_player.name)
+        
+        current_player.in_jail = False
+        current_player.jail_turns = 0
+        game._changes.mark_player(current_player.id)
+        return paid
+
+    @command
+    def declare_bankruptcy(self, room_code: str, player_id: str):
+        """Declare a player bankrupt to the bank"""
+        game = self.games.get(room_code)
+        if not game:
+            raise ValueError("Game not found")
+        
+        player = game._index.player(player_id)
+        if not player:
+            raise ValueError("Player not found")
+        
+        self.handle_bankruptcy(game, player, None)
+
+    @command
+    def propose_trade(self, room_code: str, trade_id: str, from_player_id: str, to_player_id: str,
+                      from_properties: List[int], to_properties: List[int],
+                      from_money: int, to_money: int) -> TradeOffer:
+        """Open a trade offer from one player to another
+
+        The caller picks the trade id so replaying the command recreates the
+        same offer.
+        """
+        game = self.games.get(room_code)
+        if not game:
+            raise ValueError("Game not found")
+        
+        if game.game_ended:
+            raise ValueError("Game has ended")
+        
+        if from_player_id == to_player_id:
+            raise ValueError("Cannot trade with yourself")
+        
+        if trade_id in self.trades:
+            raise ValueError("Trade already exists")
+        
+        for properties in (from_properties, to_properties):
+            if any(not isinstance(property_id, int) or not 0 <= property_id < BOARD_SIZE
+                   for property_id in properties):
+                raise ValueError("Property not found")
+            if len(set(properties)) != len(properties):
+                raise ValueError("Property listed twice")
+        
+        for amount in (from_money, to_money):
+            if not isinstance(amount, int) or amount < 0:
+                raise ValueError("Invalid amount")
+        
+        if not (from_properties or to_properties or from_money or to_money):
+            raise ValueError("Trade offers nothing")
+        
+        if len(self.trades.sent_by(from_player_id)) >= MAX_PENDING_PER_PLAYER:
+            raise ValueError("Too many open trade offers")
+        
+        trade = TradeOffer(
+            id=trade_id,
+            room_code=room_code,
+            from_player_id=from_player_id,
+            to_player_id=to_player_id,
+            from_properties=list(from_properties),
+            to_properties=list(to_properties),
+            from_money=from_money,
+            to_money=to_money
+        )
+        self._check_trade(game, trade)
+        self.trades.add(trade)
+        return trade
+
+    @command
+    def respond_trade(self, room_code: str, player_id: str, trade_id: str, accept: bool) -> TradeOffer:
+        """Accept or reject a trade offer made to a player
+
+        Acceptance re-checks the offer against the current state and then
+        swaps everything at once; if any part is no longer possible nothing
+        changes and the offer stays open.
+        """
+        game = self.games.get(room_code)
+        if not game:
+            raise ValueError("Game not found")
+        
+        trade = self.trades.get(trade_id)
+        if not trade or trade.room_code != room_code:
+            raise ValueError("Trade not found")
+        
+        if trade.to_player_id != player_id:
+            raise ValueError("Only the recipient can answer a trade")
+        
+        if accept:
+            if game.game_ended:
+                raise ValueError("Game has ended")
+            from_player, to_player = self._check_trade(game, trade)
+            self._execute_trade(game, trade, from_player, to_player)
+            trade.status = "accepted"
+        else:
+            trade.status = "rejected"
+        
+        self.trades.remove(trade_id)
+        return trade
+
+    @command
+    def cancel_trade(self, room_code: str, player_id: str, trade_id: str) -> TradeOffer:
+        """Withdraw a trade offer the player made"""
+        trade = self.trades.get(trade_id)
+        if not trade or trade.room_code != room_code:
+            raise ValueError("Trade not found")
+        
+        if trade.from_player_id != player_id:
+            raise ValueError("Only the sender can cancel a trade")
+        
+        trade.status = "cancelled"
+        self.trades.remove(trade_id)
+        return trade
+
+    @command
+    def expire_trade(self, room_code: str, trade_id: str) -> Optional[TradeOffer]:
+        """Close a trade offer whose time ran out"""
+        trade = self.trades.get(trade_id)
+        if not trade or trade.room_code != room_code:
+            return None
+        
+        trade.status = "expired"
+        self.trades.remove(trade_id)
+        return trade
+
+    def _check_trade(self, game: GameState, trade: TradeOffer) -> Tuple[Player, Player]:
+        """Check that both sides of a trade can still hand over what it lists"""
+        from_player = game._index.player(trade.from_player_id)
+        to_player = game._index.player(trade.to_player_id)
+        if not from_player or not to_player:
+            raise ValueError("Player not found")
+        
+        for player, properties in ((from_player, trade.from_properties), (to_player, trade.to_properties)):
+            owned = game._index.owned_by(player.id)
+            for property_id in properties:
+                if property_id not in owned:
+                    raise ValueError(f"{player.name} does not own {BOARD[property_id].name}")
+                # Buildings must be sold off the whole group before any of it changes hands
+                group = BOARD[property_id].owner_group
+                if any(game._board.houses[member] or game._board.hotel[member]
+                       for member in GROUP_MEMBERS.get(group, (property_id,))):
+                    raise ValueError(f"Sell the buildings on {BOARD[property_id].name}'s group first")
+        
+        if from_player.money < trade.from_money or to_player.money < trade.to_money:
+            raise ValueError("Insufficient funds")
+        return from_player, to_player
+
+    def _execute_trade(self, game: GameState, trade: TradeOffer, from_player: Player, to_player: Player):
+        """Swap the properties and money of a checked trade"""
+        for giver, receiver, properties in ((from_player, to_player, trade.from_properties),
+                                            (to_player, from_player, trade.to_properties)):
+            for property_id in properties:
+                giver.properties.remove(property_id)
+                receiver.properties.append(property_id)
+                game._index.set_owner(game._board, property_id, receiver.id)
+                game._changes.mark_property(property_id)
+        
+        from_player.money += trade.to_money - trade.from_money
+        to_player.money += trade.from_money - trade.to_money
+        game._changes.mark_player(from_player.id, to_player.id)
+        
+        game._log.add("traded", from_player.id, name=from_player.name, target=to_player.id,
+                      target_name=to_player.name)
+
+    def handle_bankruptcy(self, game: GameState, bankrupt_player: Player, creditor: Optional[Player]):
+        """Handle player bankruptcy
+
+        Assets go to the creditor, or back to the bank when creditor is None.
+        Squares returned to the bank lose their buildings, which go back to
+        the bank's supply, and their mortgages.
+        """
+        creditor_id = creditor.id if creditor else None
+        board = game._board
+        
+        if not creditor and game._index.owned_by(bankrupt_player.id):
+            for property_id in game._index.owned_by(bankrupt_player.id):
+                if board.hotel[property_id]:
+                    game.hotels_remaining += 1
+                else:
+                    game.houses_remaining += board.houses[property_id]
+                game._index.set_buildings(board, property_id, 0)
+                game._index.set_mortgaged(board, property_id, False)
+            game._changes.mark_fields("houses_remaining", "hotels_remaining")
+        
         # Transfer all properties to creditor
-        for property_id in bankrupt_player.properties:
-            property_obj = next((p for p in game.properties if p.id == property_id), None)
-            if property_obj:
-                property_obj.owner = creditor.id
-                creditor.properties.append(property_id)
+        transferred = game._index.transfer_all(board, bankrupt_player.id, creditor_id)
+        if creditor:
+            creditor.properties.extend(transferred)
+        game._changes.mark_property(*transferred)
         
         # Transfer money
-        creditor.money += max(0, bankrupt_player.money)
+        if creditor:
+            creditor.money += max(0, bankrupt_player.money)
+            game._changes.mark_player(creditor.id)
+        
+        # Their open offers can no longer be settled
+        self.trades.remove_player(bankrupt_player.id, game.room_code)
         
         # Remove player from game
+        seat = game.players.index(bankrupt_player)
         game.players.remove(bankrupt_player)
+        game._index.remove_player(bankrupt_player.id)
+        game._changes.remove_player(bankrupt_player.id)
+        game._changes.mark_fields("current_player")
         
         # Adjust current player index
+        if seat < game.current_player:
+            game.current_player -= 1
+        elif seat == game.current_player:
+            # The turn passes to the next player in seat order
+            game.turn_phase = "roll"
+            game._changes.mark_fields("turn_phase")
         if game.current_player >= len(game.players):
             game.current_player = 0
         
-        game.game_log.append(f"{bankrupt_player.name} went bankrupt")
+        game._log.add("bankrupt", bankrupt_player.id, name=bankrupt_player.name)
         
         # Check for winner
         if len(game.players) == 1:
             game.winner = game.players[0].id
             game.game_ended = True
-            game.game_log.append(f"{game.players[0].name} wins the game!")
+            game._changes.mark_fields("winner", "game_ended")
+            game._log.add("won", game.players[0].id, name=game.players[0].name)
 
 # Global game engine instance
 game_engine = MonopolyGameEngine()
\ No newline at end of file
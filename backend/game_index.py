@@ -0,0 +1,194 @@
+from typing import Dict, List, Optional, Set, Tuple
+from board import BOARD, GROUP_MEMBERS
+
+# Color groups, the ones that can be completed into a monopoly and built on
+COLOR_GROUPS = frozenset(group for group, members in GROUP_MEMBERS.items() if BOARD[members[0]].type == "property")
+
+# Houses a hotel is worth, counting the four it replaces
+HOTEL_HOUSES = 5
+
+def property_value(board, position: int) -> int:
+    """Value of a square itself: its price, or its mortgage value while mortgaged"""
+    price = BOARD[position].price or 0
+    return price // 2 if board.mortgaged[position] else price
+
+def building_value(board, position: int) -> int:
+    """What was paid for the houses or hotel on a square"""
+    house_cost = BOARD[position].house_cost or 0
+    return house_cost * (HOTEL_HOUSES if board.hotel[position] else board.houses[position])
+
+class GameIndex:
+    """Lookup tables over a game's players and board ownership
+
+    Every ownership, mortgage and building change must go through
+    set_owner/set_mortgaged/set_buildings/remove_player so the owner and
+    group counts, asset values and monopolies stay consistent with the
+    board state.
+    """
+
+    __slots__ = ("players", "owned", "group_counts", "property_values", "building_values", "monopolies")
+
+    def __init__(self, game=None):
+        self.players: Dict[str, object] = {}
+        # owner id -> positions of the squares they own
+        self.owned: Dict[str, Set[int]] = {}
+        # (owner id, group) -> number of squares of that group owned
+        self.group_counts: Dict[Tuple[str, str], int] = {}
+        # owner id -> summed property_value / building_value of their squares
+        self.property_values: Dict[str, int] = {}
+        self.building_values: Dict[str, int] = {}
+        # owner id -> color groups they own completely
+        self.monopolies: Dict[str, Set[str]] = {}
+        if game is not None:
+            self.rebuild(game)
+
+    def rebuild(self, game):
+        """Recompute every index from the game state"""
+        self.players = {p.id: p for p in game.players}
+        self.owned = {}
+        self.group_counts = {}
+        self.property_values = {}
+        self.building_values = {}
+        self.monopolies = {}
+        board = game._board
+        for position, owner_id in enumerate(board.owners):
+            if owner_id:
+                self._add_owned(board, owner_id, position)
+
+    def fork(self, players) -> "GameIndex":
+        """Copy of the indexes over a fork's copies of the players"""
+        index = GameIndex.__new__(GameIndex)
+        index.players = {player.id: player for player in players}
+        index.owned = {owner_id: set(positions) for owner_id, positions in self.owned.items()}
+        index.group_counts = self.group_counts.copy()
+        index.property_values = self.property_values.copy()
+        index.building_values = self.building_values.copy()
+        index.monopolies = {owner_id: set(groups) for owner_id, groups in self.monopolies.items()}
+        return index
+
+    def player(self, player_id: str):
+        """Get a player by id"""
+        return self.players.get(player_id)
+
+    def owned_by(self, owner_id: str) -> Set[int]:
+        """Get positions of the squares owned by a player"""
+        return self.owned.get(owner_id, set())
+
+    def group_count(self, owner_id: str, group: str) -> int:
+        """Count squares of a group owned by a player"""
+        return self.group_counts.get((owner_id, group), 0)
+
+    def owns_group(self, owner_id: str, group: str) -> bool:
+        """Check whether a player owns every square of a group"""
+        members = GROUP_MEMBERS.get(group)
+        return bool(members) and self.group_count(owner_id, group) == len(members)
+
+    def asset_value(self, owner_id: str) -> int:
+        """Value of everything a player owns on the board"""
+        return self.property_values.get(owner_id, 0) + self.building_values.get(owner_id, 0)
+
+    def net_worth(self, player) -> int:
+        """Cash plus board assets"""
+        return player.money + self.asset_value(player.id)
+
+    def monopolies_of(self, owner_id: str) -> List[str]:
+        """Color groups a player owns completely, in name order"""
+        return sorted(self.monopolies.get(owner_id, ()))
+
+    def set_owner(self, board, position: int, owner_id: Optional[str]):
+        """Change the owner of a square and update the indexes"""
+        current = board.owners[position]
+        if current:
+            self._remove_owned(board, current, position)
+        board.owners[position] = owner_id
+        if owner_id:
+            self._add_owned(board, owner_id, position)
+
+    def set_mortgaged(self, board, position: int, mortgaged: bool):
+        """Mortgage or lift the mortgage on a square and update its owner's value"""
+        owner_id = board.owners[position]
+        before = property_value(board, position)
+        board.mortgaged[position] = mortgaged
+        if owner_id:
+            self._add_value(self.property_values, owner_id, property_value(board, position) - before)
+
+    def set_buildings(self, board, position: int, houses: int, hotel: bool = False):
+        """Set the houses and hotel on a square and update its owner's value"""
+        owner_id = board.owners[position]
+        before = building_value(board, position)
+        board.houses[position] = houses
+        board.hotel[position] = hotel
+        if owner_id:
+            self._add_value(self.building_values, owner_id, building_value(board, position) - before)
+
+    def transfer_all(self, board, from_id: str, to_id: Optional[str]) -> List[int]:
+        """Hand every square of one owner to another, or to the bank; returns their positions
+
+        The owner's totals and group counts move over whole, rather than
+        square by square through set_owner.
+        """
+        positions = sorted(self.owned.pop(from_id, ()))
+        for position in positions:
+            board.owners[position] = to_id
+        property_total = self.property_values.pop(from_id, 0)
+        building_total = self.building_values.pop(from_id, 0)
+        self.monopolies.pop(from_id, None)
+        groups = {BOARD[position].owner_group for position in positions}
+        groups.discard(None)
+        counts = [(group, self.group_counts.pop((from_id, group))) for group in groups]
+        if to_id and positions:
+            self.owned.setdefault(to_id, set()).update(positions)
+            self._add_value(self.property_values, to_id, property_total)
+            self._add_value(self.building_values, to_id, building_total)
+            for group, count in counts:
+                key = (to_id, group)
+                total = self.group_counts[key] = self.group_counts.get(key, 0) + count
+                if group in COLOR_GROUPS and total == len(GROUP_MEMBERS[group]):
+                    self.monopolies.setdefault(to_id, set()).add(group)
+        return positions
+
+    def remove_player(self, player_id: str):
+        """Drop a player from the player index"""
+        self.players.pop(player_id, None)
+
+    def _add_owned(self, board, owner_id: str, position: int):
+        self.owned.setdefault(owner_id, set()).add(position)
+        self._add_value(self.property_values, owner_id, property_value(board, position))
+        self._add_value(self.building_values, owner_id, building_value(board, position))
+        group = BOARD[position].owner_group
+        if group:
+            key = (owner_id, group)
+            count = self.group_counts[key] = self.group_counts.get(key, 0) + 1
+            if group in COLOR_GROUPS and count == len(GROUP_MEMBERS[group]):
+                self.monopolies.setdefault(owner_id, set()).add(group)
+
+    def _remove_owned(self, board, owner_id: str, position: int):
+        owned = self.owned.get(owner_id)
+        if owned:
+            owned.discard(position)
+            if not owned:
+                del self.owned[owner_id]
+        self._add_value(self.property_values, owner_id, -property_value(board, position))
+        self._add_value(self.building_values, owner_id, -building_value(board, position))
+        group = BOARD[position].owner_group
+        if group:
+            key = (owner_id, group)
+            count = self.group_counts.get(key, 0) - 1
+            if count > 0:
+                self.group_counts[key] = count
+            else:
+                self.group_counts.pop(key, None)
+            monopolies = self.monopolies.get(owner_id)
+            if monopolies and group in monopolies:
+                monopolies.discard(group)
+                if not monopolies:
+                    del self.monopolies[owner_id]
+
+    @staticmethod
+    def _add_value(values: Dict[str, int], owner_id: str, amount: int):
+        if amount:
+            total = values.get(owner_id, 0) + amount
+            if total:
+                values[owner_id] = total
+            else:
+                values.pop(owner_id, None)
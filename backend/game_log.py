@@ -0,0 +1,142 @@
+import os
+from collections import deque
+from itertools import islice
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+# Events kept per game; older ones are dropped
+LOG_CAPACITY = int(os.environ.get("GAME_LOG_CAPACITY", "500"))
+# Most recent events included in live game state payloads
+LIVE_LOG_SIZE = int(os.environ.get("GAME_LOG_LIVE_SIZE", "20"))
+
+# Text templates per event type, formatted only when an entry is read
+LOG_TEMPLATES = {
+    "game_started": "Game started with {count} players",
+    "rolled": "{name} rolled {dice1}+{dice2}={amount}",
+    "passed_go": "{name} passed GO and collected ₹{amount}",
+    "moved": "{name} moved from {from_position} to {to_position}",
+    "moved_to": "{name} moved to {to_position}",
+    "bought": "{name} bought {property} for ₹{amount}",
+    "paid_rent": "{name} paid ₹{amount} rent to {target_name}",
+    "paid_tax": "{name} paid ₹{amount} {property}",
+    "collected": "{name} collected ₹{amount}",
+    "paid": "{name} paid ₹{amount}",
+    "paid_player": "{name} paid ₹{amount} to {target_name}",
+    "repairs": "{name} paid ₹{amount} for repairs on {houses} houses and {hotels} hotels",
+    "drew_card": "{name} drew \"{title}\"",
+    "jail_free_card": "{name} received a Get Out of Jail Free card",
+    "jailed": "{name} was sent to jail",
+    "paid_jail_fine": "{name} paid ₹{amount} to leave jail",
+    "used_jail_card": "{name} used a Get Out of Jail Free card to leave jail",
+    "built_house": "{name} built a house on {property}",
+    "built_hotel": "{name} built a hotel on {property}",
+    "mortgaged": "{name} mortgaged {property} for ₹{amount}",
+    "unmortgaged": "{name} paid ₹{amount} to lift the mortgage on {property}",
+    "extra_turn": "{name} rolled doubles and gets another turn",
+    "turn": "It's now {name}'s turn",
+    "traded": "{name} traded with {target_name}",
+    "bankrupt": "{name} went bankrupt",
+    "won": "{name} wins the game!",
+    "message": "{message}",
+}
+
+class LogEvent(NamedTuple):
+    """One structured game log entry"""
+    seq: int
+    type: str
+    actor: Optional[str] = None
+    amount: Optional[int] = None
+    # Template values such as names and positions
+    data: Optional[Dict[str, Any]] = None
+
+    @property
+    def text(self) -> str:
+        template = LOG_TEMPLATES.get(self.type, self.type)
+        return template.format(amount=self.amount, **(self.data or {}))
+
+    def to_dict(self) -> dict:
+        entry = {"seq": self.seq, "type": self.type, "actor": self.actor, "amount": self.amount}
+        if self.data:
+            entry.update(self.data)
+        entry["text"] = self.text
+        return entry
+
+    @classmethod
+    def from_dict(cls, entry: dict) -> "LogEvent":
+        data = {key: value for key, value in entry.items()
+                if key not in ("seq", "type", "actor", "amount", "text")}
+        return cls(entry["seq"], entry["type"], entry.get("actor"), entry.get("amount"), data or None)
+
+class GameLog:
+    """Bounded ring buffer of log events with monotonically increasing sequence numbers"""
+
+    __slots__ = ("_events", "next_seq")
+
+    def __init__(self, capacity: int = LOG_CAPACITY):
+        self._events: deque = deque(maxlen=capacity)
+        self.next_seq = 0
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    @property
+    def first_seq(self) -> int:
+        """Sequence number of the oldest event still kept"""
+        return self.next_seq - len(self._events)
+
+    def add(self, event_type: str, actor: Optional[str] = None, amount: Optional[int] = None,
+            **data: Any) -> LogEvent:
+        """Append an event; the oldest one is dropped when the buffer is full"""
+        event = LogEvent(self.next_seq, event_type, actor, amount, data or None)
+        self._events.append(event)
+        self.next_seq += 1
+        return event
+
+    def since(self, seq: int) -> List[LogEvent]:
+        """Events with a sequence number of at least seq"""
+        return self._slice(max(seq, self.first_seq), self.next_seq)
+
+    def recent(self, limit: int = LIVE_LOG_SIZE) -> List[LogEvent]:
+        """The most recent events, oldest first"""
+        return self.since(self.next_seq - limit)
+
+    def page(self, before: Optional[int] = None, limit: int = 50) -> List[LogEvent]:
+        """Up to limit events older than sequence number before, oldest first"""
+        end = self.next_seq if before is None else min(max(before, self.first_seq), self.next_seq)
+        return self._slice(max(end - limit, self.first_seq), end)
+
+    def fork(self) -> "GameLog":
+        """Log continuing this one's sequence that starts from the live events only
+
+        Older events stay with this log; the fork pages back as far as the
+        live tail, which keeps forking independent of the log capacity.
+        """
+        log = GameLog.__new__(GameLog)
+        log._events = deque(self.recent(LIVE_LOG_SIZE), maxlen=self._events.maxlen)
+        log.next_seq = self.next_seq
+        return log
+
+    def copy(self) -> "GameLog":
+        """Independent log with every retained event; the events themselves are immutable and shared"""
+        log = GameLog.__new__(GameLog)
+        log._events = self._events.copy()
+        log.next_seq = self.next_seq
+        return log
+
+    def _slice(self, start: int, end: int) -> List[LogEvent]:
+        # Walk from the newest end, where live reads and recent pages are
+        if start >= end:
+            return []
+        skip = self.next_seq - end
+        events = list(islice(reversed(self._events), skip, skip + end - start))
+        events.reverse()
+        return events
+
+    def load(self, entries: Iterable[Any]):
+        """Restore events from their dict form; plain strings become message events"""
+        for entry in entries:
+            if isinstance(entry, str):
+                self.add("message", message=entry)
+                continue
+            event = LogEvent.from_dict(entry)
+            self._events.append(event)
+            self.next_seq = event.seq + 1
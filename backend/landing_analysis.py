@@ -0,0 +1,221 @@
+"""Exact landing probabilities and rent ROI from a Markov chain of the board
+
+The chain models a single token: a 2d6 roll per step, another roll after
+doubles, jail on the third double in a row, the Go-To-Jail square and the
+move/jail cards of both decks. Landings count where a roll finishes, so a
+card that moves the token credits the square it moves to, not the deck's
+square. A jailed token moves again on its next roll, as in the engine.
+
+It assumes jail is left with a card or the fine before that roll. The
+engine keeps in_jail set until pay_jail_fine, and a jailed player gets no
+extra roll on doubles; a player who never pays keeps that penalty for the
+rest of the game, which the chain does not model.
+
+    python landing_analysis.py --opponents 3
+"""
+import argparse
+import json
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from board import BOARD, BOARD_SIZE
+from card_effects import nearest_squares
+from data.properties import CHANCE_CARDS, COMMUNITY_CHEST_CARDS
+
+JAIL_POSITION = 10
+GO_TO_JAIL_POSITION = 30
+# Doubles already rolled this turn before the next roll: 0, 1 or 2
+DOUBLES_STATES = 3
+STATE_COUNT = BOARD_SIZE * DOUBLES_STATES
+BUILD_LEVELS = ("1 house", "2 houses", "3 houses", "4 houses", "hotel")
+
+def dice_outcomes() -> List[Tuple[int, bool, float]]:
+    """Distinct (total, is_double, probability) outcomes of a 2d6 roll"""
+    outcomes: Dict[Tuple[int, bool], float] = {}
+    for die1 in range(1, 7):
+        for die2 in range(1, 7):
+            key = (die1 + die2, die1 == die2)
+            outcomes[key] = outcomes.get(key, 0.0) + 1 / 36
+    return [(total, double, probability) for (total, double), probability in sorted(outcomes.items())]
+
+def _card_destination(card: dict, position: int) -> Optional[int]:
+    """Square a card drawn on position moves the token to, as card_effects resolves it"""
+    if card["type"] != "move":
+        return None
+    if card.get("target") is not None:
+        return nearest_squares(card["target"])[position]
+    if card.get("spaces") is not None:
+        return (position + card["spaces"]) % BOARD_SIZE
+    return card.get("position")
+
+def redirect_matrices(chance_cards: List[dict] = CHANCE_CARDS,
+                      community_cards: List[dict] = COMMUNITY_CHEST_CARDS) -> Tuple[np.ndarray, np.ndarray]:
+    """Resolve where a token ends up after arriving on each square
+
+    A card moving the token to a position or by a number of spaces lands
+    it on that square, which is resolved in turn (another deck, Go-To-Jail);
+    a card moving it to the nearest square of a kind ends the move there,
+    with the rent settled by the card. Returns (free, jail): free[t, q] is
+    the probability of finishing the roll on q without going to jail,
+    jail[t] of being sent to jail.
+    """
+    free = np.zeros((BOARD_SIZE, BOARD_SIZE))
+    jail = np.zeros(BOARD_SIZE)
+    decks = {"chance": chance_cards, "community": community_cards}
+    resolved = set()
+
+    def resolve(position: int, path: frozenset):
+        if position in resolved:
+            return
+        if position in path:
+            raise ValueError(f"Card moves loop back to square {position}")
+        square = BOARD[position]
+        if position == GO_TO_JAIL_POSITION:
+            jail[position] = 1.0
+        elif square.type in decks:
+            cards = decks[square.type]
+            share = 1 / len(cards)
+            for card in cards:
+                destination = _card_destination(card, position)
+                if card["type"] == "goToJail":
+                    jail[position] += share
+                elif destination is None:
+                    free[position, position] += share
+                elif card.get("target") is not None:
+                    free[position, destination] += share
+                else:
+                    resolve(destination, path | {position})
+                    free[position] += share * free[destination]
+                    jail[position] += share * jail[destination]
+        else:
+            free[position, position] = 1.0
+        resolved.add(position)
+
+    for position in range(BOARD_SIZE):
+        resolve(position, frozenset())
+    return free, jail
+
+def transition_matrices() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Build the per-roll chain over (position, doubles) states
+
+    Returns (P, L, S): P[s, s'] is the transition matrix, L[s, t] the
+    probability that a roll from s finishes on square t, after any card
+    moves, and S[s, t] the same weighted by the dice total (for utility
+    rent).
+    """
+    free, jail = redirect_matrices()
+    positions = np.arange(BOARD_SIZE)
+    P = np.zeros((STATE_COUNT, STATE_COUNT))
+    L = np.zeros((STATE_COUNT, BOARD_SIZE))
+    S = np.zeros((STATE_COUNT, BOARD_SIZE))
+    jail_state = JAIL_POSITION * DOUBLES_STATES
+
+    for total, double, probability in dice_outcomes():
+        targets = (positions + total) % BOARD_SIZE
+        for doubles in range(DOUBLES_STATES):
+            rows = positions * DOUBLES_STATES + doubles
+            if double and doubles == DOUBLES_STATES - 1:
+                # Third double in a row: straight to jail without moving
+                P[rows, jail_state] += probability
+                continue
+
+            L[rows] += probability * free[targets]
+            S[rows] += probability * total * free[targets]
+
+            next_doubles = doubles + 1 if double else 0
+            P[rows[:, None], positions[None, :] * DOUBLES_STATES + next_doubles] += probability * free[targets]
+            P[rows, jail_state] += probability * jail[targets]
+    return P, L, S
+
+def stationary_distribution(P: np.ndarray) -> np.ndarray:
+    """Solve pi P = pi with sum(pi) = 1"""
+    n = P.shape[0]
+    A = P.T - np.eye(n)
+    A[-1, :] = 1.0
+    b = np.zeros(n)
+    b[-1] = 1.0
+    return np.linalg.solve(A, b)
+
+def landing_frequencies() -> Tuple[np.ndarray, np.ndarray]:
+    """Expected landings per turn on each square and mean dice total on landing"""
+    P, L, S = transition_matrices()
+    pi = stationary_distribution(P)
+    # Every roll made with no doubles pending starts a new turn
+    turns_per_roll = pi.reshape(BOARD_SIZE, DOUBLES_STATES)[:, 0].sum()
+    landings = pi @ L / turns_per_roll
+    weighted_totals = pi @ S / turns_per_roll
+    mean_totals = np.divide(weighted_totals, landings, out=np.zeros(BOARD_SIZE), where=landings > 0)
+    return landings, mean_totals
+
+def _row(square, level: str, landings: float, rent: float, cost: Optional[int], opponents: int) -> dict:
+    expected = landings * rent
+    payback_turns = cost / expected if cost and expected else None
+    return {
+        "id": square.id,
+        "name": square.name,
+        "level": level,
+        "cost": cost,
+        "rent": rent,
+        "expected_rent_per_opponent_turn": expected,
+        "payback_opponent_turns": payback_turns,
+        "payback_rounds": payback_turns / opponents if payback_turns else None,
+    }
+
+def rent_roi(opponents: int = 3) -> List[dict]:
+    """Expected rent per opponent turn and payback period for every square and build level
+
+    Costs are cumulative: a build level includes the purchase price and all
+    houses needed to reach it. Railroad and utility levels are the number of
+    squares of that kind owned by the same player.
+    """
+    landings, mean_totals = landing_frequencies()
+    rows = []
+    for square in BOARD:
+        if not square.price:
+            continue
+        frequency = float(landings[square.id])
+        if square.type == "property":
+            rows.append(_row(square, "unimproved", frequency, square.rent[0], square.price, opponents))
+            rows.append(_row(square, "monopoly", frequency, square.rent[0] * 2, square.price, opponents))
+            for houses, level in enumerate(BUILD_LEVELS, start=1):
+                cost = square.price + houses * square.house_cost
+                rows.append(_row(square, level, frequency, square.rent[houses], cost, opponents))
+        elif square.type == "railroad":
+            for owned, rent in enumerate(square.rent, start=1):
+                rows.append(_row(square, f"{owned} owned", frequency, rent, square.price, opponents))
+        elif square.type == "utility":
+            for owned, multiplier in ((1, 4), (2, 10)):
+                rent = multiplier * float(mean_totals[square.id])
+                rows.append(_row(square, f"{owned} owned", frequency, rent, square.price, opponents))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Landing probabilities and rent ROI per square")
+    parser.add_argument("--opponents", type=int, default=3, help="opponents per round, for payback in rounds")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    landings, _ = landing_frequencies()
+    rows = rent_roi(args.opponents)
+
+    if args.json:
+        print(json.dumps({
+            "landings_per_turn": {square.name if square.price else f"{square.id}:{square.name}": float(landings[square.id])
+                                  for square in BOARD},
+            "roi": rows,
+        }, indent=2))
+        return
+
+    print(f"{'#':>2} {'square':<20} {'landings/turn':>13}")
+    for square in BOARD:
+        print(f"{square.id:>2} {square.name:<20} {landings[square.id]:>13.4f}")
+    print()
+    print(f"{'#':>2} {'property':<20} {'level':<10} {'cost':>7} {'rent/opp turn':>13} {'payback rounds':>14}")
+    for row in rows:
+        payback = f"{row['payback_rounds']:.1f}" if row["payback_rounds"] else "-"
+        print(f"{row['id']:>2} {row['name']:<20} {row['level']:<10} {row['cost']:>7} "
+              f"{row['expected_rent_per_opponent_turn']:>13.2f} {payback:>14}")
+
+if __name__ == "__main__":
+    main()
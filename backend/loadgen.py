@@ -0,0 +1,379 @@
+"""Websocket load generator for the game server
+
+Starts the app with uvicorn on a free localhost port (or targets --url) and
+plays complete multiplayer sessions through /ws/{room_code}/{player_id}:
+every room is created and joined over temporary connections, players
+ready up, the host starts the game and players take turns rolling, buying,
+chatting and ending their turns.
+
+Reports throughput, p50/p95/p99 latency per message type (send until the
+sender receives the resulting event) and broadcast delivery lag (send until
+each other player in the room receives it). Exits non-zero on errors or
+when --max-p99-ms is exceeded, so it can gate changes to the server.
+
+    python loadgen.py --rooms 250 --players 4 --turns 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import websockets
+
+from board import BOARD
+
+BACKEND_DIR = Path(__file__).parent
+RESPONSE_TIMEOUT = 15.0
+
+Predicate = Callable[[dict], bool]
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of unsorted samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+class LoadStats:
+    """Latency samples per message type and error counters"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.broadcast_lag: Dict[str, List[float]] = defaultdict(list)
+        self.sent = 0
+        self.received = 0
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.rooms_completed = 0
+        self.turns = 0
+
+    def summary(self, samples: List[float]) -> dict:
+        return {
+            "count": len(samples),
+            "p50_ms": percentile(samples, 0.50) * 1000,
+            "p95_ms": percentile(samples, 0.95) * 1000,
+            "p99_ms": percentile(samples, 0.99) * 1000,
+            "max_ms": max(samples) * 1000 if samples else 0.0,
+        }
+
+    def report(self, seconds: float) -> dict:
+        return {
+            "seconds": seconds,
+            "rooms_completed": self.rooms_completed,
+            "turns": self.turns,
+            "messages_sent": self.sent,
+            "frames_received": self.received,
+            "sent_per_second": self.sent / seconds if seconds else 0.0,
+            "received_per_second": self.received / seconds if seconds else 0.0,
+            "turns_per_second": self.turns / seconds if seconds else 0.0,
+            "latency": {kind: self.summary(samples) for kind, samples in sorted(self.latencies.items())},
+            "broadcast_lag": {kind: self.summary(samples) for kind, samples in sorted(self.broadcast_lag.items())},
+            "errors": dict(self.errors),
+        }
+
+class LoadClient:
+    """One websocket connection with waiters for expected messages"""
+
+    def __init__(self, stats: LoadStats, player_id: str):
+        self.stats = stats
+        self.player_id = player_id
+        self.websocket = None
+        self._waiters: List[Tuple[str, Predicate, asyncio.Future]] = []
+        self._reader: Optional[asyncio.Task] = None
+
+    async def connect(self, url: str):
+        self.websocket = await websockets.connect(url, max_size=None)
+        self._reader = asyncio.create_task(self._read())
+
+    async def close(self):
+        if self.websocket is not None:
+            await self.websocket.close()
+        if self._reader:
+            await asyncio.gather(self._reader, return_exceptions=True)
+
+    def expect(self, message_type: str, predicate: Predicate = lambda message: True) -> asyncio.Future:
+        """Register interest in a message before the request that causes it is sent"""
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((message_type, predicate, future))
+        return future
+
+    def discard(self, future: asyncio.Future):
+        """Stop waiting for a message that is not coming"""
+        self._waiters = [waiter for waiter in self._waiters if waiter[2] is not future]
+        if not future.done():
+            future.cancel()
+        elif not future.cancelled():
+            # Consume a failure nobody is waiting for
+            future.exception()
+
+    async def send(self, message: dict):
+        self.stats.sent += 1
+        await self.websocket.send(json.dumps(message))
+
+    async def _read(self):
+        try:
+            async for frame in self.websocket:
+                received_at = time.perf_counter()
+                self.stats.received += 1
+                message = json.loads(frame)
+                message_type = message.get("type")
+                if message_type == "error":
+                    # The request failed, so nothing this connection waits for is coming
+                    failed = [waiter for waiter in self._waiters if waiter[0] != "error"]
+                    for waiter in failed:
+                        if not waiter[2].done():
+                            waiter[2].set_exception(RuntimeError(message.get("message")))
+                        self._waiters.remove(waiter)
+                for waiter in self._waiters:
+                    expected, predicate, future = waiter
+                    if future.done():
+                        continue
+                    if message_type == expected and predicate(message):
+                        future.set_result((received_at, message))
+                        self._waiters.remove(waiter)
+                        break
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for _, _, future in self._waiters:
+                if not future.done():
+                    future.set_exception(ConnectionError("connection closed"))
+            self._waiters.clear()
+
+class RoomSession:
+    """Plays one room from creation to the last configured turn"""
+
+    def __init__(self, url: str, stats: LoadStats, players: int, turns: int, rng: random.Random):
+        self.url = url
+        self.stats = stats
+        self.players = players
+        self.turns = turns
+        self.rng = rng
+        self.room_code: Optional[str] = None
+        self.clients: Dict[str, LoadClient] = {}
+        self.owned: Dict[int, str] = {}
+        self.money: Dict[str, int] = {}
+
+    async def request(self, sender: LoadClient, message: dict, response_type: str,
+                      predicate: Predicate = lambda message: True, watchers: Optional[List[LoadClient]] = None) -> dict:
+        """Send a message and wait for its event on the sender and the watchers"""
+        watchers = watchers or []
+        futures = [client.expect(response_type, predicate) for client in [sender] + watchers]
+        sent_at = time.perf_counter()
+        await sender.send(message)
+        results = await asyncio.wait_for(asyncio.gather(*futures), timeout=RESPONSE_TIMEOUT)
+
+        kind = message["type"]
+        self.stats.latencies[kind].append(results[0][0] - sent_at)
+        for received_at, _ in results[1:]:
+            self.stats.broadcast_lag[response_type].append(received_at - sent_at)
+        return results[0][1]
+
+    async def _lobby_connection(self) -> LoadClient:
+        client = LoadClient(self.stats, f"temp-{uuid.uuid4().hex[:12]}")
+        await client.connect(f"{self.url}/ws/temp/{client.player_id}")
+        return client
+
+    async def setup(self):
+        host = await self._lobby_connection()
+        try:
+            created = await self.request(host, {
+                "type": "create-room",
+                "player_name": "Host",
+                "avatar": "👑"
+            }, "room-created")
+        finally:
+            await host.close()
+        self.room_code = created["room_code"]
+        player_ids = [created["player_id"]]
+
+        for seat in range(1, self.players):
+            guest = await self._lobby_connection()
+            try:
+                joined = await self.request(guest, {
+                    "type": "join-room",
+                    "room_code": self.room_code,
+                    "player_name": f"Guest {seat}",
+                    "avatar": "💎"
+                }, "player-joined")
+            finally:
+                await guest.close()
+            player_ids.append(joined["player"]["id"])
+
+        for player_id in player_ids:
+            client = LoadClient(self.stats, player_id)
+            await client.connect(f"{self.url}/ws/{self.room_code}/{player_id}")
+            self.clients[player_id] = client
+
+    async def play(self):
+        clients = list(self.clients.values())
+
+        for client in clients:
+            others = [other for other in clients if other is not client]
+            await self.request(client, {"type": "player-ready", "ready": True}, "room-updated",
+                               lambda message, pid=client.player_id: any(
+                                   p["id"] == pid and p["ready"] for p in message["room"]["players"]),
+                               others)
+
+        host = clients[0]
+        started = await self.request(host, {"type": "start-game"}, "game-started", watchers=clients[1:])
+        game_state = started["game_state"]
+        current = game_state["players"][game_state["current_player"]]["id"]
+        self.money = {player["id"]: player["money"] for player in game_state["players"]}
+
+        for turn in range(self.turns):
+            await self.take_turn(current)
+            client = self.clients[current]
+            others = [other for other in clients if other is not client]
+            ended = await self.request(client, {"type": "end-turn"}, "turn-ended", watchers=others)
+            current = ended["current_player_id"]
+            self.stats.turns += 1
+
+    async def take_turn(self, player_id: str):
+        client = self.clients[player_id]
+        others = [other for other in self.clients.values() if other is not client]
+
+        # The move follows the roll, so wait for it from before the roll is sent
+        is_move: Predicate = lambda message: message["player_id"] == player_id
+        watching = [(watcher, watcher.expect("player-moved", is_move)) for watcher in [client] + others]
+        try:
+            sent_at = time.perf_counter()
+            rolled = await self.request(client, {"type": "roll-dice"}, "dice-rolled", is_move, others)
+            self.track_money(rolled)
+            # A third double sends the player to jail without a move
+            if rolled.get("patch", {}).get("fields", {}).get("turn_phase") != "move":
+                return
+            results = await asyncio.wait_for(asyncio.gather(*(future for _, future in watching)),
+                                             timeout=RESPONSE_TIMEOUT)
+        finally:
+            for watcher, future in watching:
+                watcher.discard(future)
+        for received_at, _ in results[1:]:
+            self.stats.broadcast_lag["player-moved"].append(received_at - sent_at)
+        moved = results[0][1]
+        self.track_money(moved)
+
+        position = moved["new_position"]
+        square = BOARD[position]
+        if square.price and position not in self.owned and self.money.get(player_id, 0) >= square.price:
+            await self.request(client, {"type": "buy-property", "property_id": position}, "property-bought",
+                               lambda message: message["property_id"] == position, others)
+            self.owned[position] = player_id
+            self.money[player_id] -= square.price
+
+        if self.rng.random() < 0.2:
+            text = f"gg {uuid.uuid4().hex[:8]}"
+            await self.request(client, {"type": "send-chat", "message": text}, "chat-message",
+                               lambda message: message["message"] == text, others)
+
+    def track_money(self, message: dict):
+        for player in message.get("patch", {}).get("players", []):
+            self.money[player["id"]] = player["money"]
+
+    async def close(self):
+        await asyncio.gather(*(client.close() for client in self.clients.values()), return_exceptions=True)
+
+    async def run(self):
+        try:
+            await self.setup()
+            await self.play()
+            self.stats.rooms_completed += 1
+        except asyncio.TimeoutError:
+            self.stats.errors["timeout"] += 1
+        except Exception as e:
+            self.stats.errors[f"{type(e).__name__}: {e}"] += 1
+        finally:
+            await self.close()
+
+async def run_load(url: str, rooms: int, players: int, turns: int, ramp: float, seed: int) -> dict:
+    """Play all rooms concurrently, starting them evenly over the ramp-up period"""
+    stats = LoadStats()
+    rng = random.Random(seed)
+
+    async def start_room(index: int):
+        await asyncio.sleep(ramp * index / max(1, rooms))
+        await RoomSession(url, stats, players, turns, random.Random(rng.random())).run()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(start_room(index) for index in range(rooms)))
+    return stats.report(time.perf_counter() - start)
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(port: int, log_path: str = os.devnull) -> subprocess.Popen:
+    """Run the app under uvicorn on localhost and wait until it answers"""
+    env = dict(os.environ)
+    # Fail fast when no local MongoDB is running; persistence errors are only logged
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017/?serverSelectionTimeoutMS=500")
+    env.setdefault("DB_NAME", "loadgen")
+    # Simulated players act far faster than people; per-connection rate limits would throttle them
+    env.setdefault("WS_RATE_LIMIT_SCALE", "0")
+    log_file = open(log_path, "ab")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=log_file, stderr=subprocess.STDOUT
+    )
+    log_file.close()
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Server did not start within 30 seconds")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate websocket game traffic against the server")
+    parser.add_argument("--rooms", type=int, default=100)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--ramp", type=float, default=5.0, help="seconds over which rooms are started")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", default=None, help="target a running server, e.g. ws://127.0.0.1:8001")
+    parser.add_argument("--server-log", default=os.devnull, help="file for the spawned server's output")
+    parser.add_argument("--max-p99-ms", type=float, default=None, help="fail when any message type's p99 exceeds this")
+    args = parser.parse_args()
+
+    process = None
+    url = args.url
+    if url is None:
+        port = _free_port()
+        process = start_server(port, args.server_log)
+        url = f"ws://127.0.0.1:{port}"
+
+    try:
+        report = asyncio.run(run_load(url, args.rooms, args.players, args.turns, args.ramp, args.seed))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    print(json.dumps(report, indent=2))
+
+    failed = bool(report["errors"])
+    if args.max_p99_ms is not None:
+        slow = [kind for kind, summary in report["latency"].items() if summary["p99_ms"] > args.max_p99_ms]
+        if slow:
+            print(f"p99 above {args.max_p99_ms}ms for: {', '.join(slow)}", file=sys.stderr)
+            failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import os
+from typing import Dict, List, Optional, Tuple
+
+from models import Room
+from websocket_manager import encode_frame
+
+# Distinct filter/page combinations kept per lobby version
+PAGE_CACHE_SIZE = int(os.environ.get("LOBBY_PAGE_CACHE_SIZE", "128"))
+
+class LobbyIndex:
+    """Joinable rooms (not started, not full) with cached listing pages
+
+    Each room is serialized once when it changes, and pages are built by
+    joining those fragments, then kept until the next change. Polling an
+    unchanged lobby is a dict lookup.
+    """
+
+    def __init__(self, cache_size: int = PAGE_CACHE_SIZE):
+        self.cache_size = cache_size
+        # Room code -> (free seats, max players, serialized room), in creation order
+        self.rooms: Dict[str, Tuple[int, int, str]] = {}
+        self.version = 0
+        self._pages: Dict[tuple, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def is_joinable(room: Room) -> bool:
+        return not room.game_started and len(room.players) < room.max_players
+
+    def update(self, room: Room):
+        """Re-index a room after a join, leave, ready change or start"""
+        if self.is_joinable(room):
+            self.rooms[room.code] = (room.max_players - len(room.players), room.max_players, encode_frame(room.dict()))
+        elif self.rooms.pop(room.code, None) is None:
+            return
+        self._invalidate()
+
+    def remove(self, room_code: str):
+        if self.rooms.pop(room_code, None) is not None:
+            self._invalidate()
+
+    def _invalidate(self):
+        self.version += 1
+        self._pages.clear()
+
+    def matching(self, min_free_seats: int = 1, max_players: Optional[int] = None) -> List[str]:
+        """Serialized rooms passing the filters, in creation order"""
+        return [
+            entry for free, capacity, entry in self.rooms.values()
+            if free >= min_free_seats and (max_players is None or capacity <= max_players)
+        ]
+
+    def page(self, offset: int = 0, limit: int = 50, min_free_seats: int = 1,
+             max_players: Optional[int] = None) -> str:
+        """JSON body of one listing page"""
+        key = (offset, limit, min_free_seats, max_players)
+        body = self._pages.get(key)
+        if body is not None:
+            self.hits += 1
+            return body
+
+        self.misses += 1
+        body = render_page(self.matching(min_free_seats, max_players), offset, limit, self.version)
+        if len(self._pages) >= self.cache_size:
+            self._pages.clear()
+        self._pages[key] = body
+        return body
+
+    def stats(self) -> dict:
+        return {
+            "rooms": len(self.rooms),
+            "version": self.version,
+            "cached_pages": len(self._pages),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+def render_page(entries: List[str], offset: int, limit: int, version: int) -> str:
+    """Assemble a listing body from serialized rooms without re-encoding them"""
+    return (
+        '{"rooms":[' + ",".join(entries[offset:offset + limit]) + ']'
+        f',"total":{len(entries)},"offset":{offset},"limit":{limit},"version":{version}}}'
+    )
+
+# Global lobby index
+lobby = LobbyIndex()
@@ -0,0 +1,109 @@
+import asyncio
+import gzip
+import os
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+from game_engine import game_engine
+from models import GameState
+
+# Longest a state request may be parked waiting for a newer version
+LONG_POLL_MAX_WAIT = float(os.environ.get("LONG_POLL_MAX_WAIT", "25"))
+# Compressed bodies kept, one per game
+GZIP_CACHE_SIZE = int(os.environ.get("STATE_GZIP_CACHE_SIZE", "1024"))
+GZIP_LEVEL = 6
+
+# Distinguishes ETags across restarts, when snapshot revisions start over
+ETAG_EPOCH = uuid.uuid4().hex[:8]
+
+def state_etag(game: GameState) -> str:
+    """Strong ETag of a game's current snapshot"""
+    revision, version, log_seq = game.snapshot_key()
+    return f'"{ETAG_EPOCH}-{version}-{revision}-{log_seq}"'
+
+def gzip_etag(etag: str) -> str:
+    """Strong ETag of the gzip-encoded body; a different encoding needs its own validator"""
+    return f'{etag[:-1]}-gzip"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether If-None-Match names the snapshot of etag, in any encoding"""
+    if not if_none_match:
+        return False
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    # Weak comparison, as If-None-Match requires
+    return "*" in tags or any(tag in tags or f"W/{tag}" in tags for tag in (etag, gzip_etag(etag)))
+
+class VersionWatch:
+    """Wakes parked requests when a game publishes a new version
+
+    Waiters of a room share one Event, replaced after each notify, so a
+    version bump costs one set() however many requests are parked.
+    """
+
+    def __init__(self):
+        self.events: Dict[str, asyncio.Event] = {}
+        self.parked = 0
+        self.woken = 0
+        self.timeouts = 0
+
+    def notify(self, room_code: str):
+        event = self.events.pop(room_code, None)
+        if event is not None:
+            event.set()
+
+    async def wait(self, room_code: str, since_version: int, timeout: float) -> bool:
+        """Wait until the game's version passes since_version
+
+        Returns False on timeout. Also returns once the game is gone, so the
+        caller can answer 404.
+        """
+        deadline = time.monotonic() + min(timeout, LONG_POLL_MAX_WAIT)
+        self.parked += 1
+        try:
+            while True:
+                game = game_engine.get_game(room_code)
+                if game is None or game.version > since_version:
+                    self.woken += 1
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    return False
+                event = self.events.get(room_code)
+                if event is None:
+                    event = self.events[room_code] = asyncio.Event()
+                try:
+                    await asyncio.wait_for(event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.parked -= 1
+
+    def stats(self) -> dict:
+        return {
+            "parked": self.parked,
+            "woken": self.woken,
+            "timeouts": self.timeouts,
+        }
+
+class GzipCache:
+    """Latest gzip-compressed state body per game, keyed by ETag"""
+
+    def __init__(self, size: int = GZIP_CACHE_SIZE):
+        self.size = size
+        self.bodies: Dict[str, Tuple[str, bytes]] = {}
+
+    def compress(self, room_code: str, etag: str, body: str) -> bytes:
+        cached = self.bodies.get(room_code)
+        if cached is not None and cached[0] == etag:
+            return cached[1]
+        compressed = gzip.compress(body.encode(), GZIP_LEVEL)
+        if len(self.bodies) >= self.size and room_code not in self.bodies:
+            self.bodies.clear()
+        self.bodies[room_code] = (etag, compressed)
+        return compressed
+
+# Global version watch and compressed body cache
+version_watch = VersionWatch()
+gzip_cache = GzipCache()
@@ -0,0 +1,277 @@
+"""Pub/sub bus connecting server worker processes
+
+Workers publish room broadcasts and forward commands to each other through
+a MessageBus. Messages are JSON-compatible dicts delivered in publish order
+per publisher and channel; each channel is handled in its own task, so a
+slow handler on one room does not hold up the others. Two transports are included:
+
+    local://             in-process hub, for a single worker and for tests
+    unix:///path/to.sock hub process on a Unix socket, for workers on one host
+
+Start the Unix socket hub before the workers:
+
+    python message_bus.py /tmp/monopoly-bus.sock
+"""
+import argparse
+import asyncio
+import logging
+import os
+from collections import defaultdict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from wire_format import decode_json, encode_json
+
+logger = logging.getLogger(__name__)
+
+# Transport used by create_bus when no URL is given
+BUS_URL = os.environ.get("BUS_URL", "local://")
+# Largest frame accepted from the Unix socket hub
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+Handler = Callable[[dict], Awaitable[Any]]
+
+def encode_message(message: dict) -> bytes:
+    """Encode a bus message as one newline-terminated JSON line"""
+    return encode_json(message).encode() + b"\n"
+
+class MessageBus:
+    """Channel based publish/subscribe between workers"""
+
+    def __init__(self):
+        self.handlers: Dict[str, List[Handler]] = defaultdict(list)
+        # Messages received but not yet handled, and the task draining them, per channel
+        self._backlogs: Dict[str, Deque[dict]] = {}
+        self._drains: Set[asyncio.Task] = set()
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        await self._cancel_drains()
+
+    async def publish(self, channel: str, message: dict):
+        raise NotImplementedError
+
+    async def subscribe(self, channel: str, handler: Handler):
+        """Call handler for every message published on a channel"""
+        self.handlers[channel].append(handler)
+
+    async def unsubscribe(self, channel: str, handler: Handler):
+        handlers = self.handlers.get(channel)
+        if handlers and handler in handlers:
+            handlers.remove(handler)
+            if not handlers:
+                del self.handlers[channel]
+
+    def _deliver(self, channel: str, message: dict):
+        """Queue a received message behind the others of its channel without waiting for it"""
+        backlog = self._backlogs.get(channel)
+        if backlog is not None:
+            backlog.append(message)
+            return
+        self._backlogs[channel] = deque([message])
+        task = asyncio.create_task(self._drain(channel))
+        self._drains.add(task)
+        task.add_done_callback(self._drains.discard)
+
+    async def _drain(self, channel: str):
+        backlog = self._backlogs[channel]
+        try:
+            while backlog:
+                await self._dispatch(channel, backlog.popleft())
+        finally:
+            del self._backlogs[channel]
+
+    async def _cancel_drains(self):
+        drains = list(self._drains)
+        for task in drains:
+            task.cancel()
+        await asyncio.gather(*drains, return_exceptions=True)
+
+    async def _dispatch(self, channel: str, message: dict):
+        for handler in list(self.handlers.get(channel, ())):
+            try:
+                await handler(message)
+            except Exception as e:
+                logger.error(f"Error handling bus message on {channel}: {e}")
+
+class LocalHub:
+    """Routes messages between LocalBus instances in one process"""
+
+    def __init__(self):
+        self.buses: List["LocalBus"] = []
+
+class LocalBus(MessageBus):
+    """In-process bus; buses sharing a hub behave like separate workers
+
+    Messages are JSON round-tripped so that anything passing here would also
+    survive a real transport.
+    """
+
+    def __init__(self, hub: Optional[LocalHub] = None):
+        super().__init__()
+        self.hub = hub or LocalHub()
+        self.hub.buses.append(self)
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._cancel_drains()
+        if self in self.hub.buses:
+            self.hub.buses.remove(self)
+
+    async def publish(self, channel: str, message: dict):
+        data = encode_message(message)
+        for bus in self.hub.buses:
+            if channel in bus.handlers:
+                bus._queue.put_nowait((channel, data))
+
+    async def _run(self):
+        while True:
+            channel, data = await self._queue.get()
+            self._deliver(channel, decode_json(data))
+
+class UnixSocketHub:
+    """Fan-out hub the UnixSocketBus workers connect to
+
+    Each line a client sends is a JSON object with an op of sub, unsub or
+    pub; published lines are forwarded unchanged to every subscriber.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.subscribers: Dict[str, Set[asyncio.StreamWriter]] = defaultdict(set)
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path, limit=MAX_FRAME_SIZE)
+        logger.info(f"Message bus hub listening on {self.path}")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        channels: Set[str] = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                frame = decode_json(line)
+                op, channel = frame.get("op"), frame.get("channel")
+                if op == "sub":
+                    channels.add(channel)
+                    self.subscribers[channel].add(writer)
+                elif op == "unsub":
+                    channels.discard(channel)
+                    self.subscribers[channel].discard(writer)
+                elif op == "pub":
+                    for subscriber in list(self.subscribers.get(channel, ())):
+                        subscriber.write(line)
+        except Exception as e:
+            logger.error(f"Bus hub client error: {e}")
+        finally:
+            for channel in channels:
+                self.subscribers[channel].discard(writer)
+                if not self.subscribers[channel]:
+                    del self.subscribers[channel]
+            writer.close()
+
+    async def serve_forever(self):
+        await self.start()
+        await self._server.serve_forever()
+
+class UnixSocketBus(MessageBus):
+    """Bus client for a UnixSocketHub"""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._reader, self._writer = await asyncio.open_unix_connection(self.path, limit=MAX_FRAME_SIZE)
+            for channel in self.handlers:
+                self._send({"op": "sub", "channel": channel})
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._cancel_drains()
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+
+    def _send(self, frame: dict):
+        if self._writer is None:
+            raise ConnectionError("Message bus is not connected")
+        self._writer.write(encode_message(frame))
+
+    async def publish(self, channel: str, message: dict):
+        self._send({"op": "pub", "channel": channel, "message": message})
+        await self._writer.drain()
+
+    async def subscribe(self, channel: str, handler: Handler):
+        first = channel not in self.handlers
+        await super().subscribe(channel, handler)
+        if first and self._writer is not None:
+            self._send({"op": "sub", "channel": channel})
+            await self._writer.drain()
+
+    async def unsubscribe(self, channel: str, handler: Handler):
+        await super().unsubscribe(channel, handler)
+        if channel not in self.handlers and self._writer is not None:
+            self._send({"op": "unsub", "channel": channel})
+            await self._writer.drain()
+
+    async def _run(self):
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                logger.error("Message bus hub closed the connection")
+                return
+            frame = decode_json(line)
+            self._deliver(frame["channel"], frame["message"])
+
+def create_bus(url: str = BUS_URL) -> MessageBus:
+    """Build a bus from a local:// or unix:///path URL"""
+    if url.startswith("local://"):
+        return LocalBus()
+    if url.startswith("unix://"):
+        return UnixSocketBus(url[len("unix://"):])
+    raise ValueError(f"Unsupported message bus URL '{url}'")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Unix socket message bus hub")
+    parser.add_argument("path", help="socket path, e.g. /tmp/monopoly-bus.sock")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    asyncio.run(UnixSocketHub(args.path).serve_forever())
+
+if __name__ == "__main__":
+    main()
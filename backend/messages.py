@@ -0,0 +1,56 @@
+"""Payload schemas of inbound websocket messages
+
+Pydantic builds each validator once, when the class is defined, so
+checking a message is a single compiled call. Unknown fields, such as the
+roomCode and playerId some clients still send, are ignored.
+"""
+from typing import Annotated, List, Optional
+
+from pydantic import BaseModel, Field
+
+from board import BOARD_SIZE
+
+class CreateRoomMessage(BaseModel):
+    player_name: str = Field(min_length=1, max_length=32)
+    avatar: str = Field("👑", max_length=16)
+
+class JoinRoomMessage(BaseModel):
+    room_code: str = Field(min_length=1, max_length=32)
+    player_name: str = Field(min_length=1, max_length=32)
+    avatar: str = Field("💎", max_length=16)
+
+class PlayerReadyMessage(BaseModel):
+    ready: bool = False
+
+class BuyPropertyMessage(BaseModel):
+    property_id: int = Field(ge=0, lt=BOARD_SIZE)
+
+class BuildMessage(BaseModel):
+    property_id: int = Field(ge=0, lt=BOARD_SIZE)
+
+class MortgageMessage(BaseModel):
+    property_id: int = Field(ge=0, lt=BOARD_SIZE)
+
+class AddBotsMessage(BaseModel):
+    # Empty seats to fill; all of them when omitted
+    count: Optional[int] = Field(None, ge=1, le=8)
+
+class ChatMessagePayload(BaseModel):
+    message: str = Field(max_length=500)
+
+class TradeTerms(BaseModel):
+    from_properties: List[Annotated[int, Field(ge=0, lt=BOARD_SIZE)]] = Field([], max_length=BOARD_SIZE)
+    to_properties: List[Annotated[int, Field(ge=0, lt=BOARD_SIZE)]] = Field([], max_length=BOARD_SIZE)
+    from_money: int = Field(0, ge=0)
+    to_money: int = Field(0, ge=0)
+
+class TradeOfferMessage(BaseModel):
+    to_player_id: str = Field(min_length=1, max_length=64)
+    offer: TradeTerms
+
+class TradeResponseMessage(BaseModel):
+    trade_id: str = Field(min_length=1, max_length=64)
+    accept: bool
+
+class TradeCancelMessage(BaseModel):
+    trade_id: str = Field(min_length=1, max_length=64)
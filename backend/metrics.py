@@ -0,0 +1,249 @@
+"""In-process metrics rendered in the Prometheus text exposition format
+
+Instruments are created once at import time through the global registry
+and updated inline on hot paths, so recording is a dict lookup plus an
+increment; nothing is formatted until /api/metrics is scraped.
+"""
+import asyncio
+import bisect
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds between event-loop lag probes
+LOOP_LAG_INTERVAL = float(os.environ.get("METRICS_LOOP_LAG_INTERVAL", "0.5"))
+
+# Latency buckets in seconds, from 100us to 10s
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    """A named family of series keyed by label values"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return lines
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def get(self, *label_values: str) -> float:
+        return self.values.get(label_values, 0)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+            for key, value in sorted(self.values.items())
+        ]
+
+class Gauge(Metric):
+    """Current value, either set directly or read from a callback at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, help_text, labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self.callback = callback
+
+    def set(self, value: float, *label_values: str):
+        self.values[label_values] = value
+
+    def samples(self) -> List[str]:
+        if self.callback is not None:
+            try:
+                self.values[()] = self.callback()
+            except Exception as e:
+                logger.error(f"Error reading gauge {self.name}: {e}")
+        return [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+            for key, value in sorted(self.values.items())
+        ]
+
+class HistogramSeries:
+    """Bucket counts, sum and count of one label combination"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # One slot per bucket plus the +Inf overflow
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class Histogram(Metric):
+    """Distribution of observed values over fixed buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[Tuple[str, ...], HistogramSeries] = {}
+
+    def observe(self, value: float, *label_values: str):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = HistogramSeries(self.buckets)
+        series.observe(value)
+
+    def child(self, *label_values: str) -> HistogramSeries:
+        """The series of fixed label values, for hot paths that observe it directly"""
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = HistogramSeries(self.buckets)
+        return series
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series.counts):
+                cumulative += count
+                labels = _format_labels(self.labels, key, 'le="' + _format_value(bound) + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(series.sum)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {series.count}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def _add(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Sequence[str] = (),
+              callback: Optional[Callable[[], float]] = None) -> Gauge:
+        return self._add(Gauge(name, help_text, labels, callback))
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help_text, labels, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format"""
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a sleeping task
+
+    A probe sleeps for a fixed interval; anything beyond it is time the loop
+    spent running other callbacks, which is the delay every handler sees.
+    """
+
+    def __init__(self, histogram: Histogram, gauge: Gauge, interval: float = LOOP_LAG_INTERVAL):
+        self.histogram = histogram
+        self.gauge = gauge
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            self.histogram.observe(lag)
+            self.gauge.set(lag)
+
+# Global metrics registry
+registry = MetricsRegistry()
+
+# Websocket handlers
+message_seconds = registry.histogram(
+    "ws_message_seconds", "Time to handle an inbound websocket message", ("type",))
+message_errors = registry.counter(
+    "ws_message_errors_total", "Inbound websocket messages answered with an error", ("type",))
+
+# Outbound frames
+encode_seconds = registry.histogram(
+    "ws_encode_seconds", "Time to encode an outbound message", ("type",))
+sent_bytes = registry.counter(
+    "ws_sent_bytes_total", "Bytes written to websockets", ("type",))
+sent_messages = registry.counter(
+    "ws_sent_messages_total", "Frames written to websockets", ("type",))
+send_failures = registry.counter(
+    "ws_send_failures_total", "Websocket sends that failed or timed out")
+broadcast_seconds = registry.histogram(
+    "ws_broadcast_seconds", "Time to fan a frame out to every socket in a room")
+broadcast_recipients = registry.histogram(
+    "ws_broadcast_recipients", "Sockets reached by one room broadcast", buckets=(1, 2, 3, 4, 6, 8, 16, 32))
+
+# Engine commands
+command_seconds = registry.histogram(
+    "engine_command_seconds", "Time spent in an engine command", ("command",))
+command_errors = registry.counter(
+    "engine_command_errors_total", "Engine commands that raised", ("command",))
+
+# Event loop
+loop_lag_seconds = registry.histogram(
+    "event_loop_lag_seconds", "How late the event loop woke a periodic probe")
+loop_lag_last = registry.gauge(
+    "event_loop_lag_last_seconds", "Lag measured by the latest event-loop probe")
+loop_monitor = LoopLagMonitor(loop_lag_seconds, loop_lag_last)
@@ -1,7 +1,15 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, computed_field
+from typing import List, Optional, Dict, Any, Set
 from datetime import datetime
+import copy
+import random
 import uuid
+from state_delta import ChangeSet
+from game_index import GameIndex
+from board import BoardState
+from game_log import GameLog, LIVE_LOG_SIZE
+from command_log import CommandLog
+from wire_format import encode_json
 
 class Player(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -17,6 +25,9 @@ class Player(BaseModel):
     ready: bool = False
     connected: bool = True
     get_out_of_jail_cards: int = 0
+    doubles_count: int = 0
+    # Seat played by the server
+    is_bot: bool = False
 
 class Property(BaseModel):
     id: int
@@ -49,13 +60,14 @@ class Card(BaseModel):
 
 class TradeOffer(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    room_code: str = ""
     from_player_id: str
     to_player_id: str
     from_properties: List[int] = []
     to_properties: List[int] = []
     from_money: int = 0
     to_money: int = 0
-    status: str = "pending"  # pending, accepted, rejected
+    status: str = "pending"  # pending, accepted, rejected, cancelled, expired
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class Room(BaseModel):
@@ -77,15 +89,189 @@ class GameState(BaseModel):
     players: List[Player] = []
     dice_values: List[int] = [1, 1]
     turn_phase: str = "roll"  # roll, move, action, trade, endTurn
-    properties: List[Property] = []
     chance_cards: List[Card] = []
     community_chest_cards: List[Card] = []
-    game_log: List[str] = []
+    # Position of the next card to draw in each deck
+    chance_index: int = 0
+    community_chest_index: int = 0
     winner: Optional[str] = None
     game_started: bool = False
     game_ended: bool = False
     houses_remaining: int = 32
     hotels_remaining: int = 12
+    version: int = 0
+
+    # Engine runtime state lives in slots rather than pydantic private
+    # attributes: the engine reads these on every command, and slot access
+    # avoids the private attribute lookup. None of it is serialized.
+    #   _board:    owner, buildings and mortgage flags per square (static data in board.BOARD)
+    #   _log:      structured log events; only the most recent ones ship with the state
+    #   _rng:      per-game dice and shuffle source, seeded from the command log
+    #   _commands: seed, starting players and accepted commands for replay
+    #   _changes:  changes not yet published as a patch
+    #   _index:    id, owner and group lookups maintained by the engine
+    #   _revision: bumped by every engine command and by touch(); keys the snapshot cache
+    #   _snapshot: (key, serialized state, encoded JSON) reused until the game changes
+    #   _rng_state: (revision, RNG state) handed to forks until the game changes
+    #   _watcher:  set that touch() adds the room code to, so the store finds changed games
+    # Hot paths write them with object.__setattr__, skipping pydantic's __setattr__.
+    __slots__ = ("_board", "_log", "_rng", "_commands", "_changes", "_index", "_revision", "_snapshot", "_rng_state",
+                 "_watcher")
+
+    def __init__(self, **data: Any):
+        # Board state and log are restored from a serialized game; standings are derived
+        properties = data.pop("properties", None)
+        game_log = data.pop("game_log", None)
+        data.pop("standings", None)
+        super().__init__(**data)
+        if game_log:
+            self._log.load(game_log)
+            self._changes.reset(self._log.next_seq)
+        if properties:
+            self._board = BoardState.from_properties(properties)
+            self._index.rebuild(self)
+
+    def model_post_init(self, __context: Any):
+        self._board = BoardState()
+        self._log = GameLog()
+        self._rng = random.Random()
+        self._commands = CommandLog()
+        self._changes = ChangeSet()
+        self._index = GameIndex(self)
+        self._revision = 0
+        self._snapshot = None
+        self._rng_state = None
+        self._watcher = None
+
+    def __copy__(self):
+        clone = super().__copy__()
+        for name in GameState.__slots__:
+            object.__setattr__(clone, name, getattr(self, name))
+        # Only the tracked object reports its changes
+        object.__setattr__(clone, "_watcher", None)
+        return clone
+
+    def __deepcopy__(self, memo: Optional[Dict[int, Any]] = None):
+        clone = super().__deepcopy__(memo)
+        for name in GameState.__slots__:
+            if name != "_watcher":
+                object.__setattr__(clone, name, copy.deepcopy(getattr(self, name), memo))
+        # The clone serializes its own state on demand, and nothing watches it
+        clone._snapshot = None
+        clone._watcher = None
+        # Index entries must point at the cloned players
+        clone._index.rebuild(clone)
+        return clone
+
+    def fork(self, room_code: Optional[str] = None) -> "GameState":
+        """Cheap copy to apply commands to without touching this game
+
+        Only what commands mutate is copied: the players, the square
+        arrays, the indexes and the RNG. Decks, static square data, the
+        starting players and the recorded commands are shared, and the log
+        keeps just its live tail. Forking repeatedly from an unchanged game
+        reuses one copy of the RNG state.
+        """
+        fork = super().__copy__()
+        players = []
+        for player in self.players:
+            player = player.__copy__()
+            player.__dict__["properties"] = player.properties.copy()
+            players.append(player)
+        fork.__dict__["players"] = players
+        if room_code is not None:
+            fork.__dict__["room_code"] = room_code
+
+        cached = self._rng_state
+        if cached is None or cached[0] != self._revision:
+            cached = (self._revision, self._rng.getstate())
+            object.__setattr__(self, "_rng_state", cached)
+        rng = random.Random.__new__(random.Random)
+        rng.setstate(cached[1])
+
+        object.__setattr__(fork, "_board", self._board.copy())
+        object.__setattr__(fork, "_log", self._log.fork())
+        object.__setattr__(fork, "_rng", rng)
+        object.__setattr__(fork, "_commands", self._commands.fork())
+        object.__setattr__(fork, "_changes", ChangeSet(self._log.next_seq))
+        object.__setattr__(fork, "_index", self._index.fork(players))
+        object.__setattr__(fork, "_revision", 0)
+        object.__setattr__(fork, "_snapshot", None)
+        object.__setattr__(fork, "_rng_state", None)
+        object.__setattr__(fork, "_watcher", None)
+        return fork
+
+    def touch(self):
+        """Invalidate the cached snapshot and report the change to the watcher
+
+        Engine commands call this after every call, and patches when they
+        bump the version.
+        """
+        object.__setattr__(self, "_revision", self._revision + 1)
+        if self._watcher is not None:
+            self._watcher.add(self.room_code)
+
+    def watch(self, changed: Optional[Set[str]]):
+        """Add the room code to changed on every touch from now on; None stops it"""
+        object.__setattr__(self, "_watcher", changed)
+
+    def snapshot_key(self) -> tuple:
+        """Identifies the current state; changes whenever the snapshot would"""
+        return (self._revision, self.version, self._log.next_seq)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Serialized state, reused until the game changes; callers must not mutate it"""
+        key = self.snapshot_key()
+        cached = self._snapshot
+        if cached is None or cached[0] != key:
+            cached = (key, self.dict(), None)
+            object.__setattr__(self, "_snapshot", cached)
+        return cached[1]
+
+    def snapshot_json(self) -> str:
+        """JSON encoding of snapshot(), reused until the game changes"""
+        state = self.snapshot()
+        key, _, encoded = self._snapshot
+        if encoded is None:
+            encoded = encode_json(state)
+            object.__setattr__(self, "_snapshot", (key, state, encoded))
+        return encoded
+
+    @computed_field
+    @property
+    def properties(self) -> List[Property]:
+        """Property views built on demand from the board state"""
+        return self._board.views()
+
+    @computed_field
+    @property
+    def game_log(self) -> List[Dict[str, Any]]:
+        """Most recent log entries; older ones are paged through the log API"""
+        return [event.to_dict() for event in self._log.recent(LIVE_LOG_SIZE)]
+
+    @computed_field
+    @property
+    def standings(self) -> List[Dict[str, Any]]:
+        """Players ranked by net worth, read from the aggregates the index keeps current"""
+        index = self._index
+        standings = []
+        for player in self.players:
+            property_value = index.property_values.get(player.id, 0)
+            building_value = index.building_values.get(player.id, 0)
+            standings.append({
+                "player_id": player.id,
+                "name": player.name,
+                "money": player.money,
+                "property_value": property_value,
+                "building_value": building_value,
+                "net_worth": player.money + property_value + building_value,
+                "monopolies": index.monopolies_of(player.id),
+            })
+        # Stable sort, so ties keep seat order
+        standings.sort(key=lambda entry: -entry["net_worth"])
+        for rank, entry in enumerate(standings, 1):
+            entry["rank"] = rank
+        return standings
 
 class ChatMessage(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
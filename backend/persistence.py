@@ -0,0 +1,295 @@
+import asyncio
+import inspect
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from pymongo import DeleteOne, ReplaceOne
+from command_log import CommandLog
+from models import GameState, Room, TradeOffer
+from replay import Replayer
+from trades import TradeBook
+
+logger = logging.getLogger(__name__)
+
+# Seconds between write-behind flushes
+FLUSH_INTERVAL = float(os.environ.get("PERSIST_FLUSH_INTERVAL", "1"))
+
+async def _resolve(value: Any) -> Any:
+    """Await motor results; pass through synchronous (pymongo/mongomock) ones"""
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+async def _find_all(collection, query: dict) -> List[dict]:
+    cursor = collection.find(query)
+    if hasattr(cursor, "to_list"):
+        return await _resolve(cursor.to_list(length=None))
+    return list(cursor)
+
+def game_document(game: GameState, trades: Iterable[TradeOffer] = ()) -> dict:
+    """Serialize a game with its whole retained log, command log and open trade offers, keyed by room code"""
+    # Copy the cached snapshot, which is shared with outbound frames
+    document = dict(game.snapshot())
+    document["game_log"] = [event.to_dict() for event in game._log.since(0)]
+    document["commands"] = game._commands.to_dict()
+    document["trades"] = [trade.dict() for trade in trades]
+    document["_id"] = game.room_code
+    return document
+
+def detach_game(game: GameState) -> GameState:
+    """Copy of a game that can be serialized off the event loop while the game plays on
+
+    A fork copies only what commands mutate; the log is copied whole,
+    since a fork keeps just its live tail.
+    """
+    detached = game.fork()
+    object.__setattr__(detached, "_log", game._log.copy())
+    return detached
+
+def open_trades(book: TradeBook, game: GameState) -> List[TradeOffer]:
+    """Copies of a game's open offers, oldest first"""
+    trade_ids = set()
+    for player in game.players:
+        trade_ids |= book.sent_by(player.id)
+    trades = [book.get(trade_id) for trade_id in trade_ids]
+    return sorted((trade.copy() for trade in trades if trade.room_code == game.room_code),
+                  key=lambda trade: trade.created_at)
+
+def room_document(room: Room) -> dict:
+    document = room.dict()
+    document["_id"] = room.code
+    return document
+
+class PersistenceStats:
+    """Counters for the write-behind flush loop"""
+
+    __slots__ = ("flushes", "failures", "games_written", "rooms_written", "deletes", "games_archived",
+                 "last_flush_seconds")
+
+    def __init__(self):
+        self.flushes = 0
+        self.failures = 0
+        self.games_written = 0
+        self.rooms_written = 0
+        self.deletes = 0
+        self.games_archived = 0
+        self.last_flush_seconds = 0.0
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class WriteBehindStore:
+    """Batches dirty games and rooms and flushes them with bulk upserts
+
+    Handlers only mark objects dirty, which is a dict assignment; the
+    database is touched from the background flush loop. The latest object
+    for a key wins, so many mutations between flushes cost one write.
+    Works with a motor database or a synchronous pymongo/mongomock one.
+
+    Games, once marked, stay tracked until deleted: every touch of a
+    tracked game adds its room code to the store's changed set, so changes
+    made by bot turns, trade expiry or any other path are saved without
+    being marked. A flush looks only at changed games and writes those
+    whose snapshot key moved since their last write. Flushes copy dirty
+    games on the loop and serialize the copies on an executor thread.
+    """
+
+    def __init__(self, db, trades: Optional[TradeBook] = None, flush_interval: float = FLUSH_INTERVAL):
+        self.games = db["games"]
+        self.rooms = db["rooms"]
+        self.archived_games = db["archived_games"]
+        self.trades = trades if trades is not None else TradeBook()
+        self.flush_interval = flush_interval
+        self.stats = PersistenceStats()
+        # Tracked games and the snapshot key each was last written at
+        self._games: Dict[str, GameState] = {}
+        self._written: Dict[str, tuple] = {}
+        # Codes of tracked games touched since the last flush; the games add to it themselves
+        self._changed: Set[str] = set()
+        self._dirty_rooms: Dict[str, Room] = {}
+        self._deleted_games: Set[str] = set()
+        self._deleted_rooms: Set[str] = set()
+        self._archived: Dict[str, GameState] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def mark_game(self, game: GameState):
+        """Schedule a game to be written on the next flush, and whenever it changes after"""
+        self._track(game)
+        self._written.pop(game.room_code, None)
+        self._changed.add(game.room_code)
+
+    def track_game(self, game: GameState):
+        """Track a game already stored as it is, such as one just loaded"""
+        self._track(game)
+        self._written[game.room_code] = game.snapshot_key()
+
+    def _track(self, game: GameState):
+        self._deleted_games.discard(game.room_code)
+        replaced = self._games.get(game.room_code)
+        if replaced is not None and replaced is not game:
+            replaced.watch(None)
+        self._games[game.room_code] = game
+        game.watch(self._changed)
+
+    def mark_room(self, room: Room):
+        """Schedule a room to be written on the next flush"""
+        self._deleted_rooms.discard(room.code)
+        self._dirty_rooms[room.code] = room
+
+    def delete_game(self, room_code: str):
+        """Schedule a game to be removed on the next flush"""
+        game = self._games.pop(room_code, None)
+        if game is not None:
+            game.watch(None)
+        self._written.pop(room_code, None)
+        self._changed.discard(room_code)
+        self._deleted_games.add(room_code)
+
+    def delete_room(self, room_code: str):
+        """Schedule a room to be removed on the next flush"""
+        self._dirty_rooms.pop(room_code, None)
+        self._deleted_rooms.add(room_code)
+
+    def archive_game(self, game: GameState):
+        """Copy a game to the archive and remove it from the live collection on the next flush"""
+        self._archived[game.room_code] = game
+        self.delete_game(game.room_code)
+
+    def _dirty_games(self) -> List[GameState]:
+        # Cross-check the keys, so a game touched but already written at this state is skipped
+        games, written = self._games, self._written
+        return [games[code] for code in self._changed
+                if code in games and written.get(code) != games[code].snapshot_key()]
+
+    @property
+    def pending(self) -> int:
+        """Number of writes waiting for the next flush"""
+        return (len(self._dirty_games()) + len(self._dirty_rooms)
+                + len(self._deleted_games) + len(self._deleted_rooms) + len(self._archived))
+
+    def _capture(self, game: GameState) -> Tuple[GameState, List[TradeOffer]]:
+        return detach_game(game), open_trades(self.trades, game)
+
+    async def flush(self) -> int:
+        """Write all pending changes; returns the number of operations sent"""
+        games = self._dirty_games()
+        if not (games or self._dirty_rooms or self._deleted_games or self._deleted_rooms or self._archived):
+            return 0
+
+        # Copied on the loop, between commands, so each copy is a consistent state
+        keys = {game.room_code: game.snapshot_key() for game in games}
+        captured = [self._capture(game) for game in games]
+        self._changed.clear()
+        rooms, self._dirty_rooms = self._dirty_rooms, {}
+        deleted_games, self._deleted_games = self._deleted_games, set()
+        deleted_rooms, self._deleted_rooms = self._deleted_rooms, set()
+        archived, self._archived = self._archived, {}
+        captured_archive = [self._capture(game) for game in archived.values()]
+        # Rooms are small and serialize in place
+        room_ops = [ReplaceOne({"_id": code}, room_document(room), upsert=True) for code, room in rooms.items()]
+        room_ops += [DeleteOne({"_id": code}) for code in deleted_rooms]
+
+        def game_ops_for(games: List[Tuple[GameState, List[TradeOffer]]]) -> list:
+            return [ReplaceOne({"_id": game.room_code}, game_document(game, trades), upsert=True)
+                    for game, trades in games]
+
+        # Serializing whole games is the costly part, so it runs off the loop
+        loop = asyncio.get_running_loop()
+        game_ops, archive_ops = await asyncio.gather(
+            loop.run_in_executor(None, game_ops_for, captured),
+            loop.run_in_executor(None, game_ops_for, captured_archive)
+        )
+        game_ops += [DeleteOne({"_id": code}) for code in deleted_games]
+
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(
+                self._bulk_write(self.games, game_ops),
+                self._bulk_write(self.rooms, room_ops),
+                self._bulk_write(self.archived_games, archive_ops)
+            )
+        except Exception as e:
+            logger.error(f"Error flushing {len(game_ops) + len(room_ops) + len(archive_ops)} writes: {e}")
+            self.stats.failures += 1
+            # Games not written keep their old keys, so the next flush picks them up again
+            self._changed.update(keys)
+            self._requeue(rooms, deleted_games, deleted_rooms)
+            for code, game in archived.items():
+                self._archived.setdefault(code, game)
+            return 0
+
+        for code, key in keys.items():
+            if code in self._games:
+                self._written[code] = key
+        self.stats.flushes += 1
+        self.stats.games_written += len(games)
+        self.stats.rooms_written += len(rooms)
+        self.stats.deletes += len(deleted_games) + len(deleted_rooms)
+        self.stats.games_archived += len(archived)
+        self.stats.last_flush_seconds = time.perf_counter() - start
+        return len(game_ops) + len(room_ops) + len(archive_ops)
+
+    @staticmethod
+    async def _bulk_write(collection, ops: list):
+        if ops:
+            await _resolve(collection.bulk_write(ops, ordered=False))
+
+    def _requeue(self, rooms, deleted_games, deleted_rooms):
+        # Anything marked again since the swap is newer and takes precedence
+        for code, room in rooms.items():
+            if code not in self._deleted_rooms:
+                self._dirty_rooms.setdefault(code, room)
+        self._deleted_games.update(code for code in deleted_games if code not in self._games)
+        self._deleted_rooms.update(code for code in deleted_rooms if code not in self._dirty_rooms)
+
+    async def load_games(self) -> List[GameState]:
+        """Load every game that has not ended
+
+        Games are rebuilt by replaying their commands, which also restores
+        the RNG; documents without a command log are loaded as stored.
+        """
+        replayer = Replayer()
+        games = []
+        for document in await _find_all(self.games, {"game_ended": False}):
+            if document.get("commands"):
+                game = replayer.replay(document["room_code"], CommandLog.from_dict(document["commands"]))
+                game.version = document.get("version", game.version)
+            else:
+                game = GameState(**document)
+            games.append(game)
+        return games
+
+    async def load_trades(self) -> List[TradeOffer]:
+        """Load the open trade offers of every game that has not ended"""
+        return [TradeOffer(**trade) for document in await _find_all(self.games, {"game_ended": False})
+                for trade in document.get("trades", ())]
+
+    async def load_rooms(self) -> List[Room]:
+        """Load every stored room"""
+        return [Room(**document) for document in await _find_all(self.rooms, {})]
+
+    def start(self):
+        """Start the background flush loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and write whatever is still pending"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Write-behind flush failed: {e}")
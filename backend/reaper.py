@@ -0,0 +1,193 @@
+import asyncio
+import heapq
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds a room or unfinished game may sit without activity or connected players
+IDLE_TTL = float(os.environ.get("REAPER_IDLE_TTL", "1800"))
+# Seconds a finished game is kept for late viewers
+FINISHED_GAME_TTL = float(os.environ.get("REAPER_FINISHED_GAME_TTL", "600"))
+# Seconds a pending trade offer stays open
+TRADE_TTL = float(os.environ.get("REAPER_TRADE_TTL", "300"))
+# Seconds between reaper passes
+REAPER_INTERVAL = float(os.environ.get("REAPER_INTERVAL", "30"))
+# Archive games before evicting them
+ARCHIVE_ENABLED = os.environ.get("REAPER_ARCHIVE", "0").lower() in ("1", "true", "yes")
+
+class ExpiryTracker:
+    """Deadlines per key, found without scanning every key
+
+    Touching a key only updates its deadline; each key has at most one live
+    heap entry, which is pushed back to the current deadline when it comes
+    due early. A pass costs O((expired + rescheduled) log n).
+    """
+
+    def __init__(self):
+        self.deadlines: Dict[str, float] = {}
+        # Deadline of each key's live heap entry; other entries are stale
+        self._scheduled: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self.deadlines)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.deadlines
+
+    def touch(self, key: str, deadline: float):
+        """Set a key's deadline, replacing any earlier or later one"""
+        self.deadlines[key] = deadline
+        scheduled = self._scheduled.get(key)
+        if scheduled is None or deadline < scheduled:
+            self._scheduled[key] = deadline
+            heapq.heappush(self._heap, (deadline, key))
+
+    def discard(self, key: str):
+        """Stop tracking a key; its heap entry is dropped lazily"""
+        self.deadlines.pop(key, None)
+        self._scheduled.pop(key, None)
+
+    def expired(self, now: float) -> List[str]:
+        """Remove and return every key whose deadline has passed"""
+        heap = self._heap
+        due = []
+        while heap and heap[0][0] <= now:
+            deadline, key = heapq.heappop(heap)
+            if self._scheduled.get(key) != deadline:
+                continue
+            del self._scheduled[key]
+
+            current = self.deadlines.get(key)
+            if current is None:
+                continue
+            if current > now:
+                self._scheduled[key] = current
+                heapq.heappush(heap, (current, key))
+            else:
+                del self.deadlines[key]
+                due.append(key)
+        return due
+
+class ReapKind:
+    """How one kind of object expires and is evicted"""
+
+    def __init__(self, ttl: float, evict: Callable[[str], Awaitable[bool]],
+                 archive: Optional[Callable[[str], Awaitable[None]]] = None):
+        self.ttl = ttl
+        # Returns False when the object turned out to be in use and was kept
+        self.evict = evict
+        self.archive = archive
+        self.tracker = ExpiryTracker()
+        self.evicted = 0
+        self.kept = 0
+        self.archived = 0
+        self.errors = 0
+
+class Reaper:
+    """Evicts rooms, games and trades once their TTL passes without activity"""
+
+    def __init__(self, interval: float = REAPER_INTERVAL, archive: bool = ARCHIVE_ENABLED):
+        self.interval = interval
+        self.archive_enabled = archive
+        self.kinds: Dict[str, ReapKind] = {}
+        self.passes = 0
+        self.last_pass_seconds = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, kind: str, ttl: float, evict: Callable[[str], Awaitable[bool]],
+                 archive: Optional[Callable[[str], Awaitable[None]]] = None):
+        self.kinds[kind] = ReapKind(ttl, evict, archive)
+
+    def touch(self, kind: str, key: str, ttl: Optional[float] = None):
+        """Record activity, pushing the key's expiry out by its TTL"""
+        reap_kind = self.kinds[kind]
+        reap_kind.tracker.touch(key, time.monotonic() + (reap_kind.ttl if ttl is None else ttl))
+
+    def forget(self, kind: str, key: str):
+        """Stop tracking an object removed by other means"""
+        self.kinds[kind].tracker.discard(key)
+
+    def is_tracked(self, kind: str, key: str) -> bool:
+        return key in self.kinds[kind].tracker
+
+    async def reap(self, now: Optional[float] = None) -> int:
+        """Evict everything that has expired; returns the number evicted"""
+        start = time.perf_counter()
+        now = time.monotonic() if now is None else now
+        evicted = 0
+        for name, kind in self.kinds.items():
+            for key in kind.tracker.expired(now):
+                try:
+                    removed = await kind.evict(key)
+                    if not removed:
+                        kind.kept += 1
+                except Exception as e:
+                    logger.error(f"Error evicting {name} {key}: {e}")
+                    kind.errors += 1
+                    removed = False
+                if not removed:
+                    # Tried again after another TTL; activity during eviction may already have rescheduled it
+                    if key not in kind.tracker:
+                        kind.tracker.touch(key, now + kind.ttl)
+                    continue
+                kind.evicted += 1
+                evicted += 1
+
+        self.passes += 1
+        self.last_pass_seconds = time.perf_counter() - start
+        if evicted:
+            logger.info(f"Reaper evicted {evicted} objects in {self.last_pass_seconds * 1000:.2f}ms")
+        return evicted
+
+    async def archive(self, kind: str, key: str):
+        """Archive an object before eviction when archival is enabled"""
+        reap_kind = self.kinds[kind]
+        if self.archive_enabled and reap_kind.archive:
+            await reap_kind.archive(key)
+            reap_kind.archived += 1
+
+    def start(self):
+        """Start the background reaper loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.reap()
+            except Exception as e:
+                logger.error(f"Reaper pass failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "passes": self.passes,
+            "last_pass_seconds": self.last_pass_seconds,
+            "archive_enabled": self.archive_enabled,
+            "kinds": {
+                name: {
+                    "tracked": len(kind.tracker),
+                    "evicted": kind.evicted,
+                    "kept": kind.kept,
+                    "archived": kind.archived,
+                    "errors": kind.errors,
+                }
+                for name, kind in self.kinds.items()
+            },
+        }
+
+# Global reaper instance
+reaper = Reaper()
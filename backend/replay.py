@@ -0,0 +1,79 @@
+"""Deterministic replay of games from their command logs
+
+A game is fully described by its seed, starting players and accepted
+commands, so re-applying the commands through MonopolyGameEngine rebuilds
+the exact GameState, including RNG and deck positions.
+
+Replay calls the engine methods underneath the command decorator, so
+re-applied commands are not timed, recorded or touched one by one, and
+the game tracks no patch changes until it is rebuilt.
+"""
+from typing import Callable, Dict, Iterable, List, Optional
+
+from command_log import CommandLog
+from game_engine import MonopolyGameEngine
+from models import GameState, Player
+from state_delta import NullChangeSet
+
+class Replayer:
+    """Rebuilds games on a private engine instance"""
+
+    def __init__(self):
+        self.engine = MonopolyGameEngine()
+        # Undecorated engine methods by command name
+        self._methods: Dict[str, Callable] = {}
+
+    def replay(self, room_code: str, commands: CommandLog, to_version: Optional[int] = None,
+               upto: Optional[int] = None) -> GameState:
+        """Rebuild a game as of a state version or after the first `upto` commands
+
+        State version v is the state after every command applied while the
+        game was at a version below v.
+        """
+        events = commands.events
+        count = len(events) if upto is None else min(upto, len(events))
+        if to_version is not None:
+            count = next((i for i, event in enumerate(events[:count]) if event.version >= to_version), count)
+
+        engine = self.engine
+        players = [Player(**player) for player in commands.players]
+        game = engine.create_game(room_code, players, seed=commands.seed)
+        log, changes = game._commands, game._changes
+        methods = self._methods
+        log.replaying = True
+        object.__setattr__(game, "_changes", NullChangeSet())
+        try:
+            for event in events[:count]:
+                method = methods.get(event.command)
+                if method is None:
+                    method = methods[event.command] = getattr(MonopolyGameEngine, event.command).__wrapped__
+                method(engine, room_code, *event.args)
+        finally:
+            log.replaying = False
+            object.__setattr__(game, "_changes", changes)
+            engine.games.pop(room_code, None)
+            game.touch()
+
+        # The rebuilt game can keep recording commands from here on
+        log.events = events[:count]
+        if to_version is not None:
+            game.version = to_version
+        elif count:
+            game.version = events[count - 1].version
+        game._changes.reset(game._log.next_seq)
+        return game
+
+    def replay_many(self, games: Iterable[GameState]) -> List[GameState]:
+        """Rebuild several games from their command logs"""
+        return [self.replay(game.room_code, game._commands) for game in games]
+
+def replay_game(room_code: str, commands: CommandLog, to_version: Optional[int] = None,
+                upto: Optional[int] = None) -> GameState:
+    """Rebuild a game from its command log"""
+    return Replayer().replay(room_code, commands, to_version, upto)
+
+def verify_replay(game: GameState) -> bool:
+    """Check that replaying a game's commands reproduces its current state"""
+    rebuilt = replay_game(game.room_code, game._commands)
+    rebuilt.version = game.version
+    return rebuilt.dict() == game.dict() and rebuilt._rng.getstate() == game._rng.getstate()
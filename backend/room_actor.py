@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Commands a room may have waiting before new ones are rejected
+MAX_QUEUE_DEPTH = int(os.environ.get("ROOM_QUEUE_MAX_DEPTH", "256"))
+# Seconds an idle room worker waits before shutting down
+IDLE_TIMEOUT = float(os.environ.get("ROOM_WORKER_IDLE_TIMEOUT", "60"))
+
+Command = Callable[[], Awaitable[Any]]
+
+class RoomBusyError(Exception):
+    """Raised when a room's command queue is full"""
+
+class RoomActor:
+    """Runs the commands of one room one at a time, in arrival order"""
+
+    def __init__(self, room_code: str, registry: "RoomActorRegistry"):
+        self.room_code = room_code
+        self.registry = registry
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=registry.max_depth)
+        self.closed = False
+        self.processed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+        self.max_latency = 0.0
+        self.last_latency = 0.0
+        self._task = asyncio.create_task(self._run())
+
+    @property
+    def depth(self) -> int:
+        """Commands waiting to run, excluding the running one"""
+        return self.queue.qsize()
+
+    def submit(self, command: Command) -> asyncio.Future:
+        """Queue a command; the returned future resolves with its result"""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((command, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            raise RoomBusyError(f"Room {self.room_code} is busy, try again")
+        return future
+
+    async def _run(self):
+        while True:
+            try:
+                command, future, queued_at = await asyncio.wait_for(
+                    self.queue.get(), timeout=self.registry.idle_timeout)
+            except asyncio.TimeoutError:
+                if self.queue.empty():
+                    # No await between the check and closing, so nothing can slip in
+                    self.closed = True
+                    self.registry._remove(self)
+                    logger.debug(f"Room {self.room_code} worker stopped after idling")
+                    return
+                continue
+
+            started_at = time.perf_counter()
+            try:
+                result = await command()
+            except Exception as e:
+                self.failed += 1
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finished_at = time.perf_counter()
+
+            latency = finished_at - queued_at
+            self.processed += 1
+            self.total_wait += started_at - queued_at
+            self.total_run += finished_at - started_at
+            self.last_latency = latency
+            if latency > self.max_latency:
+                self.max_latency = latency
+
+    def stop(self):
+        """Stop the worker; queued commands are cancelled"""
+        self.closed = True
+        self._task.cancel()
+        while not self.queue.empty():
+            _, future, _ = self.queue.get_nowait()
+            future.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "processed": self.processed,
+            "failed": self.failed,
+            "avg_wait_seconds": self.total_wait / self.processed if self.processed else 0.0,
+            "avg_run_seconds": self.total_run / self.processed if self.processed else 0.0,
+            "max_latency_seconds": self.max_latency,
+            "last_latency_seconds": self.last_latency,
+        }
+
+class RoomActorRegistry:
+    """One actor per room, created on first use and removed when idle
+
+    Rooms never share a worker, so a slow command only delays its own room.
+    """
+
+    def __init__(self, max_depth: int = MAX_QUEUE_DEPTH, idle_timeout: float = IDLE_TIMEOUT):
+        self.max_depth = max_depth
+        self.idle_timeout = idle_timeout
+        self.actors: Dict[str, RoomActor] = {}
+
+    def actor(self, room_code: str) -> RoomActor:
+        """Get the live actor of a room, starting one if needed"""
+        actor = self.actors.get(room_code)
+        if actor is None or actor.closed:
+            actor = RoomActor(room_code, self)
+            self.actors[room_code] = actor
+        return actor
+
+    async def submit(self, room_code: str, command: Command) -> Any:
+        """Run a command on a room's actor and wait for its result"""
+        return await self.actor(room_code).submit(command)
+
+    def _remove(self, actor: RoomActor):
+        if self.actors.get(actor.room_code) is actor:
+            del self.actors[actor.room_code]
+
+    def stats(self, room_code: Optional[str] = None) -> dict:
+        """Queue depth and latency per room"""
+        if room_code is not None:
+            actor = self.actors.get(room_code)
+            return actor.stats() if actor else {}
+        return {code: actor.stats() for code, actor in self.actors.items()}
+
+    async def shutdown(self):
+        """Stop every worker"""
+        for actor in list(self.actors.values()):
+            actor.stop()
+        self.actors.clear()
+
+# Global room actor registry
+room_actors = RoomActorRegistry()
@@ -1,21 +1,38 @@
-from fastapi import FastAPI, APIRouter, WebSocket, WebSocketDisconnect, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import json
+import asyncio
 import logging
+import time
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import uuid
 from datetime import datetime
 
 # Import our models and game engine
 from models import Room, GameState, Player, ChatMessage
-from websocket_manager import manager
+from websocket_manager import manager, splice_frame
 from game_engine import game_engine
+from persistence import WriteBehindStore
+from room_actor import room_actors, RoomBusyError
+from lobby import lobby, render_page
+from reaper import reaper, IDLE_TTL, FINISHED_GAME_TTL, TRADE_TTL
+from message_bus import create_bus
+from sharding import ShardRouter, RemoteError, WORKER_ID, WORKERS
+from wire_format import negotiate
+from long_poll import version_watch, gzip_cache, state_etag, gzip_etag, etag_matches, LONG_POLL_MAX_WAIT
+from metrics import registry, loop_monitor, message_seconds, message_errors
+from dispatch import Dispatcher, ConnectionLimits, Inbox, RejectedMessage, rejected_messages
+from messages import (CreateRoomMessage, JoinRoomMessage, PlayerReadyMessage, BuyPropertyMessage,
+                      ChatMessagePayload, TradeOfferMessage, TradeResponseMessage, TradeCancelMessage,
+                      BuildMessage, MortgageMessage, AddBotsMessage)
+from bots import BotPool, BotView, BOT_TURN_DELAY, bot_turns, decide_buy, decide_jail, make_bot, plan_builds
+from board import BOARD
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -25,6 +42,14 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
+# Batched background persistence of rooms, games and their open trade offers
+store = WriteBehindStore(db, game_engine.trades)
+
+# Rooms are spread over the workers by hash; requests reach the owner via the bus
+shards = ShardRouter(create_bus(), WORKER_ID, WORKERS)
+if shards.sharded:
+    manager.attach_bus(shards.bus, WORKER_ID)
+
 # Create the main app
 app = FastAPI(title="Indian Heritage Monopoly", version="1.0.0")
 
@@ -35,6 +60,18 @@ api_router = APIRouter(prefix="/api")
 rooms: Dict[str, Room] = {}
 players_data: Dict[str, Player] = {}
 
+# Room code used by connections that are not in a room yet
+LOBBY_ROOM_CODE = "temp"
+
+# Inbound websocket message handlers, registered below with @dispatcher.handles
+dispatcher = Dispatcher()
+
+# Bot decisions run on these threads; each room with a bot to move has one driver task
+bot_pool = BotPool()
+bot_drivers: Dict[str, asyncio.Task] = {}
+
+PLAYER_COLORS = ["#DC2626", "#2563EB", "#059669", "#D97706", "#7C3AED", "#BE185D"]
+
 # Basic Models
 class CreateRoomRequest(BaseModel):
     player_name: str
@@ -51,107 +88,469 @@ async def root():
     return {"message": "Indian Heritage Monopoly API", "status": "running"}
 
 @api_router.get("/rooms")
-async def get_rooms():
-    """Get list of available rooms"""
-    return {"rooms": [room.dict() for room in rooms.values() if not room.game_started]}
+async def get_rooms(offset: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=200),
+                    min_free_seats: int = Query(1, ge=1), max_players: Optional[int] = Query(None, ge=2)):
+    """Get list of joinable rooms, oldest first"""
+    if not shards.sharded:
+        body = lobby.page(offset, limit, min_free_seats, max_players)
+    else:
+        listings = await shards.call_all("list-rooms", {
+            "min_free_seats": min_free_seats,
+            "max_players": max_players
+        })
+        entries = [entry for listing in listings for entry in listing["rooms"]]
+        body = render_page(entries, offset, limit, sum(listing["version"] for listing in listings))
+    return Response(content=body, media_type="application/json")
 
 @api_router.get("/rooms/{room_code}")
 async def get_room(room_code: str):
     """Get specific room details"""
-    if room_code not in rooms:
+    room = await shards.call(room_code, "get-room", {"room_code": room_code})
+    if room is None:
         raise HTTPException(status_code=404, detail="Room not found")
-    return {"room": rooms[room_code].dict()}
+    return {"room": room}
 
 @api_router.get("/game/{room_code}/state")
-async def get_game_state(room_code: str):
-    """Get current game state"""
+async def get_game_state(request: Request, room_code: str, since_version: Optional[int] = Query(None, ge=0),
+                         wait: float = Query(0, ge=0, le=LONG_POLL_MAX_WAIT)):
+    """Get current game state
+
+    Answers 304 when If-None-Match matches the current ETag. With
+    since_version the request waits up to wait seconds for a newer version,
+    answering 304 if none arrives.
+    """
+    result = await shards.call(room_code, "get-game-state", {
+        "room_code": room_code,
+        "since_version": since_version,
+        "wait": wait,
+        "if_none_match": request.headers.get("if-none-match")
+    }, timeout=wait + shards.request_timeout)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Game not found")
+    
+    compress = "gzip" in request.headers.get("accept-encoding", "")
+    headers = {
+        "ETag": gzip_etag(result["etag"]) if compress else result["etag"],
+        "X-Game-Version": str(result["version"]),
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding"
+    }
+    if result["state"] is None:
+        return Response(status_code=304, headers=headers)
+    
+    body = '{"game_state":' + result["state"] + "}"
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=gzip_cache.compress(room_code, result["etag"], body),
+                        media_type="application/json", headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@api_router.get("/game/{room_code}/log")
+async def get_game_log(room_code: str, before: Optional[int] = None, limit: int = Query(50, ge=1, le=200)):
+    """Page through the game log, oldest first, ending before a sequence number"""
+    page = await shards.call(room_code, "get-game-log", {"room_code": room_code, "before": before, "limit": limit})
+    if page is None:
+        raise HTTPException(status_code=404, detail="Game not found")
+    return page
+
+@api_router.get("/game/{room_code}/standings")
+async def get_game_standings(room_code: str):
+    """Players ranked by net worth, without the rest of the game state"""
+    standings = await shards.call(room_code, "get-standings", {"room_code": room_code})
+    if standings is None:
+        raise HTTPException(status_code=404, detail="Game not found")
+    return standings
+
+@api_router.get("/queues")
+async def get_room_queues():
+    """Command queue depth and latency for every room with a running worker"""
+    queues = {}
+    for worker_queues in await shards.call_all("queue-stats", {}):
+        queues.update(worker_queues)
+    return {"rooms": queues}
+
+@api_router.get("/reaper")
+async def get_reaper_stats():
+    """Eviction counters of this worker's reaper"""
+    return reaper.stats()
+
+@api_router.get("/shards")
+async def get_shards():
+    """This worker's view of the room sharding"""
+    return shards.stats()
+
+@api_router.get("/metrics")
+async def get_metrics():
+    """This worker's metrics in the Prometheus text format"""
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4")
+
+# Requests served by the worker that owns a room
+async def list_local_rooms(payload: dict) -> dict:
+    return {
+        "rooms": lobby.matching(payload["min_free_seats"], payload["max_players"]),
+        "version": lobby.version
+    }
+
+async def get_local_room(payload: dict) -> Optional[dict]:
+    room = rooms.get(payload["room_code"])
+    return room.dict() if room else None
+
+async def get_local_game_state(payload: dict) -> Optional[dict]:
+    room_code, since_version = payload["room_code"], payload.get("since_version")
     game = game_engine.get_game(room_code)
+    if game and since_version is not None and game.version <= since_version and payload.get("wait"):
+        # Parked outside the room queue, so it never delays commands
+        await version_watch.wait(room_code, since_version, payload["wait"])
+        game = game_engine.get_game(room_code)
     if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
-    return {"game_state": game.dict()}
+        return None
+    
+    etag = state_etag(game)
+    stale = since_version is not None and game.version <= since_version
+    if stale or etag_matches(payload.get("if_none_match"), etag):
+        return {"etag": etag, "version": game.version, "state": None}
+    return {"etag": etag, "version": game.version, "state": game.snapshot_json()}
+
+async def get_local_standings(payload: dict) -> Optional[dict]:
+    game = game_engine.get_game(payload["room_code"])
+    if not game:
+        return None
+    return {"version": game.version, "standings": game.standings}
+
+async def get_local_game_log(payload: dict) -> Optional[dict]:
+    game = game_engine.get_game(payload["room_code"])
+    if not game:
+        return None
+    
+    events = game._log.page(payload["before"], payload["limit"])
+    has_older = bool(events) and events[0].seq > game._log.first_seq
+    return {
+        "entries": [event.to_dict() for event in events],
+        "next_before": events[0].seq if has_older else None
+    }
+
+async def get_local_queue_stats(payload: dict) -> dict:
+    return room_actors.stats()
+
+async def run_on_room(room_code: str, command):
+    """Run a command on a room's queue
+
+    Lobby connections (creating or joining a room) share no room state, so
+    they run directly instead of all queueing behind one another.
+    """
+    if room_code == LOBBY_ROOM_CODE:
+        return await command()
+    return await room_actors.submit(room_code, command)
+
+async def run_room_command(payload: dict):
+    """Run a websocket message on its room's command queue"""
+    room_code, player_id, message = payload["room_code"], payload["player_id"], payload["message"]
+    target = command_room(room_code, message)
+    await run_on_room(target, lambda: handle_websocket_message(room_code, player_id, message))
+    touch_room(target)
+
+async def run_player_connected(payload: dict):
+    room_code = payload["room_code"]
+    await run_on_room(room_code, lambda: player_connected(room_code, payload["player_id"]))
+    touch_room(room_code)
+
+async def run_player_disconnected(payload: dict):
+    room_code = payload["room_code"]
+    await run_on_room(room_code, lambda: player_disconnected(room_code, payload["player_id"]))
+    touch_room(room_code)
+
+# Eviction of abandoned rooms, games and trades
+def touch_room(room_code: str):
+    """Record activity in a room and its game, postponing their eviction"""
+    if room_code in rooms:
+        reaper.touch("room", room_code)
+    game = game_engine.get_game(room_code)
+    if game:
+        reaper.touch("game", room_code, FINISHED_GAME_TTL if game.game_ended else None)
+
+def room_in_use(room_code: str) -> bool:
+    """Whether a person is connected to the room; bots alone do not count"""
+    room = rooms.get(room_code)
+    return bool(room) and any(player.connected and not player.is_bot for player in room.players)
+
+async def evict_room(room_code: str) -> bool:
+    # Runs on the room queue so it cannot interleave with a command
+    return await room_actors.submit(room_code, lambda: _evict_room(room_code))
+
+async def _evict_room(room_code: str) -> bool:
+    room = rooms.get(room_code)
+    if room is None:
+        return True
+    if reaper.is_tracked("room", room_code) or room_in_use(room_code):
+        return False
+    
+    if game_engine.get_game(room_code):
+        reaper.forget("game", room_code)
+        await _remove_game(room_code)
+    
+    del rooms[room_code]
+    for player in room.players:
+        players_data.pop(player.id, None)
+    lobby.remove(room_code)
+    store.delete_room(room_code)
+    return True
+
+async def evict_game(room_code: str) -> bool:
+    return await room_actors.submit(room_code, lambda: _evict_game(room_code))
+
+async def _evict_game(room_code: str) -> bool:
+    game = game_engine.get_game(room_code)
+    if game is None:
+        return True
+    if reaper.is_tracked("game", room_code) or (not game.game_ended and room_in_use(room_code)):
+        return False
+    
+    await _remove_game(room_code)
+    return True
+
+async def _remove_game(room_code: str):
+    await reaper.archive("game", room_code)
+    game_engine.remove_game(room_code)
+    store.delete_game(room_code)
+    # Parked state requests answer 404 now rather than at their timeout
+    version_watch.notify(room_code)
+
+async def archive_game(room_code: str):
+    store.archive_game(game_engine.get_game(room_code))
+
+async def evict_trade(trade_id: str) -> bool:
+    trade = game_engine.trades.get(trade_id)
+    if trade is None:
+        return True
+    # Runs on the room queue so an offer cannot expire while it is being accepted
+    return await room_actors.submit(trade.room_code, lambda: _expire_trade(trade.room_code, trade_id))
+
+async def _expire_trade(room_code: str, trade_id: str) -> bool:
+    trade = game_engine.expire_trade(room_code, trade_id)
+    if trade:
+        await manager.broadcast_to_room({
+            "type": "trade-expired",
+            "trade": trade.dict()
+        }, room_code)
+    return True
+
+reaper.register("room", IDLE_TTL, evict_room)
+reaper.register("game", IDLE_TTL, evict_game, archive=archive_game)
+reaper.register("trade", TRADE_TTL, evict_trade)
+
+shards.register("list-rooms", list_local_rooms)
+shards.register("get-room", get_local_room)
+shards.register("get-game-state", get_local_game_state)
+shards.register("get-game-log", get_local_game_log)
+shards.register("get-standings", get_local_standings)
+shards.register("queue-stats", get_local_queue_stats)
+shards.register("command", run_room_command)
+shards.register("player-connected", run_player_connected)
+shards.register("player-disconnected", run_player_disconnected)
+
+registry.gauge("rooms_active", "Rooms held by this worker", callback=lambda: len(rooms))
+registry.gauge("games_active", "Games held by this worker", callback=lambda: len(game_engine.games))
+registry.gauge("connections_active", "Websockets open on this worker", callback=lambda: len(manager.connection_players))
+registry.gauge("state_requests_parked", "Game state long polls waiting for a new version",
+               callback=lambda: version_watch.parked)
+registry.gauge("bot_rooms_active", "Rooms with a bot turn being played or waiting to be",
+               callback=lambda: len(bot_drivers))
+registry.gauge("room_queue_depth", "Commands waiting on all room queues",
+               callback=lambda: sum(actor.depth for actor in room_actors.actors.values()))
 
 # WebSocket endpoint
 @app.websocket("/ws/{room_code}/{player_id}")
-async def websocket_endpoint(websocket: WebSocket, room_code: str, player_id: str):
-    await manager.connect(websocket, room_code, player_id)
+async def websocket_endpoint(websocket: WebSocket, room_code: str, player_id: str,
+                             encoding: Optional[str] = None, compression: Optional[str] = None):
+    wire_format = negotiate(encoding, compression)
+    await manager.connect(websocket, room_code, player_id, wire_format)
+    if encoding or compression:
+        # Confirm what was agreed, since unsupported choices fall back to JSON
+        await manager.send_personal_message({"type": "wire-format", **wire_format.to_dict()}, player_id)
+    await submit_room_request(room_code, player_id, "player-connected", {
+        "room_code": room_code,
+        "player_id": player_id
+    })
+    
+    # Frames are validated and rate limited here, then run in order on the room
+    limits = ConnectionLimits()
+    inbox = Inbox(lambda message: submit_room_request(command_room(room_code, message), player_id, "command", {
+        "room_code": room_code,
+        "player_id": player_id,
+        "message": message
+    }))
+    
+    try:
+        while True:
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+            try:
+                message = wire_format.decode(frame.get("text") or frame.get("bytes"))
+                spec, message = dispatcher.accept(message, limits)
+                inbox.put(spec, message)
+            except RejectedMessage as e:
+                message_type = message.get("type") if isinstance(message, dict) else None
+                rejected_messages.inc(message_type if message_type in dispatcher.specs else "unknown", e.reason)
+                if e.reason != "rate_limited" or limits.should_report(time.monotonic()):
+                    await manager.send_personal_message({"type": "error", "message": str(e)}, player_id)
+            except Exception as e:
+                rejected_messages.inc("unknown", "malformed")
+                await manager.send_personal_message({"type": "error", "message": f"Malformed frame: {e}"}, player_id)
+    
+    except WebSocketDisconnect:
+        # Messages received before the disconnect still run, in order
+        await inbox.close()
+        await manager.disconnect(websocket)
+        await submit_room_request(room_code, player_id, "player-disconnected", {
+            "room_code": room_code,
+            "player_id": player_id
+        })
+
+async def player_connected(room_code: str, player_id: str):
+    """Send a snapshot to a (re)connecting player and announce them"""
+    # Late joiners and reconnecting players start from a full snapshot
+    await send_game_snapshot(room_code, player_id)
     
     # Update player connection status
     if player_id in players_data:
         players_data[player_id].connected = True
+        player_changed(room_code)
+        if room_code in rooms:
+            lobby.update(rooms[room_code])
         await manager.broadcast_to_room({
             "type": "player-reconnected",
             "player_id": player_id
         }, room_code)
-    
+    # Bots pause while nobody is connected
+    schedule_bots(room_code)
+
+def player_changed(room_code: str):
+    """Invalidate the game snapshot after a change to players shared with the room"""
+    game = game_engine.get_game(room_code)
+    if game:
+        game.touch()
+
+async def player_disconnected(room_code: str, player_id: str):
+    # Update player connection status
+    if player_id in players_data:
+        players_data[player_id].connected = False
+        player_changed(room_code)
+        if room_code in rooms:
+            lobby.update(rooms[room_code])
+        await manager.broadcast_to_room({
+            "type": "player-disconnected",
+            "player_id": player_id
+        }, room_code)
+
+def command_room(room_code: str, message: dict) -> str:
+    """Room whose state a message mutates, which is the queue it runs on"""
+    if message.get("type") == "join-room":
+        return message.get("room_code") or room_code
+    return room_code
+
+async def submit_room_request(target: str, player_id: str, kind: str, payload: dict):
+    """Run a request on the worker owning the target room, one command at a time per room
+
+    Lobby requests belong to no room, so they run on the worker holding the
+    socket; new rooms are then created there and spread with the connections.
+    """
     try:
-        while True:
-            data = await websocket.receive_text()
-            message = json.loads(data)
-            await handle_websocket_message(websocket, room_code, player_id, message)
-    
-    except WebSocketDisconnect:
-        await manager.disconnect(websocket)
-        
-        # Update player connection status
-        if player_id in players_data:
-            players_data[player_id].connected = False
-            await manager.broadcast_to_room({
-                "type": "player-disconnected",
-                "player_id": player_id
-            }, room_code)
+        if target == LOBBY_ROOM_CODE:
+            await shards.call_worker(shards.worker_id, kind, payload)
+        else:
+            await shards.call(target, kind, payload)
+    except (RoomBusyError, RemoteError, asyncio.TimeoutError) as e:
+        reason = "Room did not respond in time" if isinstance(e, asyncio.TimeoutError) else str(e)
+        await manager.send_personal_message({
+            "type": "error",
+            "message": reason
+        }, player_id)
 
-async def handle_websocket_message(websocket: WebSocket, room_code: str, player_id: str, message: dict):
-    """Handle incoming WebSocket messages"""
+async def handle_websocket_message(room_code: str, player_id: str, message: dict):
+    """Handle an incoming WebSocket message, already validated by the dispatcher"""
     message_type = message.get("type")
+    spec = dispatcher.specs.get(message_type)
+    # Bound the metric labels to known types so clients cannot add series
+    metric_type = message_type if spec else "unknown"
+    start = time.perf_counter()
     
     try:
-        if message_type == "create-room":
-            await handle_create_room(websocket, message)
-        
-        elif message_type == "join-room":
-            await handle_join_room(websocket, message)
-        
-        elif message_type == "player-ready":
-            await handle_player_ready(room_code, player_id, message)
-        
-        elif message_type == "start-game":
-            await handle_start_game(room_code, player_id)
-        
-        elif message_type == "roll-dice":
-            await handle_roll_dice(room_code, player_id)
-        
-        elif message_type == "buy-property":
-            await handle_buy_property(room_code, player_id, message)
-        
-        elif message_type == "end-turn":
-            await handle_end_turn(room_code, player_id)
-        
-        elif message_type == "send-chat":
-            await handle_chat_message(room_code, player_id, message)
-        
-        elif message_type == "leave-room":
-            await handle_leave_room(room_code, player_id)
+        if spec:
+            await spec.handler(room_code, player_id, message)
     
     except Exception as e:
         logger.error(f"Error handling message {message_type}: {e}")
-        await manager.send_personal_message({
-            "type": "error",
-            "message": str(e)
-        }, player_id)
+        await send_error(player_id, metric_type, e)
+    
+    finally:
+        message_seconds.observe(time.perf_counter() - start, metric_type)
+
+async def send_error(player_id: str, message_type: str, error: Exception):
+    """Report a failed message to its sender"""
+    message_errors.inc(message_type)
+    await manager.send_personal_message({
+        "type": "error",
+        "message": str(error)
+    }, player_id)
+
+@dispatcher.handles("sync-state", bucket="room", coalesce=True)
+async def handle_sync_state(room_code: str, player_id: str, message: dict):
+    await send_game_snapshot(room_code, player_id)
+
+async def send_game_snapshot(room_code: str, player_id: str):
+    """Send the full game state to a single player"""
+    game = game_engine.get_game(room_code)
+    if not game:
+        return
+    
+    # Publish pending changes first so the snapshot and patch stream agree
+    patch = collect_patch(room_code)
+    if patch:
+        await manager.broadcast_to_room({
+            "type": "game-patch",
+            "patch": patch
+        }, room_code, exclude_player=player_id)
+    
+    header = {"type": "game-state", "version": game.version}
+    await manager.send_personal_message(
+        {**header, "game_state": game.snapshot()}, player_id,
+        frame=splice_frame(header, "game_state", game.snapshot_json())
+    )
+
+def collect_patch(room_code: str) -> Optional[dict]:
+    """Publish a game's pending changes and wake requests polling for them"""
+    patch = game_engine.collect_patch(room_code)
+    if patch:
+        version_watch.notify(room_code)
+    return patch
+
+async def broadcast_game_update(room_code: str, message: dict):
+    """Broadcast a game event together with the patch it produced"""
+    patch = collect_patch(room_code)
+    if patch:
+        message["patch"] = patch
+    await manager.broadcast_to_room(message, room_code)
 
-async def handle_create_room(websocket: WebSocket, message: dict):
-    """Handle room creation"""
+@dispatcher.handles("create-room", CreateRoomMessage, bucket="lobby")
+async def handle_create_room(room_code: str, requester_id: str, message: dict):
+    """Handle room creation
+
+    The reply goes to the requesting connection, which is not in the room yet.
+    """
     player_name = message.get("player_name")
     avatar = message.get("avatar", "👑")
     
-    # Create new room
+    # Create new room, with a code that hashes to this worker so it lives here
     room_code = f"ROOM{uuid.uuid4().hex[:6].upper()}"
+    while not shards.owns(room_code):
+        room_code = f"ROOM{uuid.uuid4().hex[:6].upper()}"
     
     # Create player
     player = Player(
         name=player_name,
         avatar=avatar,
-        color="#DC2626",
+        color=PLAYER_COLORS[0],
         is_host=True,
         ready=True
     )
@@ -166,6 +565,9 @@ async def handle_create_room(websocket: WebSocket, message: dict):
     # Store room and player data
     rooms[room_code] = room
     players_data[player.id] = player
+    store.mark_room(room)
+    lobby.update(room)
+    touch_room(room_code)
     
     # Send response
     await manager.send_personal_message({
@@ -173,9 +575,10 @@ async def handle_create_room(websocket: WebSocket, message: dict):
         "room_code": room_code,
         "player_id": player.id,
         "room": room.dict()
-    }, player.id)
+    }, requester_id)
 
-async def handle_join_room(websocket: WebSocket, message: dict):
+@dispatcher.handles("join-room", JoinRoomMessage, bucket="lobby")
+async def handle_join_room(room_code: str, requester_id: str, message: dict):
     """Handle joining a room"""
     room_code = message.get("room_code")
     player_name = message.get("player_name")
@@ -185,21 +588,30 @@ async def handle_join_room(websocket: WebSocket, message: dict):
         await manager.send_personal_message({
             "type": "error",
             "message": "Room not found"
-        }, "unknown")
+        }, requester_id)
         return
     
     room = rooms[room_code]
     
     if len(room.players) >= room.max_players:
-        await manager.send_personal_message({
-            "type": "error",
-            "message": "Room is full"
-        }, "unknown")
-        return
+        # Before the game starts a bot gives up its seat to a person
+        bot = next((p for p in reversed(room.players) if p.is_bot), None)
+        if bot is None or room.game_started:
+            await manager.send_personal_message({
+                "type": "error",
+                "message": "Room is full"
+            }, requester_id)
+            return
+        room.players.remove(bot)
+        players_data.pop(bot.id, None)
+        await manager.broadcast_to_room({
+            "type": "player-left",
+            "player_id": bot.id,
+            "room": room.dict()
+        }, room_code)
     
     # Create player
-    colors = ["#DC2626", "#2563EB", "#059669", "#D97706", "#7C3AED", "#BE185D"]
-    player_color = colors[len(room.players) % len(colors)]
+    player_color = PLAYER_COLORS[len(room.players) % len(PLAYER_COLORS)]
     
     player = Player(
         name=player_name,
@@ -210,14 +622,19 @@ async def handle_join_room(websocket: WebSocket, message: dict):
     # Add player to room
     room.players.append(player)
     players_data[player.id] = player
+    store.mark_room(room)
+    lobby.update(room)
     
-    # Notify all players in room
-    await manager.broadcast_to_room({
+    # Notify all players in room, and the requesting connection which is not in it yet
+    joined = {
         "type": "player-joined",
         "player": player.dict(),
         "room": room.dict()
-    }, room_code)
+    }
+    await manager.broadcast_to_room(joined, room_code)
+    await manager.send_personal_message(joined, requester_id)
 
+@dispatcher.handles("player-ready", PlayerReadyMessage, bucket="room", coalesce=True)
 async def handle_player_ready(room_code: str, player_id: str, message: dict):
     """Handle player ready status change"""
     if room_code not in rooms:
@@ -231,6 +648,9 @@ async def handle_player_ready(room_code: str, player_id: str, message: dict):
         if player.id == player_id:
             player.ready = ready
             break
+    player_changed(room_code)
+    store.mark_room(room)
+    lobby.update(room)
     
     # Broadcast update
     await manager.broadcast_to_room({
@@ -238,7 +658,8 @@ async def handle_player_ready(room_code: str, player_id: str, message: dict):
         "room": room.dict()
     }, room_code)
 
-async def handle_start_game(room_code: str, player_id: str):
+@dispatcher.handles("start-game", bucket="room")
+async def handle_start_game(room_code: str, player_id: str, message: dict):
     """Handle game start"""
     if room_code not in rooms:
         return
@@ -264,86 +685,306 @@ async def handle_start_game(room_code: str, player_id: str):
     # Create game state
     game_state = game_engine.create_game(room_code, room.players)
     room.game_started = True
+    store.mark_room(room)
+    lobby.update(room)
+    store.mark_game(game_state)
     
     # Broadcast game start
-    await manager.broadcast_to_room({
-        "type": "game-started",
-        "game_state": game_state.dict()
-    }, room_code)
+    header = {"type": "game-started"}
+    await manager.broadcast_to_room(
+        {**header, "game_state": game_state.snapshot()}, room_code,
+        frame=splice_frame(header, "game_state", game_state.snapshot_json())
+    )
+    schedule_bots(room_code)
 
-async def handle_roll_dice(room_code: str, player_id: str):
+@dispatcher.handles("roll-dice")
+async def handle_roll_dice(room_code: str, player_id: str, message: dict):
     """Handle dice roll"""
     try:
         dice1, dice2, total = game_engine.roll_dice(room_code, player_id)
-        game = game_engine.get_game(room_code)
         
         # Broadcast dice roll
-        await manager.broadcast_to_room({
+        await broadcast_game_update(room_code, {
             "type": "dice-rolled",
             "player_id": player_id,
             "dice1": dice1,
             "dice2": dice2,
-            "total": total,
-            "game_state": game.dict()
-        }, room_code)
+            "total": total
+        })
         
-        # Auto-move player
+        # Auto-move player, unless a third double sent them to jail
+        game = game_engine.get_game(room_code)
+        if game.turn_phase != "move":
+            return
         new_position = game_engine.move_player(room_code, player_id, total)
         
         # Broadcast player movement
-        await manager.broadcast_to_room({
+        await broadcast_game_update(room_code, {
             "type": "player-moved",
             "player_id": player_id,
-            "new_position": new_position,
-            "game_state": game.dict()
-        }, room_code)
+            "new_position": new_position
+        })
         
     except Exception as e:
-        await manager.send_personal_message({
-            "type": "error",
-            "message": str(e)
-        }, player_id)
+        await send_error(player_id, "roll-dice", e)
 
+@dispatcher.handles("buy-property", BuyPropertyMessage)
 async def handle_buy_property(room_code: str, player_id: str, message: dict):
     """Handle property purchase"""
     try:
         property_id = message.get("property_id")
         game_engine.buy_property(room_code, player_id, property_id)
-        game = game_engine.get_game(room_code)
         
         # Broadcast property purchase
-        await manager.broadcast_to_room({
+        await broadcast_game_update(room_code, {
             "type": "property-bought",
             "player_id": player_id,
-            "property_id": property_id,
-            "game_state": game.dict()
-        }, room_code)
+            "property_id": property_id
+        })
         
     except Exception as e:
-        await manager.send_personal_message({
-            "type": "error",
-            "message": str(e)
-        }, player_id)
+        await send_error(player_id, "buy-property", e)
 
-async def handle_end_turn(room_code: str, player_id: str):
+@dispatcher.handles("end-turn")
+async def handle_end_turn(room_code: str, player_id: str, message: dict):
     """Handle turn end"""
     try:
         game_engine.end_turn(room_code, player_id)
         game = game_engine.get_game(room_code)
         
         # Broadcast turn end
-        await manager.broadcast_to_room({
+        await broadcast_game_update(room_code, {
             "type": "turn-ended",
-            "current_player_id": game.players[game.current_player].id,
-            "game_state": game.dict()
+            "current_player_id": game.players[game.current_player].id
+        })
+        schedule_bots(room_code)
+        
+    except Exception as e:
+        await send_error(player_id, "end-turn", e)
+
+@dispatcher.handles("build-house", BuildMessage)
+async def handle_build_house(room_code: str, player_id: str, message: dict):
+    """Handle building a house"""
+    try:
+        property_id = message.get("property_id")
+        game_engine.build_house(room_code, player_id, property_id)
+        
+        await broadcast_game_update(room_code, {
+            "type": "house-built",
+            "player_id": player_id,
+            "property_id": property_id
+        })
+        
+    except Exception as e:
+        await send_error(player_id, "build-house", e)
+
+@dispatcher.handles("build-hotel", BuildMessage)
+async def handle_build_hotel(room_code: str, player_id: str, message: dict):
+    """Handle building a hotel"""
+    try:
+        property_id = message.get("property_id")
+        game_engine.build_hotel(room_code, player_id, property_id)
+        
+        await broadcast_game_update(room_code, {
+            "type": "hotel-built",
+            "player_id": player_id,
+            "property_id": property_id
+        })
+        
+    except Exception as e:
+        await send_error(player_id, "build-hotel", e)
+
+@dispatcher.handles("pay-jail-fine")
+async def handle_pay_jail_fine(room_code: str, player_id: str, message: dict):
+    """Handle leaving jail with a card or the fine"""
+    try:
+        paid = game_engine.pay_jail_fine(room_code, player_id)
+        
+        await broadcast_game_update(room_code, {
+            "type": "left-jail",
+            "player_id": player_id,
+            "paid": paid
+        })
+        
+    except Exception as e:
+        await send_error(player_id, "pay-jail-fine", e)
+
+@dispatcher.handles("mortgage-property", MortgageMessage)
+async def handle_mortgage_property(room_code: str, player_id: str, message: dict):
+    """Handle mortgaging a property"""
+    try:
+        property_id = message.get("property_id")
+        amount = game_engine.mortgage_property(room_code, player_id, property_id)
+        
+        await broadcast_game_update(room_code, {
+            "type": "property-mortgaged",
+            "player_id": player_id,
+            "property_id": property_id,
+            "amount": amount
+        })
+        
+    except Exception as e:
+        await send_error(player_id, "mortgage-property", e)
+
+@dispatcher.handles("unmortgage-property", MortgageMessage)
+async def handle_unmortgage_property(room_code: str, player_id: str, message: dict):
+    """Handle lifting a mortgage"""
+    try:
+        property_id = message.get("property_id")
+        amount = game_engine.unmortgage_property(room_code, player_id, property_id)
+        
+        await broadcast_game_update(room_code, {
+            "type": "property-unmortgaged",
+            "player_id": player_id,
+            "property_id": property_id,
+            "amount": amount
+        })
+        
+    except Exception as e:
+        await send_error(player_id, "unmortgage-property", e)
+
+@dispatcher.handles("trade-offer", TradeOfferMessage)
+async def handle_trade_offer(room_code: str, player_id: str, message: dict):
+    """Handle a trade offer to another player"""
+    try:
+        offer = message["offer"]
+        trade = game_engine.propose_trade(
+            room_code, str(uuid.uuid4()), player_id, message["to_player_id"],
+            offer["from_properties"], offer["to_properties"], offer["from_money"], offer["to_money"]
+        )
+        # The offer closes by itself after TRADE_TTL unless answered first
+        reaper.touch("trade", trade.id)
+        
+        await manager.broadcast_to_room({
+            "type": "trade-offered",
+            "trade": trade.dict()
         }, room_code)
         
     except Exception as e:
-        await manager.send_personal_message({
-            "type": "error",
-            "message": str(e)
-        }, player_id)
+        await send_error(player_id, "trade-offer", e)
+
+@dispatcher.handles("trade-response", TradeResponseMessage)
+async def handle_trade_response(room_code: str, player_id: str, message: dict):
+    """Handle the recipient accepting or rejecting a trade offer"""
+    try:
+        trade = game_engine.respond_trade(room_code, player_id, message["trade_id"], message["accept"])
+        reaper.forget("trade", trade.id)
+        
+        await broadcast_game_update(room_code, {
+            "type": "trade-accepted" if trade.status == "accepted" else "trade-rejected",
+            "trade": trade.dict()
+        })
+        
+    except Exception as e:
+        await send_error(player_id, "trade-response", e)
 
+@dispatcher.handles("trade-cancel", TradeCancelMessage)
+async def handle_trade_cancel(room_code: str, player_id: str, message: dict):
+    """Handle the sender withdrawing a trade offer"""
+    try:
+        trade = game_engine.cancel_trade(room_code, player_id, message["trade_id"])
+        reaper.forget("trade", trade.id)
+        
+        await manager.broadcast_to_room({
+            "type": "trade-cancelled",
+            "trade": trade.dict()
+        }, room_code)
+        
+    except Exception as e:
+        await send_error(player_id, "trade-cancel", e)
+
+@dispatcher.handles("add-bots", AddBotsMessage, bucket="room")
+async def handle_add_bots(room_code: str, player_id: str, message: dict):
+    """Fill empty seats of a room with bots before the game starts"""
+    room = rooms.get(room_code)
+    if room is None:
+        return
+    
+    try:
+        if room.host_id != player_id:
+            raise ValueError("Only the host can add bots")
+        if room.game_started:
+            raise ValueError("Game already started")
+        free_seats = room.max_players - len(room.players)
+        if free_seats <= 0:
+            raise ValueError("Room is full")
+    except ValueError as e:
+        await send_error(player_id, "add-bots", e)
+        return
+    
+    count = min(message.get("count") or free_seats, free_seats)
+    bot_seats = sum(p.is_bot for p in room.players)
+    for seat in range(bot_seats, bot_seats + count):
+        bot = make_bot(seat, PLAYER_COLORS[len(room.players) % len(PLAYER_COLORS)])
+        room.players.append(bot)
+        players_data[bot.id] = bot
+    store.mark_room(room)
+    lobby.update(room)
+    
+    await manager.broadcast_to_room({
+        "type": "room-updated",
+        "room": room.dict()
+    }, room_code)
+
+def schedule_bots(room_code: str):
+    """Start playing bot turns if a bot is up next and people are watching"""
+    game = game_engine.get_game(room_code)
+    if (game is None or game.game_ended or room_code in bot_drivers
+            or not game.players[game.current_player].is_bot or not room_in_use(room_code)):
+        return
+    bot_drivers[room_code] = asyncio.create_task(drive_bots(room_code))
+
+async def drive_bots(room_code: str):
+    """Play bot turns in a room until a person is up, one room-queue command per turn"""
+    try:
+        while True:
+            await asyncio.sleep(BOT_TURN_DELAY)
+            if not await run_on_room(room_code, lambda: play_bot_turn(room_code)):
+                break
+    except Exception as e:
+        logger.error(f"Bot driver for {room_code} stopped: {e}")
+    finally:
+        if bot_drivers.get(room_code) is asyncio.current_task():
+            del bot_drivers[room_code]
+
+async def play_bot_turn(room_code: str) -> bool:
+    """Play the current bot's turn through the same handlers people use
+
+    Returns False, and releases the room's driver, when it is not a bot's
+    turn or no person is connected. Decisions run on the bot pool while
+    this command holds the room queue, so the game cannot change under them.
+    """
+    game = game_engine.get_game(room_code)
+    bot = game.players[game.current_player] if game and not game.game_ended else None
+    if bot is None or not bot.is_bot or not room_in_use(room_code):
+        bot_drivers.pop(room_code, None)
+        return False
+    
+    if bot.in_jail and game.turn_phase == "roll":
+        if await bot_pool.decide("jail", decide_jail, BotView.of(game, bot.id), default=False):
+            await handle_pay_jail_fine(room_code, bot.id, {})
+    
+    if game.turn_phase == "roll":
+        await handle_roll_dice(room_code, bot.id, {})
+    
+    if game.turn_phase == "action" and game._index.player(bot.id):
+        position = bot.position
+        if BOARD[position].price and game._board.owners[position] is None:
+            if await bot_pool.decide("buy", decide_buy, BotView.of(game, bot.id), position, default=False):
+                await handle_buy_property(room_code, bot.id, {"property_id": position})
+        
+        steps = await bot_pool.decide("build", plan_builds, BotView.of(game, bot.id), bot_pool.deadline(),
+                                      default=[])
+        for action, position in steps:
+            build = handle_build_hotel if action == "hotel" else handle_build_house
+            await build(room_code, bot.id, {"property_id": position})
+    
+    bot_turns.inc()
+    # Ending the turn schedules nothing new while this driver is registered
+    await handle_end_turn(room_code, bot.id, {})
+    return True
+
+@dispatcher.handles("send-chat", ChatMessagePayload, bucket="chat")
 async def handle_chat_message(room_code: str, player_id: str, message: dict):
     """Handle chat message"""
     chat_text = message.get("message", "")
@@ -371,21 +1012,30 @@ async def handle_chat_message(room_code: str, player_id: str, message: dict):
         "timestamp": chat_message.timestamp.isoformat()
     }, room_code)
 
-async def handle_leave_room(room_code: str, player_id: str):
+@dispatcher.handles("leave-room", bucket="room")
+async def handle_leave_room(room_code: str, player_id: str, message: dict):
     """Handle player leaving room"""
     if room_code in rooms:
         room = rooms[room_code]
         room.players = [p for p in room.players if p.id != player_id]
+        people = [p for p in room.players if not p.is_bot]
         
         # If host left, assign new host
-        if room.host_id == player_id and room.players:
-            room.host_id = room.players[0].id
-            room.players[0].is_host = True
+        if room.host_id == player_id and people:
+            room.host_id = people[0].id
+            people[0].is_host = True
         
-        # Remove empty rooms
-        if not room.players:
+        # Remove rooms nobody but bots is left in
+        if not people:
+            for bot in room.players:
+                players_data.pop(bot.id, None)
             del rooms[room_code]
+            store.delete_room(room_code)
+            reaper.forget("room", room_code)
+            lobby.remove(room_code)
         else:
+            store.mark_room(room)
+            lobby.update(room)
             # Broadcast player left
             await manager.broadcast_to_room({
                 "type": "player-left",
@@ -415,6 +1065,53 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def restore_persisted_state():
+    """Rehydrate rooms and in-progress games, then start the write-behind loop"""
+    try:
+        # Each worker restores only the rooms it owns
+        for room in await store.load_rooms():
+            if shards.owns(room.code):
+                rooms[room.code] = room
+        for game in await store.load_games():
+            if shards.owns(game.room_code):
+                game_engine.games[game.room_code] = game
+                store.track_game(game)
+        for trade in await store.load_trades():
+            if trade.room_code in game_engine.games and trade.id not in game_engine.trades:
+                game_engine.trades.add(trade)
+                reaper.touch("trade", trade.id)
+    except Exception as e:
+        logger.error(f"Error restoring persisted state: {e}")
+    
+    for room_code, room in rooms.items():
+        # Room and game share player objects, with the game as the source of truth
+        game = game_engine.get_game(room_code)
+        if game:
+            room.players = [game._index.player(p.id) or p for p in room.players]
+        for player in room.players:
+            player.connected = False
+            players_data[player.id] = player
+        lobby.update(room)
+    
+    # Restored objects get a full TTL before they can be evicted
+    for room_code in set(rooms) | set(game_engine.games):
+        touch_room(room_code)
+    
+    logger.info(f"Restored {len(rooms)} rooms and {len(game_engine.games)} games")
+    await shards.start()
+    store.start()
+    reaper.start()
+    loop_monitor.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in list(bot_drivers.values()):
+        task.cancel()
+    bot_pool.shutdown()
+    await loop_monitor.stop()
+    await reaper.stop()
+    await shards.stop()
+    await room_actors.shutdown()
+    await store.stop()
     client.close()
@@ -0,0 +1,188 @@
+"""Assignment of rooms to server workers
+
+Every room lives on exactly one worker, chosen by a consistent hash of the
+room code, so adding a worker only moves about 1/N of the rooms. Any worker
+accepts any websocket: commands for rooms it does not own are forwarded
+over the message bus to the owner, which runs them on its room queue and
+publishes the resulting broadcasts back to the bus.
+
+    WORKER_ID=w0 WORKERS=w0,w1 BUS_URL=unix:///tmp/monopoly-bus.sock uvicorn server:app --port 8001
+    WORKER_ID=w1 WORKERS=w0,w1 BUS_URL=unix:///tmp/monopoly-bus.sock uvicorn server:app --port 8002
+"""
+import asyncio
+import bisect
+import hashlib
+import itertools
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from message_bus import MessageBus
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID = os.environ.get("WORKER_ID", "worker-0")
+WORKERS = [worker for worker in os.environ.get("WORKERS", WORKER_ID).split(",") if worker]
+# Points per worker on the hash ring; more points spread rooms more evenly
+RING_REPLICAS = int(os.environ.get("SHARD_RING_REPLICAS", "64"))
+# Seconds to wait for another worker to answer a forwarded request
+REQUEST_TIMEOUT = float(os.environ.get("SHARD_REQUEST_TIMEOUT", "10"))
+
+RequestHandler = Callable[[dict], Awaitable[Any]]
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+class HashRing:
+    """Consistent hash ring mapping keys to workers"""
+
+    def __init__(self, workers: List[str], replicas: int = RING_REPLICAS):
+        self.replicas = replicas
+        self.workers: List[str] = []
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        for worker in workers:
+            self.add(worker)
+
+    def add(self, worker: str):
+        if worker in self.workers:
+            return
+        self.workers.append(worker)
+        for replica in range(self.replicas):
+            point = _hash(f"{worker}#{replica}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, worker)
+
+    def remove(self, worker: str):
+        if worker not in self.workers:
+            return
+        self.workers.remove(worker)
+        kept = [(point, owner) for point, owner in zip(self._points, self._owners) if owner != worker]
+        self._points = [point for point, _ in kept]
+        self._owners = [owner for _, owner in kept]
+
+    def owner(self, key: str) -> str:
+        """Worker responsible for a key"""
+        if not self._points:
+            raise ValueError("Hash ring has no workers")
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
+
+class RemoteError(Exception):
+    """An error raised by a request handler on another worker"""
+
+class ShardRouter:
+    """Runs room requests on the owning worker, locally or over the bus
+
+    Request kinds are registered with a handler taking a JSON-compatible
+    payload. Calls for rooms this worker owns run the handler directly;
+    the rest are published to the owner's channel and the reply awaited.
+    """
+
+    def __init__(self, bus: MessageBus, worker_id: str = WORKER_ID, workers: Optional[List[str]] = None,
+                 request_timeout: float = REQUEST_TIMEOUT):
+        self.bus = bus
+        self.worker_id = worker_id
+        self.ring = HashRing(workers or [worker_id])
+        self.request_timeout = request_timeout
+        self.handlers: Dict[str, RequestHandler] = {}
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self.forwarded = 0
+        self.served = 0
+
+    @property
+    def channel(self) -> str:
+        return f"worker:{self.worker_id}"
+
+    @property
+    def sharded(self) -> bool:
+        """Whether more than one worker shares the rooms"""
+        return len(self.ring.workers) > 1
+
+    def owner(self, room_code: str) -> str:
+        return self.ring.owner(room_code)
+
+    def owns(self, room_code: str) -> bool:
+        return not self.sharded or self.ring.owner(room_code) == self.worker_id
+
+    def register(self, kind: str, handler: RequestHandler):
+        self.handlers[kind] = handler
+
+    async def start(self):
+        await self.bus.subscribe(self.channel, self._on_message)
+        await self.bus.start()
+
+    async def stop(self):
+        await self.bus.stop()
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+
+    async def call(self, room_code: str, kind: str, payload: dict, timeout: Optional[float] = None) -> Any:
+        """Run a request on the worker that owns a room and return its result"""
+        owner = self.owner(room_code) if self.sharded else self.worker_id
+        return await self.call_worker(owner, kind, payload, timeout)
+
+    async def call_worker(self, worker: str, kind: str, payload: dict, timeout: Optional[float] = None) -> Any:
+        """Run a request on a specific worker and return its result
+
+        timeout overrides the request timeout for remote calls, e.g. long polls.
+        """
+        if worker == self.worker_id:
+            return await self.handlers[kind](payload)
+
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self.forwarded += 1
+        try:
+            await self.bus.publish(f"worker:{worker}", {
+                "id": request_id,
+                "kind": kind,
+                "payload": payload,
+                "reply_to": self.worker_id
+            })
+            return await asyncio.wait_for(future, timeout=self.request_timeout if timeout is None else timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def call_all(self, kind: str, payload: dict) -> List[Any]:
+        """Run a request on every worker"""
+        return await asyncio.gather(*(self.call_worker(worker, kind, payload) for worker in self.ring.workers))
+
+    async def _on_message(self, message: dict):
+        if "kind" in message:
+            # Served in its own task so a handler awaiting another worker cannot stall the bus
+            asyncio.create_task(self._serve(message))
+            return
+
+        future = self._pending.get(message.get("reply"))
+        if future is None or future.done():
+            return
+        if "error" in message:
+            future.set_exception(RemoteError(message["error"]))
+        else:
+            future.set_result(message.get("result"))
+
+    async def _serve(self, request: dict):
+        reply = {"reply": request["id"]}
+        try:
+            reply["result"] = await self.handlers[request["kind"]](request["payload"])
+        except Exception as e:
+            reply["error"] = str(e)
+        self.served += 1
+        try:
+            await self.bus.publish(f"worker:{request['reply_to']}", reply)
+        except Exception as e:
+            logger.error(f"Error replying to worker {request['reply_to']}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "workers": list(self.ring.workers),
+            "forwarded": self.forwarded,
+            "served": self.served,
+            "pending": len(self._pending),
+        }
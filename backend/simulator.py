@@ -0,0 +1,383 @@
+"""Headless self-play simulator over MonopolyGameEngine
+
+Runs many seeded games across a process pool and reports throughput plus
+aggregate outcomes, for tuning prices and rents in data/properties.py.
+
+    python simulator.py --games 100000 --players 4 --policies always,reserve:3000
+"""
+import argparse
+import json
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from board import BOARD, GROUP_MEMBERS
+from bots import BotView, cash_reserve, decide_jail, plan_builds
+from game_engine import MORTGAGE_INTEREST, MonopolyGameEngine
+from models import GameState, Player
+
+GO_TO_JAIL_POSITION = 30
+PLAYER_COLORS = ["#DC2626", "#2563EB", "#059669", "#D97706", "#7C3AED", "#BE185D"]
+
+class Policy:
+    """Decides the choices a simulated player makes
+
+    Subclasses decide purchases; building, leaving jail and mortgaging
+    follow the server bots unless overridden.
+    """
+    name = "base"
+
+    def should_buy(self, game: GameState, player: Player, position: int, rng: random.Random) -> bool:
+        raise NotImplementedError
+
+    def should_leave_jail(self, game: GameState, player: Player, rng: random.Random) -> bool:
+        return decide_jail(BotView.of(game, player.id))
+
+    def plan_builds(self, game: GameState, player: Player, rng: random.Random) -> List[Tuple[str, int]]:
+        """("house" | "hotel", position) steps to build at the end of a turn"""
+        if not game._index.monopolies.get(player.id):
+            return []
+        return plan_builds(BotView.of(game, player.id))
+
+    def plan_unmortgages(self, game: GameState, player: Player, rng: random.Random) -> List[int]:
+        """Mortgaged squares to buy back, completed groups first, keeping the bots' cash reserve"""
+        mortgaged = [position for position in game._index.owned_by(player.id) if game._board.mortgaged[position]]
+        if not mortgaged:
+            return []
+        money = player.money - cash_reserve(BotView.of(game, player.id))
+        monopolies = game._index.monopolies.get(player.id, ())
+        plan = []
+        for position in sorted(mortgaged, key=lambda position: (BOARD[position].owner_group not in monopolies, position)):
+            cost = BOARD[position].price // 2 * (100 + MORTGAGE_INTEREST) // 100
+            if money >= cost:
+                money -= cost
+                plan.append(position)
+        return plan
+
+    def plan_mortgages(self, game: GameState, player: Player, amount: int, rng: random.Random) -> List[int]:
+        """Squares to mortgage so the player holds amount, cheapest first
+
+        Empty when mortgaging everything allowed would still fall short,
+        since the squares are worth more to a creditor unmortgaged.
+        """
+        board = game._board
+        money, plan = player.money, []
+        for position in sorted(game._index.owned_by(player.id), key=lambda position: BOARD[position].price):
+            if money >= amount:
+                break
+            group = BOARD[position].owner_group
+            if board.mortgaged[position] or any(board.houses[member] or board.hotel[member]
+                                                for member in GROUP_MEMBERS[group]):
+                continue
+            money += BOARD[position].price // 2
+            plan.append(position)
+        return plan if money >= amount else []
+
+class AlwaysBuyPolicy(Policy):
+    """Buy every affordable square"""
+    name = "always"
+
+    def should_buy(self, game, player, position, rng):
+        return True
+
+class NeverBuyPolicy(Policy):
+    """Never buy anything"""
+    name = "never"
+
+    def should_buy(self, game, player, position, rng):
+        return False
+
+class CashReservePolicy(Policy):
+    """Buy only while keeping a cash reserve after the purchase"""
+    name = "reserve"
+
+    def __init__(self, reserve: float = 5000):
+        self.reserve = int(reserve)
+
+    def should_buy(self, game, player, position, rng):
+        return player.money - BOARD[position].price >= self.reserve
+
+class RandomBuyPolicy(Policy):
+    """Buy with a fixed probability"""
+    name = "random"
+
+    def __init__(self, probability: float = 0.5):
+        self.probability = float(probability)
+
+    def should_buy(self, game, player, position, rng):
+        return rng.random() < self.probability
+
+POLICIES = {
+    policy.name: policy
+    for policy in (AlwaysBuyPolicy, NeverBuyPolicy, CashReservePolicy, RandomBuyPolicy)
+}
+
+def make_policy(spec: str) -> Policy:
+    """Build a policy from a spec such as 'always' or 'reserve:3000'"""
+    name, _, arg = spec.partition(":")
+    if name not in POLICIES:
+        raise ValueError(f"Unknown policy '{name}', expected one of {sorted(POLICIES)}")
+    return POLICIES[name](float(arg)) if arg else POLICIES[name]()
+
+class SimulationConfig(NamedTuple):
+    players: int = 4
+    # One policy spec per seat; cycled if shorter than the player count
+    policies: Tuple[str, ...] = ("always",)
+    starting_money: int = 15000
+    max_turns: int = 1000
+
+    def seat_policies(self) -> List[str]:
+        return [self.policies[seat % len(self.policies)] for seat in range(self.players)]
+
+class GameOutcome(NamedTuple):
+    winner_seat: Optional[int]
+    turns: int
+    # (seat, cause) for each player that went bankrupt
+    bankruptcies: Tuple[Tuple[int, str], ...]
+
+class SimulationStats:
+    """Mergeable aggregate of many game outcomes"""
+
+    def __init__(self):
+        self.games = 0
+        self.timeouts = 0
+        self.winners: Counter = Counter()
+        self.lengths: Counter = Counter()
+        self.bankruptcies: Counter = Counter()
+
+    def add(self, outcome: GameOutcome, seat_policies: List[str]):
+        self.games += 1
+        self.lengths[outcome.turns] += 1
+        if outcome.winner_seat is None:
+            self.timeouts += 1
+        else:
+            self.winners[f"seat{outcome.winner_seat}:{seat_policies[outcome.winner_seat]}"] += 1
+        for _, cause in outcome.bankruptcies:
+            self.bankruptcies[cause] += 1
+
+    def merge(self, other: "SimulationStats"):
+        self.games += other.games
+        self.timeouts += other.timeouts
+        self.winners.update(other.winners)
+        self.lengths.update(other.lengths)
+        self.bankruptcies.update(other.bankruptcies)
+
+    def length_percentile(self, fraction: float) -> int:
+        """Game length below which the given fraction of games ended"""
+        target = fraction * self.games
+        seen = 0
+        for turns in sorted(self.lengths):
+            seen += self.lengths[turns]
+            if seen >= target:
+                return turns
+        return 0
+
+    def to_dict(self) -> dict:
+        total_turns = sum(turns * count for turns, count in self.lengths.items())
+        return {
+            "games": self.games,
+            "timeouts": self.timeouts,
+            "winners": dict(self.winners.most_common()),
+            "game_length": {
+                "mean": total_turns / self.games if self.games else 0.0,
+                "p50": self.length_percentile(0.5),
+                "p90": self.length_percentile(0.9),
+                "max": max(self.lengths) if self.lengths else 0,
+            },
+            "bankruptcy_causes": dict(self.bankruptcies.most_common()),
+        }
+
+class Simulator:
+    """Plays complete games on a private engine instance"""
+
+    def __init__(self, config: SimulationConfig):
+        self.config = config
+        self.engine = MonopolyGameEngine(rng=random.Random())
+        self.seat_policies = config.seat_policies()
+        self.policies = [make_policy(spec) for spec in self.seat_policies]
+
+    def play(self, seed: int) -> GameOutcome:
+        """Play one game to completion or until max_turns"""
+        engine = self.engine
+        engine.rng.seed(seed)
+        room_code = f"SIM{seed}"
+        players = [
+            Player(
+                id=f"seat{seat}",
+                name=f"Seat {seat}",
+                avatar="",
+                color=PLAYER_COLORS[seat % len(PLAYER_COLORS)],
+                money=self.config.starting_money
+            )
+            for seat in range(self.config.players)
+        ]
+        game = engine.create_game(room_code, players, seed=seed)
+        bankruptcies = []
+        turns = 0
+
+        try:
+            while not game.game_ended and turns < self.config.max_turns:
+                turns += 1
+                seated = [player.id for player in game.players]
+                current = game.players[game.current_player].id
+                seat = int(current[4:])
+                cause = self._take_turn(game, seat)
+                if cause:
+                    bankruptcies.append((seat, cause))
+                if len(game.players) < len(seated) - bool(cause):
+                    # Cards that collect from everyone can bankrupt the other players too
+                    bankruptcies.extend((int(player_id[4:]), "card") for player_id in seated
+                                        if player_id != current and not game._index.player(player_id))
+        finally:
+            engine.games.pop(room_code, None)
+
+        winner_seat = int(game.winner[4:]) if game.winner else None
+        return GameOutcome(winner_seat, turns, tuple(bankruptcies))
+
+    def _take_turn(self, game: GameState, seat: int) -> Optional[str]:
+        """Play one turn; returns the bankruptcy cause if the player went bankrupt"""
+        engine = self.engine
+        room_code = game.room_code
+        player = game.players[game.current_player]
+        policy = self.policies[seat]
+
+        if player.in_jail and policy.should_leave_jail(game, player, engine.rng):
+            engine.pay_jail_fine(room_code, player.id)
+        _, _, total = engine.roll_dice(room_code, player.id)
+        cause = None
+        if game.turn_phase == "move":
+            position = engine.move_player(room_code, player.id, total)
+            cause = self._resolve_landing(game, player, seat, position)
+
+        if cause is None:
+            for position in policy.plan_unmortgages(game, player, engine.rng):
+                engine.unmortgage_property(room_code, player.id, position)
+            for action, target in policy.plan_builds(game, player, engine.rng):
+                build = engine.build_hotel if action == "hotel" else engine.build_house
+                build(room_code, player.id, target)
+            engine.end_turn(room_code, player.id)
+        return cause
+
+    def _resolve_landing(self, game: GameState, player: Player, seat: int, position: int) -> Optional[str]:
+        engine = self.engine
+        room_code = game.room_code
+        square = BOARD[position]
+
+        if square.price:
+            owner_id = game._board.owners[position]
+            if owner_id is None:
+                if player.money >= square.price and self.policies[seat].should_buy(game, player, position, engine.rng):
+                    engine.buy_property(room_code, player.id, position)
+            elif owner_id != player.id:
+                self._raise_cash(game, player, seat, engine.square_rent(game, position))
+                engine.pay_rent(room_code, player.id, position)
+                return self._bankruptcy_cause(game, player, "rent")
+
+        elif square.type == "tax":
+            self._raise_cash(game, player, seat, square.amount or 0)
+            engine.pay_tax(room_code, player.id, position)
+            return self._bankruptcy_cause(game, player, "tax")
+
+        elif square.type in ("chance", "community"):
+            if square.type == "chance":
+                card = engine.draw_chance_card(room_code, player.id)
+            else:
+                card = engine.draw_community_chest_card(room_code, player.id)
+            cause = self._bankruptcy_cause(game, player, "card")
+            # Cards that move the token land on the new square; target moves settle their own rent
+            if (cause is None and not game.game_ended and card.type == "move"
+                    and card.target is None and player.position != position):
+                return self._resolve_landing(game, player, seat, player.position)
+            return cause
+
+        elif position == GO_TO_JAIL_POSITION:
+            engine.send_to_jail(room_code, player.id)
+
+        return None
+
+    def _raise_cash(self, game: GameState, player: Player, seat: int, amount: int):
+        """Mortgage squares the seat's policy picks before a payment it cannot cover"""
+        if player.money >= amount:
+            return
+        for position in self.policies[seat].plan_mortgages(game, player, amount, self.engine.rng):
+            self.engine.mortgage_property(game.room_code, player.id, position)
+
+    @staticmethod
+    def _bankruptcy_cause(game: GameState, player: Player, cause: str) -> Optional[str]:
+        return None if game._index.player(player.id) else cause
+
+    def run(self, seeds) -> SimulationStats:
+        stats = SimulationStats()
+        for seed in seeds:
+            stats.add(self.play(seed), self.seat_policies)
+        return stats
+
+# Simulator reused by every batch that runs in a pool worker
+_worker_simulator: Optional[Simulator] = None
+
+def _run_batch(args: Tuple[SimulationConfig, int, int]) -> SimulationStats:
+    global _worker_simulator
+    config, first_seed, count = args
+    if _worker_simulator is None or _worker_simulator.config != config:
+        _worker_simulator = Simulator(config)
+    return _worker_simulator.run(range(first_seed, first_seed + count))
+
+def run_simulation(config: SimulationConfig, games: int, seed: int = 0,
+                   workers: Optional[int] = None, batch_size: int = 500) -> Dict:
+    """Simulate games with consecutive seeds and report throughput and outcomes"""
+    workers = workers or os.cpu_count() or 1
+    batches = [
+        (config, first_seed, min(batch_size, seed + games - first_seed))
+        for first_seed in range(seed, seed + games, batch_size)
+    ]
+
+    start = time.perf_counter()
+    stats = SimulationStats()
+    if workers == 1:
+        for batch in batches:
+            stats.merge(_run_batch(batch))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for batch_stats in executor.map(_run_batch, batches):
+                stats.merge(batch_stats)
+    elapsed = time.perf_counter() - start
+
+    report = stats.to_dict()
+    report.update({
+        "seconds": elapsed,
+        "games_per_second": stats.games / elapsed if elapsed else 0.0,
+        "workers": workers,
+        "seat_policies": config.seat_policies(),
+    })
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless Monopoly self-play games")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--policies", default="always",
+                        help=f"comma separated per-seat policies: {', '.join(sorted(POLICIES))} (e.g. reserve:3000)")
+    parser.add_argument("--starting-money", type=int, default=15000)
+    parser.add_argument("--max-turns", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    config = SimulationConfig(
+        players=args.players,
+        policies=tuple(args.policies.split(",")),
+        starting_money=args.starting_money,
+        max_turns=args.max_turns,
+    )
+    for spec in config.policies:
+        make_policy(spec)
+
+    report = run_simulation(config, args.games, args.seed, args.workers, args.batch_size)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
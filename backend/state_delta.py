@@ -0,0 +1,111 @@
+from typing import Any, Dict, List, Optional, Set
+
+# GameState fields that are sent as scalar values in a patch
+PATCH_FIELDS = (
+    "current_player",
+    "dice_values",
+    "turn_phase",
+    "winner",
+    "game_started",
+    "game_ended",
+    "houses_remaining",
+    "hotels_remaining",
+    "chance_index",
+    "community_chest_index",
+)
+
+class ChangeSet:
+    """Mutations applied to a game since the last published patch"""
+
+    __slots__ = ("players", "properties", "fields", "removed_players", "log_seq")
+
+    def __init__(self, log_seq: int = 0):
+        self.players: Set[str] = set()
+        self.properties: Set[int] = set()
+        self.fields: Set[str] = set()
+        self.removed_players: List[str] = []
+        # Sequence number of the first log event not yet published
+        self.log_seq = log_seq
+
+    def mark_player(self, *player_ids: str):
+        """Record that one or more players changed"""
+        self.players.update(player_ids)
+
+    def mark_property(self, *property_ids: int):
+        """Record that one or more properties changed"""
+        self.properties.update(property_ids)
+
+    def mark_fields(self, *names: str):
+        """Record that top-level game fields changed"""
+        self.fields.update(names)
+
+    def remove_player(self, player_id: str):
+        """Record that a player left the game"""
+        self.players.discard(player_id)
+        self.removed_players.append(player_id)
+
+    def is_empty(self, next_log_seq: int) -> bool:
+        """Check whether there is anything to publish"""
+        return not (self.players or self.properties or self.fields
+                    or self.removed_players or next_log_seq > self.log_seq)
+
+    def reset(self, log_seq: int):
+        """Start tracking a new patch"""
+        self.players.clear()
+        self.properties.clear()
+        self.fields.clear()
+        self.removed_players = []
+        self.log_seq = log_seq
+
+class NullChangeSet(ChangeSet):
+    """Change set that records nothing, for games rebuilt without publishing patches"""
+
+    __slots__ = ()
+
+    def mark_player(self, *player_ids: str):
+        pass
+
+    def mark_property(self, *property_ids: int):
+        pass
+
+    def mark_fields(self, *names: str):
+        pass
+
+    def remove_player(self, player_id: str):
+        pass
+
+def build_patch(game, changes: ChangeSet) -> Optional[Dict[str, Any]]:
+    """Build a compact patch from a change set and advance the game version
+
+    Returns None when nothing changed, so callers can skip sending a patch.
+    """
+    if changes.is_empty(game._log.next_seq):
+        return None
+
+    base_version = game.version
+    game.version += 1
+    game.touch()
+
+    patch: Dict[str, Any] = {
+        "version": game.version,
+        "base_version": base_version,
+    }
+
+    index = game._index
+    if changes.players:
+        patch["players"] = [index.player(player_id).dict() for player_id in sorted(changes.players)
+                            if index.player(player_id)]
+    if changes.removed_players:
+        patch["removed_players"] = list(changes.removed_players)
+    if changes.properties:
+        patch["properties"] = [game._board.view(property_id).dict() for property_id in sorted(changes.properties)]
+    if changes.fields:
+        patch["fields"] = {name: getattr(game, name) for name in PATCH_FIELDS if name in changes.fields}
+    # Any change to cash or squares can reorder the leaderboard
+    if changes.players or changes.properties or changes.removed_players:
+        patch["standings"] = game.standings
+    if game._log.next_seq > changes.log_seq:
+        patch["log"] = [event.to_dict() for event in game._log.since(changes.log_seq)]
+
+    changes.reset(game._log.next_seq)
+    return patch
@@ -0,0 +1,87 @@
+"""Pending trade offers indexed by id, sender and recipient
+
+Offers only live here while pending; an accepted, rejected, cancelled or
+expired offer is removed, so every lookup is over open offers alone.
+Expiry deadlines are kept by the reaper's "trade" heap, not per offer.
+"""
+import os
+from typing import Dict, Iterator, List, Optional, Set
+
+from models import TradeOffer
+
+# Open offers one player may have sent at a time
+MAX_PENDING_PER_PLAYER = int(os.environ.get("TRADE_MAX_PENDING_PER_PLAYER", "10"))
+
+class TradeBook:
+    """Open trade offers with per-player indexes
+
+    add/remove keep the sender and recipient indexes in step with the
+    offers, so finding a player's offers never scans other players'.
+    """
+
+    __slots__ = ("offers", "by_sender", "by_recipient")
+
+    def __init__(self):
+        self.offers: Dict[str, TradeOffer] = {}
+        # player id -> ids of the open offers they sent / received
+        self.by_sender: Dict[str, Set[str]] = {}
+        self.by_recipient: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.offers)
+
+    def __contains__(self, trade_id: str) -> bool:
+        return trade_id in self.offers
+
+    def __iter__(self) -> Iterator[TradeOffer]:
+        return iter(self.offers.values())
+
+    def get(self, trade_id: str) -> Optional[TradeOffer]:
+        return self.offers.get(trade_id)
+
+    def sent_by(self, player_id: str) -> Set[str]:
+        """Ids of the open offers a player sent"""
+        return self.by_sender.get(player_id, set())
+
+    def received_by(self, player_id: str) -> Set[str]:
+        """Ids of the open offers made to a player"""
+        return self.by_recipient.get(player_id, set())
+
+    def for_player(self, player_id: str) -> List[TradeOffer]:
+        """Open offers a player sent or received, oldest first"""
+        trade_ids = self.sent_by(player_id) | self.received_by(player_id)
+        return sorted((self.offers[trade_id] for trade_id in trade_ids), key=lambda trade: trade.created_at)
+
+    def add(self, trade: TradeOffer):
+        if trade.id in self.offers:
+            raise ValueError("Trade already exists")
+        self.offers[trade.id] = trade
+        self.by_sender.setdefault(trade.from_player_id, set()).add(trade.id)
+        self.by_recipient.setdefault(trade.to_player_id, set()).add(trade.id)
+
+    def remove(self, trade_id: str) -> Optional[TradeOffer]:
+        """Drop an offer from the book and both indexes"""
+        trade = self.offers.pop(trade_id, None)
+        if trade is not None:
+            self._unindex(self.by_sender, trade.from_player_id, trade_id)
+            self._unindex(self.by_recipient, trade.to_player_id, trade_id)
+        return trade
+
+    def remove_player(self, player_id: str, room_code: Optional[str] = None) -> List[TradeOffer]:
+        """Drop every open offer a player sent or received, only those of room_code if given
+
+        Forks of a game share its player ids, so dropping a fork's offers
+        must leave the original game's alone.
+        """
+        trade_ids = self.sent_by(player_id) | self.received_by(player_id)
+        if room_code is not None:
+            trade_ids = {trade_id for trade_id in trade_ids if self.offers[trade_id].room_code == room_code}
+        return [trade for trade in map(self.remove, trade_ids) if trade is not None]
+
+    @staticmethod
+    def _unindex(index: Dict[str, Set[str]], player_id: str, trade_id: str):
+        trade_ids = index.get(player_id)
+        if trade_ids is not None:
+            trade_ids.discard(trade_id)
+            if not trade_ids:
+                del index[player_id]
@@ -1,13 +1,74 @@
 import asyncio
-import json
-from typing import Dict, List, Set
+import os
+import time
+from typing import Dict, List, Optional, Set
 from fastapi import WebSocket
 import logging
 
+from metrics import (broadcast_recipients, broadcast_seconds, encode_seconds, send_failures,
+                     sent_bytes, sent_messages)
+from wire_format import JSON_FORMAT, Frame, OutboundFrame, WireFormat, encode_json
+
 logger = logging.getLogger(__name__)
 
-class ConnectionManager:
+# Seconds a single send may take before the connection is dropped
+SEND_TIMEOUT = float(os.environ.get("WS_SEND_TIMEOUT", "5"))
+
+def encode_frame(message: dict) -> str:
+    """Encode a message as a JSON text frame; datetimes become ISO strings"""
+    return encode_json(message)
+
+def splice_frame(message: dict, key: str, encoded: str) -> str:
+    """Encode a message plus one field whose value is already JSON text
+
+    Lets a cached game snapshot go out without being encoded again.
+    """
+    head = encode_frame(message)
+    return head[:-1] + ("," if len(head) > 2 else "") + encode_frame(key) + ":" + encoded + "}"
+
+def _encode_timed(message: dict) -> str:
+    start = time.perf_counter()
+    frame = encode_frame(message)
+    encode_seconds.observe(time.perf_counter() - start, message.get("type", "unknown"))
+    return frame
+
+class FanoutStats:
+    """Aggregate timing of room broadcasts"""
+
+    __slots__ = ("broadcasts", "sends", "failures", "total_seconds", "max_seconds", "last_seconds")
+
     def __init__(self):
+        self.broadcasts = 0
+        self.sends = 0
+        self.failures = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = 0.0
+
+    def record(self, sends: int, failures: int, seconds: float):
+        """Record one completed fan-out"""
+        self.broadcasts += 1
+        self.sends += sends
+        self.failures += failures
+        self.total_seconds += seconds
+        self.last_seconds = seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+
+    def to_dict(self) -> dict:
+        """Summarize the collected timings"""
+        return {
+            "broadcasts": self.broadcasts,
+            "sends": self.sends,
+            "failures": self.failures,
+            "total_seconds": self.total_seconds,
+            "max_seconds": self.max_seconds,
+            "last_seconds": self.last_seconds,
+            "avg_seconds": self.total_seconds / self.broadcasts if self.broadcasts else 0.0,
+        }
+
+class ConnectionManager:
+    def __init__(self, send_timeout: float = SEND_TIMEOUT):
         # Store active connections by room
         self.active_connections: Dict[str, List[WebSocket]] = {}
         # Store player to websocket mapping
@@ -16,10 +77,31 @@ class ConnectionManager:
         self.connection_players: Dict[WebSocket, str] = {}
         # Store websocket to room mapping
         self.connection_rooms: Dict[WebSocket, str] = {}
+        # Store websocket to negotiated wire format, for non-JSON clients
+        self.connection_formats: Dict[WebSocket, WireFormat] = {}
+        # Per-send timeout and broadcast timing
+        self.send_timeout = send_timeout
+        self.fanout_stats = FanoutStats()
+        # Message bus shared with the other workers, when sharded
+        self.bus = None
+        self.worker_id: Optional[str] = None
+
+    def attach_bus(self, bus, worker_id: str):
+        """Relay room broadcasts and personal messages through a message bus
+
+        Each worker subscribes to the rooms and players it holds sockets for,
+        so a frame published by a room's owner reaches every worker that has
+        a player of that room connected.
+        """
+        self.bus = bus
+        self.worker_id = worker_id
 
-    async def connect(self, websocket: WebSocket, room_code: str, player_id: str):
+    async def connect(self, websocket: WebSocket, room_code: str, player_id: str,
+                      wire_format: WireFormat = JSON_FORMAT):
         """Connect a player to a room"""
         await websocket.accept()
+        if wire_format is not JSON_FORMAT:
+            self.connection_formats[websocket] = wire_format
         
         # Initialize room if it doesn't exist
         if room_code not in self.active_connections:
@@ -33,6 +115,11 @@ class ConnectionManager:
         self.connection_players[websocket] = player_id
         self.connection_rooms[websocket] = room_code
         
+        if self.bus is not None:
+            if len(self.active_connections[room_code]) == 1:
+                await self.bus.subscribe(f"room:{room_code}", self._on_room_frame)
+            await self.bus.subscribe(f"player:{player_id}", self._on_player_frame)
+        
         logger.info(f"Player {player_id} connected to room {room_code}")
 
     async def disconnect(self, websocket: WebSocket):
@@ -47,55 +134,156 @@ class ConnectionManager:
                 # Clean up empty rooms
                 if not self.active_connections[room_code]:
                     del self.active_connections[room_code]
+                    if self.bus is not None:
+                        await self.bus.unsubscribe(f"room:{room_code}", self._on_room_frame)
             
             # Clean up mappings
-            if player_id:
-                self.player_connections.pop(player_id, None)
+            if player_id and self.player_connections.get(player_id) is websocket:
+                del self.player_connections[player_id]
+                if self.bus is not None:
+                    await self.bus.unsubscribe(f"player:{player_id}", self._on_player_frame)
             self.connection_players.pop(websocket, None)
             self.connection_rooms.pop(websocket, None)
+            self.connection_formats.pop(websocket, None)
             
             logger.info(f"Player {player_id} disconnected from room {room_code}")
             
         except Exception as e:
             logger.error(f"Error during disconnect: {e}")
 
-    async def send_personal_message(self, message: dict, player_id: str):
-        """Send message to a specific player"""
+    async def send_personal_message(self, message: dict, player_id: str, frame: Optional[str] = None):
+        """Send message to a specific player
+
+        frame, when given, is the message already encoded as JSON.
+        """
+        message_type = message.get("type", "unknown")
+        if player_id in self.player_connections:
+            await self._send_personal_frame(frame or _encode_timed(message), player_id, message_type, message)
+        elif self.bus is not None:
+            # The player may be connected to another worker
+            await self.bus.publish(f"player:{player_id}", {
+                "player_id": player_id,
+                "type": message_type,
+                "frame": frame or _encode_timed(message)
+            })
+
+    async def _send_personal_frame(self, frame: str, player_id: str, message_type: str = "unknown",
+                                   message: Optional[dict] = None):
         websocket = self.player_connections.get(player_id)
         if websocket:
             try:
-                await websocket.send_text(json.dumps(message))
+                # Bounded like broadcasts, so a stalled client cannot hold up the room queue
+                size = await self._send_frame(websocket, OutboundFrame(frame, message))
+                sent_messages.inc(message_type)
+                sent_bytes.inc(message_type, amount=size)
             except Exception as e:
-                logger.error(f"Error sending personal message to {player_id}: {e}")
+                send_failures.inc()
+                reason = "send timed out" if isinstance(e, asyncio.TimeoutError) else e
+                logger.error(f"Error sending personal message to {player_id}: {reason}")
                 await self.disconnect(websocket)
 
-    async def broadcast_to_room(self, message: dict, room_code: str, exclude_player: str = None):
-        """Broadcast message to all players in a room"""
-        if room_code not in self.active_connections:
-            return
-            
-        connections = self.active_connections[room_code].copy()
-        disconnected = []
+    async def broadcast_to_room(self, message: dict, room_code: str, exclude_player: str = None,
+                                frame: Optional[str] = None) -> float:
+        """Broadcast message to all players in a room
+
+        frame, when given, is the message already encoded as JSON. Returns the
+        fan-out duration in seconds.
+        """
+        if room_code not in self.active_connections and self.bus is None:
+            return 0.0
         
-        for connection in connections:
-            try:
-                player_id = self.connection_players.get(connection)
-                if exclude_player and player_id == exclude_player:
-                    continue
-                    
-                await connection.send_text(json.dumps(message))
-            except Exception as e:
-                logger.error(f"Error broadcasting to room {room_code}: {e}")
+        # Encode once and share the frame between all sockets
+        message_type = message.get("type", "unknown")
+        frame = frame or _encode_timed(message)
+        if self.bus is not None:
+            await self.bus.publish(f"room:{room_code}", {
+                "origin": self.worker_id,
+                "room_code": room_code,
+                "type": message_type,
+                "frame": frame,
+                "exclude": exclude_player
+            })
+        return await self.broadcast_frame(frame, room_code, exclude_player, message_type, message)
+
+    async def _on_room_frame(self, message: dict):
+        # Our own broadcasts were already delivered locally
+        if message["origin"] != self.worker_id:
+            await self.broadcast_frame(message["frame"], message["room_code"], message["exclude"], message["type"])
+
+    async def _on_player_frame(self, message: dict):
+        await self._send_personal_frame(message["frame"], message["player_id"], message["type"])
+
+    async def broadcast_frame(self, frame: str, room_code: str, exclude_player: str = None,
+                              message_type: str = "unknown", message: Optional[dict] = None) -> float:
+        """Send an already encoded JSON frame to all players in a room concurrently
+
+        Connections that negotiated another wire format get it re-encoded once
+        per format, from message when given.
+        """
+        connections = [
+            connection for connection in self.active_connections.get(room_code, [])
+            if not (exclude_player and self.connection_players.get(connection) == exclude_player)
+        ]
+        if not connections:
+            return 0.0
+        
+        outbound = OutboundFrame(frame, message)
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(self._send_frame(connection, outbound) for connection in connections),
+            return_exceptions=True
+        )
+        elapsed = time.perf_counter() - start
+        
+        disconnected = []
+        size = 0
+        for connection, result in zip(connections, results):
+            if isinstance(result, BaseException):
+                reason = "send timed out" if isinstance(result, asyncio.TimeoutError) else result
+                logger.error(f"Error broadcasting to room {room_code}: {reason}")
                 disconnected.append(connection)
+            else:
+                size += result
+        
+        self.fanout_stats.record(len(connections), len(disconnected), elapsed)
+        broadcast_seconds.observe(elapsed)
+        broadcast_recipients.observe(len(connections))
+        sent_messages.inc(message_type, amount=len(connections) - len(disconnected))
+        sent_bytes.inc(message_type, amount=size)
+        if disconnected:
+            send_failures.inc(amount=len(disconnected))
+        logger.debug(f"Broadcast to {len(connections)} connections in room {room_code} took {elapsed * 1000:.2f}ms")
         
         # Clean up disconnected connections
         for connection in disconnected:
             await self.disconnect(connection)
+        
+        return elapsed
+
+    async def _send_frame(self, connection: WebSocket, outbound: OutboundFrame) -> int:
+        """Send a frame to one socket, bounded by the send timeout"""
+        return await asyncio.wait_for(self._send(connection, outbound), timeout=self.send_timeout)
+
+    async def _send(self, connection: WebSocket, outbound: OutboundFrame) -> int:
+        """Send a frame in the socket's wire format; returns the bytes written"""
+        data: Frame = outbound.for_format(self.connection_formats.get(connection, JSON_FORMAT))
+        if isinstance(data, bytes):
+            await connection.send_bytes(data)
+        else:
+            await connection.send_text(data)
+            return outbound.text_size
+        return len(data)
+
+    def wire_format(self, websocket: WebSocket) -> WireFormat:
+        return self.connection_formats.get(websocket, JSON_FORMAT)
 
     async def broadcast_to_all(self, message: dict):
         """Broadcast message to all connected players"""
-        for room_code in self.active_connections:
-            await self.broadcast_to_room(message, room_code)
+        frame = _encode_timed(message)
+        await asyncio.gather(*(
+            self.broadcast_frame(frame, room_code, message_type=message.get("type", "unknown"), message=message)
+            for room_code in list(self.active_connections)
+        ))
 
     def get_room_players(self, room_code: str) -> List[str]:
         """Get list of player IDs in a room"""
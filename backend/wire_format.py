@@ -0,0 +1,157 @@
+"""Websocket message encodings negotiated per connection
+
+Clients pick an encoding and optional compression with query parameters on
+/ws/{room_code}/{player_id}:
+
+    ?encoding=json|msgpack    json (default) uses text frames, msgpack binary ones
+    &compression=deflate      frames of COMPRESS_MIN_BYTES or more are zlib-compressed
+
+With compression negotiated every binary frame starts with a header byte,
+0x00 for a raw payload and 0x01 for a zlib stream; JSON frames that are
+not compressed stay text frames. Inbound frames use the same rules.
+"""
+import json
+import os
+import zlib
+from datetime import datetime
+from typing import Dict, Optional, Union
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; only JSON is offered without it
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the standard library encoder is the fallback
+    orjson = None
+
+# Smallest encoded payload worth compressing
+COMPRESS_MIN_BYTES = int(os.environ.get("WS_COMPRESS_MIN_BYTES", "1024"))
+# zlib level; 1 trades ratio for speed on hot broadcast paths
+COMPRESS_LEVEL = int(os.environ.get("WS_COMPRESS_LEVEL", "1"))
+
+RAW_HEADER = b"\x00"
+DEFLATE_HEADER = b"\x01"
+
+Frame = Union[str, bytes]
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def encode_json(message: dict) -> str:
+        """Encode a message as compact JSON text; datetimes become ISO strings"""
+        return orjson.dumps(message, default=_default, option=_ORJSON_OPTIONS).decode()
+
+    decode_json = orjson.loads
+else:
+    def encode_json(message: dict) -> str:
+        """Encode a message as compact JSON text; datetimes become ISO strings"""
+        return json.dumps(message, default=_default, separators=(",", ":"))
+
+    decode_json = json.loads
+
+def encode_msgpack(message: dict) -> bytes:
+    return msgpack.packb(message, default=_default, use_bin_type=True)
+
+def decode_msgpack(data: bytes) -> dict:
+    return msgpack.unpackb(data, raw=False)
+
+ENCODINGS = ("json", "msgpack") if msgpack is not None else ("json",)
+COMPRESSIONS = ("deflate",)
+
+class WireFormat:
+    """Encoding and compression used on one connection"""
+
+    __slots__ = ("encoding", "compression", "key")
+
+    def __init__(self, encoding: str = "json", compression: Optional[str] = None):
+        self.encoding = encoding
+        self.compression = compression
+        self.key = (encoding, compression)
+
+    @property
+    def binary(self) -> bool:
+        return self.encoding != "json"
+
+    def to_dict(self) -> dict:
+        return {"encoding": self.encoding, "compression": self.compression}
+
+    def pack(self, payload: Frame) -> Frame:
+        """Apply compression framing to an encoded payload"""
+        if self.compression is None:
+            return payload
+        if len(payload) >= COMPRESS_MIN_BYTES:
+            data = payload.encode() if isinstance(payload, str) else payload
+            return DEFLATE_HEADER + zlib.compress(data, COMPRESS_LEVEL)
+        return RAW_HEADER + payload if isinstance(payload, bytes) else payload
+
+    def encode(self, message: dict) -> Frame:
+        payload = encode_msgpack(message) if self.binary else encode_json(message)
+        return self.pack(payload)
+
+    def decode(self, frame: Frame) -> dict:
+        """Decode an inbound text or binary frame"""
+        if isinstance(frame, str):
+            return decode_json(frame)
+        if self.compression is not None:
+            header, frame = frame[:1], frame[1:]
+            if header == DEFLATE_HEADER:
+                frame = zlib.decompress(frame)
+            elif header != RAW_HEADER:
+                raise ValueError("Unknown frame header")
+        return decode_msgpack(frame) if self.binary else decode_json(frame)
+
+JSON_FORMAT = WireFormat()
+
+def negotiate(encoding: Optional[str], compression: Optional[str]) -> WireFormat:
+    """Wire format for a connection; unsupported choices fall back to JSON and no compression"""
+    if encoding not in ENCODINGS:
+        encoding = "json"
+    if compression not in COMPRESSIONS:
+        compression = None
+    if encoding == "json" and compression is None:
+        return JSON_FORMAT
+    return WireFormat(encoding, compression)
+
+class OutboundFrame:
+    """One message encoded at most once per wire format
+
+    A broadcast shares one of these between every socket in the room, so a
+    room with mixed clients pays one encode per format rather than per socket.
+    """
+
+    __slots__ = ("text", "_message", "_frames", "_text_size")
+
+    def __init__(self, text: str, message: Optional[dict] = None):
+        # The JSON encoding, which is also what travels over the message bus
+        self.text = text
+        self._message = message
+        self._frames: Dict[tuple, Frame] = {}
+        self._text_size: Optional[int] = None
+
+    @property
+    def text_size(self) -> int:
+        """UTF-8 size of the JSON text"""
+        if self._text_size is None:
+            self._text_size = len(self.text.encode())
+        return self._text_size
+
+    def for_format(self, wire_format: WireFormat) -> Frame:
+        if wire_format is JSON_FORMAT:
+            return self.text
+        frame = self._frames.get(wire_format.key)
+        if frame is None:
+            if wire_format.binary:
+                if self._message is None:
+                    self._message = decode_json(self.text)
+                payload = encode_msgpack(self._message)
+            else:
+                payload = self.text
+            frame = self._frames[wire_format.key] = wire_format.pack(payload)
+        return frame
@@ -0,0 +1,145 @@
+"""Timing helpers and the baseline recorder shared by the benchmark tests
+
+Each case is timed (best of several rounds) and compared with the stored
+baseline in benchmark_baseline.json, scaled by a calibration loop so the
+baseline carries across machines. Calibration is repeated next to every
+case so load changes during the run are tracked, and never tightens the
+limit below the raw baseline. A case fails when it is slower than
+baseline * scale * BENCH_THRESHOLD (default 1.5).
+
+Tests take the session-wide `recorder` fixture from conftest.py, which
+marks them as benchmarks. The default run leaves them out, so the
+regression gate only holds where they are asked for; CI runs --benchmarks:
+
+    python -m pytest tests --benchmarks -q
+    python -m pytest tests -m benchmark -q
+    BENCH_UPDATE=1 python -m pytest tests -q     # add cases missing from the baseline
+    BENCH_UPDATE=all python -m pytest tests -q   # re-record every case
+
+BENCH_UPDATE=1 still checks the cases already in the baseline and only
+appends new ones, scaled to the stored calibration, so adding a benchmark
+never moves the limits of the others. Re-recording everything is a
+deliberate step of its own.
+"""
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import pytest
+
+from game_engine import MonopolyGameEngine
+from models import GameState, Player
+
+BASELINE_PATH = Path(__file__).with_name("benchmark_baseline.json")
+THRESHOLD = float(os.environ.get("BENCH_THRESHOLD", "1.5"))
+REWRITE_BASELINE = os.environ.get("BENCH_UPDATE", "0").lower() == "all"
+UPDATE_BASELINE = REWRITE_BASELINE or os.environ.get("BENCH_UPDATE", "0").lower() in ("1", "true", "yes")
+# Seconds each timing round should last
+ROUND_SECONDS = 0.02
+ROUNDS = 5
+
+def _best_per_call(run: Callable[[int], float]) -> float:
+    """Best per-call time over several rounds, sizing rounds to ROUND_SECONDS"""
+    number = 1
+    while True:
+        elapsed = run(number)
+        if elapsed >= ROUND_SECONDS or number >= 1 << 20:
+            break
+        number *= 2
+    return min([elapsed] + [run(number) for _ in range(ROUNDS - 1)]) / number
+
+def measure(fn: Callable[[], object], setup: Optional[Callable[[], Tuple]] = None) -> float:
+    """Seconds per call of fn, excluding any per-call setup"""
+    if setup is None:
+        def run(number: int) -> float:
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            return time.perf_counter() - start
+    else:
+        def run(number: int) -> float:
+            total = 0.0
+            for _ in range(number):
+                args = setup()
+                start = time.perf_counter()
+                fn(*args)
+                total += time.perf_counter() - start
+            return total
+    return _best_per_call(run)
+
+def calibrate() -> float:
+    """Time a fixed pure-Python workload to compare machine speed"""
+    def workload():
+        table = {}
+        for i in range(2000):
+            table[i % 97] = table.get(i % 97, 0) + i * i
+        return sorted(table.values())
+    return measure(workload)
+
+def make_players(count: int, money: int = 15000):
+    return [Player(id=f"p{seat}", name=f"Player {seat}", avatar="", color="", money=money) for seat in range(count)]
+
+def make_game(engine: MonopolyGameEngine, players: int, log_entries: int = 0, room_code: str = "BENCH") -> GameState:
+    game = engine.create_game(room_code, make_players(players), seed=1)
+    for i in range(log_entries):
+        game._log.add("message", message=f"entry {i}")
+    return game
+
+def give(game: GameState, player_id: str, positions):
+    player = game._index.player(player_id)
+    for position in positions:
+        game._index.set_owner(game._board, position, player_id)
+        player.properties.append(position)
+
+class BenchmarkRecorder:
+    def __init__(self):
+        self.baseline: Dict = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+        self.calibrations = []
+        self.results: Dict[str, float] = {}
+
+    def scale(self) -> float:
+        """How much slower this machine is right now than the baseline machine"""
+        calibration = calibrate()
+        self.calibrations.append(calibration)
+        baseline_calibration = self.baseline.get("calibration")
+        return max(1.0, calibration / baseline_calibration) if baseline_calibration else 1.0
+
+    def check(self, name: str, seconds: float):
+        self.results[name] = seconds
+        scale = self.scale()
+        if REWRITE_BASELINE:
+            return
+        expected = self.baseline.get("results", {}).get(name)
+        if expected is None and UPDATE_BASELINE:
+            return
+        if expected is None:
+            pytest.skip(f"No baseline for {name}; run with BENCH_UPDATE=1")
+        limit = expected * scale * THRESHOLD
+        assert seconds <= limit, (
+            f"{name} took {seconds * 1e6:.2f}us per call, "
+            f"limit {limit * 1e6:.2f}us ({expected * 1e6:.2f}us baseline x {scale:.2f} x {THRESHOLD})"
+        )
+
+    def save(self):
+        """Write new cases into the baseline, or every case with BENCH_UPDATE=all"""
+        if not self.results:
+            return
+        calibration = min(self.calibrations)
+        baseline_calibration = self.baseline.get("calibration")
+        results = dict(self.baseline.get("results", {}))
+        if REWRITE_BASELINE or not baseline_calibration:
+            results.update(self.results)
+        else:
+            # Express new cases in the stored calibration's terms
+            factor = baseline_calibration / calibration
+            added = {name: seconds * factor for name, seconds in self.results.items() if name not in results}
+            if not added:
+                return
+            results.update(added)
+            calibration = baseline_calibration
+        BASELINE_PATH.write_text(json.dumps({
+            "calibration": calibration,
+            "results": dict(sorted(results.items())),
+        }, indent=2) + "\n")
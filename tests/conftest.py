@@ -0,0 +1,36 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Backend modules import each other as top-level modules
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from .benchmarking import UPDATE_BASELINE, BenchmarkRecorder
+
+def pytest_addoption(parser):
+    parser.addoption("--benchmarks", action="store_true", help="also run the timing benchmarks")
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: engine microbenchmark compared against the stored baseline")
+
+def pytest_collection_modifyitems(config, items):
+    """Mark every test timed by the recorder; leave them out unless asked for"""
+    for item in items:
+        if "recorder" in item.fixturenames:
+            item.add_marker(pytest.mark.benchmark)
+    if config.getoption("--benchmarks") or config.getoption("markexpr") or UPDATE_BASELINE:
+        return
+    deselected = [item for item in items if item.get_closest_marker("benchmark")]
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = [item for item in items if not item.get_closest_marker("benchmark")]
+
+@pytest.fixture(scope="session")
+def recorder():
+    recorder = BenchmarkRecorder()
+    yield recorder
+    if UPDATE_BASELINE:
+        recorder.save()
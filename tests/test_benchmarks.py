@@ -0,0 +1,202 @@
+"""Microbenchmarks of the game engine hot paths; see benchmarking.py for how they run
+
+    python -m pytest tests/test_benchmarks.py --benchmarks -q
+"""
+import copy
+import json
+import random
+from typing import Dict
+
+import pytest
+
+from board import BOARD
+from game_engine import MonopolyGameEngine
+from persistence import game_document
+from wire_format import ENCODINGS, encode_json, negotiate
+from dispatch import ConnectionLimits, Dispatcher
+from messages import BuyPropertyMessage, CreateRoomMessage
+
+from .benchmarking import give, make_game, make_players, measure
+
+@pytest.fixture
+def engine():
+    return MonopolyGameEngine(rng=random.Random(0))
+
+@pytest.mark.parametrize("players", [2, 4, 6])
+def test_create_game(recorder, engine, players):
+    roster = make_players(players)
+    recorder.check(f"create_game[{players}]", measure(lambda: engine.create_game("BENCH", roster, seed=1)))
+
+@pytest.mark.parametrize("players", [2, 4, 6])
+def test_roll_and_move(recorder, engine, players):
+    game = make_game(engine, players)
+
+    def turn():
+        player_id = game.players[game.current_player].id
+        game.turn_phase = "roll"
+        _, _, total = engine.roll_dice("BENCH", player_id)
+        engine.move_player("BENCH", player_id, total)
+
+    recorder.check(f"roll_and_move[{players}]", measure(turn))
+
+RENT_CASES = {
+    "property": ([1], 1, None),
+    "property_monopoly": ([1, 3], 1, None),
+    "property_houses": ([1, 3], 1, 3),
+    "property_hotel": ([1, 3], 1, "hotel"),
+    "railroad": ([5, 15, 25], 5, None),
+    "utility": ([12, 28], 12, None),
+}
+
+@pytest.mark.parametrize("case", sorted(RENT_CASES))
+def test_calculate_rent(recorder, engine, case):
+    owned, position, buildings = RENT_CASES[case]
+    game = make_game(engine, 4)
+    give(game, "p1", owned)
+    if buildings == "hotel":
+        game._index.set_buildings(game._board, position, 0, True)
+    elif buildings:
+        game._index.set_buildings(game._board, position, buildings)
+    property_obj = game._board.view(position)
+    assert engine.calculate_rent(property_obj, game) > 0
+
+    recorder.check(f"calculate_rent[{case}]", measure(lambda: engine.calculate_rent(property_obj, game)))
+
+@pytest.mark.parametrize("deck", ["chance", "community_chest"])
+def test_card_draw(recorder, engine, deck):
+    game = make_game(engine, 4)
+    draw = engine.draw_chance_card if deck == "chance" else engine.draw_community_chest_card
+    players = list(game.players)
+
+    def draw_card():
+        # Keep everyone solvent so payments never end the game mid-benchmark
+        for player in players:
+            player.money = 15000
+        players[0].position = 7
+        draw("BENCH", "p0")
+
+    recorder.check(f"card_draw[{deck}]", measure(draw_card))
+
+@pytest.mark.parametrize("creditor", ["bank", "player"])
+@pytest.mark.parametrize("owned", [0, 10])
+def test_handle_bankruptcy(recorder, engine, creditor, owned):
+    template = make_game(engine, 4)
+    purchasable = [square.id for square in BOARD if square.price]
+    give(template, "p0", purchasable[:owned])
+
+    def setup():
+        game = copy.deepcopy(template)
+        bankrupt = game._index.player("p0")
+        return game, bankrupt, game._index.player("p1") if creditor == "player" else None
+
+    recorder.check(f"handle_bankruptcy[{creditor},{owned}]", measure(engine.handle_bankruptcy, setup))
+
+@pytest.mark.parametrize("log_entries", [0, 500])
+@pytest.mark.parametrize("players", [2, 6])
+def test_game_dict(recorder, engine, players, log_entries):
+    game = make_game(engine, players, log_entries)
+    recorder.check(f"game_dict[{players},{log_entries}]", measure(game.dict))
+
+@pytest.mark.parametrize("log_entries", [0, 500])
+@pytest.mark.parametrize("players", [2, 6])
+def test_game_json(recorder, engine, players, log_entries):
+    game = make_game(engine, players, log_entries)
+    recorder.check(f"game_json[{players},{log_entries}]", measure(lambda: json.dumps(game.dict())))
+
+@pytest.mark.parametrize("cached", [True, False])
+@pytest.mark.parametrize("log_entries", [0, 500])
+@pytest.mark.parametrize("players", [2, 6])
+def test_game_snapshot_json(recorder, engine, players, log_entries, cached):
+    game = make_game(engine, players, log_entries)
+    assert json.loads(game.snapshot_json()) == json.loads(encode_json(game.dict()))
+
+    # A command must invalidate the cached encoding
+    before = game.snapshot_json()
+    game.turn_phase = "roll"
+    engine.roll_dice("BENCH", game.players[game.current_player].id)
+    assert game.snapshot_json() != before
+
+    def encode():
+        if not cached:
+            game.touch()
+        game.snapshot_json()
+
+    label = "hit" if cached else "miss"
+    recorder.check(f"game_snapshot_json[{players},{log_entries},{label}]", measure(encode))
+
+@pytest.mark.parametrize("log_entries", [0, 500])
+def test_persisted_document(recorder, engine, log_entries):
+    game = make_game(engine, 4, log_entries)
+    recorder.check(f"game_document[4,{log_entries}]",
+                   measure(lambda: json.dumps(game_document(game), default=str)))
+
+def wire_messages(engine) -> Dict[str, dict]:
+    """Representative outbound messages: a full snapshot, an event with a patch and a small event"""
+    game = make_game(engine, 4, 50)
+    snapshot = {"type": "game-started", "game_state": game.dict()}
+    player_id = game.players[0].id
+    _, _, total = engine.roll_dice("BENCH", player_id)
+    engine.move_player("BENCH", player_id, total)
+    moved = {"type": "player-moved", "player_id": player_id, "new_position": game.players[0].position,
+             "patch": engine.collect_patch("BENCH")}
+    chat = {"type": "chat-message", "player_id": player_id, "player_name": "Player 0",
+            "message": "namaste", "timestamp": "2024-01-01T00:00:00"}
+    return {"game-started": snapshot, "player-moved": moved, "chat-message": chat}
+
+WIRE_FORMATS = {
+    "json": negotiate("json", None),
+    "json_deflate": negotiate("json", "deflate"),
+    "msgpack": negotiate("msgpack", None),
+    "msgpack_deflate": negotiate("msgpack", "deflate"),
+}
+
+@pytest.mark.parametrize("message_type", ["game-started", "player-moved", "chat-message"])
+@pytest.mark.parametrize("wire", sorted(WIRE_FORMATS))
+def test_wire_encode(recorder, engine, wire, message_type):
+    wire_format = WIRE_FORMATS[wire]
+    if wire_format.key[0] != wire.split("_")[0]:
+        pytest.skip(f"{wire} is not available")
+    message = wire_messages(engine)[message_type]
+    recorder.check(f"wire_encode[{wire},{message_type}]", measure(lambda: wire_format.encode(message)))
+
+@pytest.mark.parametrize("message_type", ["game-started", "player-moved", "chat-message"])
+@pytest.mark.parametrize("wire", sorted(WIRE_FORMATS))
+def test_wire_decode(recorder, engine, wire, message_type):
+    wire_format = WIRE_FORMATS[wire]
+    if wire_format.key[0] != wire.split("_")[0]:
+        pytest.skip(f"{wire} is not available")
+    message = wire_messages(engine)[message_type]
+    frame = wire_format.encode(message)
+    assert wire_format.decode(frame) == json.loads(encode_json(message))
+    recorder.check(f"wire_decode[{wire},{message_type}]", measure(lambda: wire_format.decode(frame)))
+
+def test_wire_sizes(engine):
+    """Binary and compressed encodings must actually shrink the full snapshot"""
+    if "msgpack" not in ENCODINGS:
+        pytest.skip("msgpack is not installed")
+    snapshot = wire_messages(engine)["game-started"]
+    sizes = {wire: len(wire_format.encode(snapshot)) for wire, wire_format in WIRE_FORMATS.items()}
+    assert sizes["msgpack"] < sizes["json"]
+    assert sizes["json_deflate"] < sizes["json"] / 2
+    assert sizes["msgpack_deflate"] < sizes["msgpack"] / 2
+
+INBOUND_MESSAGES = {
+    "create-room": ({"type": "create-room", "player_name": "Player 0", "avatar": "x"}, CreateRoomMessage, "lobby"),
+    "buy-property": ({"type": "buy-property", "property_id": 1, "roomCode": "ROOM000000"}, BuyPropertyMessage, "game"),
+    "roll-dice": ({"type": "roll-dice"}, None, "game"),
+}
+
+@pytest.mark.parametrize("message_type", sorted(INBOUND_MESSAGES))
+def test_dispatch_accept(recorder, message_type):
+    message, schema, bucket = INBOUND_MESSAGES[message_type]
+    dispatcher = Dispatcher()
+
+    async def handler(room_code, player_id, payload):
+        pass
+
+    dispatcher.handles(message_type, schema, bucket=bucket)(handler)
+    # Unlimited, so every call takes the full validation path
+    limits = ConnectionLimits(scale=0)
+    spec, payload = dispatcher.accept(message, limits)
+    assert spec.handler is handler and payload["type"] == message_type
+    recorder.check(f"dispatch_accept[{message_type}]", measure(lambda: dispatcher.accept(message, limits)))
@@ -0,0 +1,199 @@
+"""Bot decisions, the building and jail commands they use, and the decision time budget"""
+import asyncio
+import random
+import time
+
+import pytest
+
+from board import BOARD, GROUP_MEMBERS
+from bots import (BotPool, BotView, cash_reserve, decide_buy, decide_jail, decision_timeouts, make_bot,
+                  measure_turns, plan_builds, play_turn)
+from game_engine import JAIL_FINE, MonopolyGameEngine
+from models import Player
+from replay import verify_replay
+
+from .benchmarking import measure
+
+ROOM = "BOTS"
+
+@pytest.fixture
+def engine():
+    return MonopolyGameEngine(rng=random.Random(0))
+
+@pytest.fixture
+def game(engine):
+    players = [Player(id=f"p{seat}", name=f"Player {seat}", avatar="", color="", money=30000) for seat in range(3)]
+    return engine.create_game(ROOM, players, seed=1)
+
+def own(engine, player_id, positions):
+    for position in positions:
+        engine.buy_property(ROOM, player_id, position)
+
+def doubles_seed() -> int:
+    """A seed whose first roll is a double"""
+    for seed in range(100):
+        rng = random.Random(seed)
+        if rng.randint(1, 6) == rng.randint(1, 6):
+            return seed
+
+def test_houses_go_up_evenly_then_hotels(engine, game):
+    brown = list(GROUP_MEMBERS[BOARD[1].owner_group])
+    own(engine, "p0", brown[:1])
+    with pytest.raises(ValueError, match="whole color group"):
+        engine.build_house(ROOM, "p0", brown[0])
+
+    own(engine, "p0", brown[1:])
+    money = game._index.player("p0").money
+    assert engine.build_house(ROOM, "p0", brown[0]) == 1
+    with pytest.raises(ValueError, match="evenly"):
+        engine.build_house(ROOM, "p0", brown[0])
+    engine.build_house(ROOM, "p0", brown[1])
+    for _ in range(3):
+        for position in brown:
+            engine.build_house(ROOM, "p0", position)
+    assert game._index.player("p0").money == money - 8 * BOARD[brown[0]].house_cost
+    assert game.houses_remaining == 32 - 8
+
+    with pytest.raises(ValueError, match="hotel instead"):
+        engine.build_house(ROOM, "p0", brown[0])
+    engine.build_hotel(ROOM, "p0", brown[0])
+    assert game._board.hotel[brown[0]] and game._board.houses[brown[0]] == 0
+    assert (game.houses_remaining, game.hotels_remaining) == (32 - 4, 11)
+    assert game._index.building_values["p0"] == 9 * BOARD[brown[0]].house_cost
+    assert verify_replay(game)
+
+def test_bankruptcy_to_the_bank_returns_buildings_to_the_supply(engine, game):
+    brown = list(GROUP_MEMBERS[BOARD[1].owner_group])
+    own(engine, "p0", brown)
+    for position in brown:
+        engine.build_house(ROOM, "p0", position)
+    engine.build_house(ROOM, "p0", brown[0])
+    own(engine, "p0", [5])
+    game._index.set_mortgaged(game._board, 5, True)
+
+    engine.declare_bankruptcy(ROOM, "p0")
+    assert [game._board.houses[position] for position in brown] == [0, 0]
+    assert (game.houses_remaining, game.hotels_remaining) == (32, 12)
+    assert not game._board.mortgaged[5]
+
+    # The next owner gets bare, unmortgaged squares
+    own(engine, "p1", brown + [5])
+    assert game._index.building_values.get("p1", 0) == 0
+    assert game._index.property_values["p1"] == sum(BOARD[position].price for position in brown + [5])
+    assert verify_replay(game)
+
+def test_bankruptcy_to_a_player_hands_over_the_buildings(engine, game):
+    brown = list(GROUP_MEMBERS[BOARD[1].owner_group])
+    own(engine, "p0", brown)
+    for position in brown:
+        engine.build_house(ROOM, "p0", position)
+    engine.handle_bankruptcy(game, game._index.player("p0"), game._index.player("p1"))
+    assert [game._board.houses[position] for position in brown] == [1, 1]
+    assert game.houses_remaining == 30
+    assert game._index.building_values["p1"] == 2 * BOARD[brown[0]].house_cost
+
+def test_third_double_jails_the_bot_without_moving(engine, game):
+    game._rng = random.Random(doubles_seed())
+    player = game._index.player("p0")
+    player.doubles_count = 2
+    play_turn(engine, ROOM, "p0")
+    assert player.in_jail and player.position == 10
+    assert game.players[game.current_player].id == "p1"
+
+def test_leaving_jail_uses_a_card_before_paying(engine, game):
+    player = game._index.player("p0")
+    with pytest.raises(ValueError, match="not in jail"):
+        engine.pay_jail_fine(ROOM, "p0")
+
+    engine.send_to_jail(ROOM, "p0")
+    player.get_out_of_jail_cards = 1
+    assert engine.pay_jail_fine(ROOM, "p0") == 0
+    assert not player.in_jail and player.get_out_of_jail_cards == 0
+
+    engine.send_to_jail(ROOM, "p0")
+    money = player.money
+    assert engine.pay_jail_fine(ROOM, "p0") == JAIL_FINE
+    assert player.money == money - JAIL_FINE and not player.in_jail
+
+def test_buy_decisions(engine, game):
+    view = BotView.of(game, "p0")
+    assert decide_buy(view, 39)
+    assert not decide_buy(view, 0)
+
+    # Never below the cash reserve
+    game._index.player("p0").money = BOARD[39].price + cash_reserve(view) - 1
+    assert not decide_buy(BotView.of(game, "p0"), 39)
+
+    # Near the reserve only squares that pay back or complete a group
+    game._index.player("p0").money = BOARD[1].price + cash_reserve(view) + 100
+    assert decide_buy(BotView.of(game, "p0"), 3)
+    assert not decide_buy(BotView.of(game, "p0"), 1)
+    own(engine, "p0", [3])
+    game._index.player("p0").money = BOARD[1].price + cash_reserve(view) + 100
+    assert decide_buy(BotView.of(game, "p0"), 1)
+
+def test_build_plan_follows_the_rules_and_keeps_a_reserve(engine, game):
+    orange = list(GROUP_MEMBERS[BOARD[16].owner_group])
+    own(engine, "p0", orange)
+    steps = plan_builds(BotView.of(game, "p0"))
+    assert steps and all(action == "house" for action, _ in steps[:len(orange)])
+    for action, position in steps:
+        (engine.build_hotel if action == "hotel" else engine.build_house)(ROOM, "p0", position)
+    houses = [game._board.houses[position] + 5 * game._board.hotel[position] for position in orange]
+    assert max(houses) - min(houses) <= 1
+    assert game._index.player("p0").money >= cash_reserve(BotView.of(game, "p0"))
+
+    game._index.player("p0").money = 100
+    assert plan_builds(BotView.of(game, "p0")) == []
+
+def test_jail_decision_depends_on_the_board(engine, game):
+    engine.send_to_jail(ROOM, "p0")
+    # An empty board makes extra rolls worth more than the fine
+    assert decide_jail(BotView.of(game, "p0"))
+
+    # Opponents' hotels everywhere make staying put the better choice
+    for position in (square.id for square in BOARD if square.house_cost):
+        game._index.set_owner(game._board, position, "p1")
+        game._index.set_buildings(game._board, position, 0, True)
+    assert not decide_jail(BotView.of(game, "p0"))
+
+def test_slow_decisions_fall_back_to_the_default():
+    pool = BotPool(workers=2, budget=0.05)
+
+    def slow(view):
+        time.sleep(0.3)
+        return True
+
+    before = decision_timeouts.get("test")
+    start = time.perf_counter()
+    assert asyncio.run(pool.decide("test", slow, None, default=False)) is False
+    assert time.perf_counter() - start < 0.25
+    assert decision_timeouts.get("test") == before + 1
+    assert asyncio.run(pool.decide("test", lambda view: view, 7)) == 7
+    pool.shutdown()
+
+def test_headless_bot_games_replay(engine):
+    players = [make_bot(seat, "") for seat in range(4)]
+    game = engine.create_game(ROOM, players, seed=3)
+    # Without trades monopolies are rare, so seat one up front
+    own(engine, players[0].id, GROUP_MEMBERS[BOARD[16].owner_group])
+    for _ in range(400):
+        play_turn(engine, ROOM, game.players[game.current_player].id)
+    assert sum(1 for event in game._commands.events if event.command.startswith("build")) > 0
+    assert verify_replay(game)
+
+def test_measure_turns():
+    report = measure_turns(200, players=3)
+    assert report["turns"] == 200 and report["turns_per_second"] > 0
+
+def test_bot_turn(recorder, engine):
+    """A whole bot turn: jail, roll, buy and build decisions, end of turn"""
+    game = engine.create_game("BENCH", [make_bot(seat, "") for seat in range(4)], seed=1)
+
+    def turn():
+        play_turn(engine, "BENCH", game.players[game.current_player].id)
+
+    # Past the opening, when most squares are owned and builds are considered
+    for _ in range(200):
+        turn()
+    recorder.check("bot_turn[4]", measure(turn))
@@ -0,0 +1,104 @@
+"""Compiled card effects, including the card fields the shipped decks do not use"""
+import random
+
+import pytest
+
+from card_effects import compile_card
+from game_engine import MonopolyGameEngine
+from models import Card, Player
+
+ROOM = "CARDS"
+
+@pytest.fixture
+def engine():
+    return MonopolyGameEngine(rng=random.Random(0))
+
+@pytest.fixture
+def game(engine):
+    players = [Player(id=f"p{seat}", name=f"Player {seat}", avatar="", color="", money=5000) for seat in range(3)]
+    return engine.create_game(ROOM, players, seed=1)
+
+def play(engine, game, player_id, **fields):
+    card = Card(id=99, title="Test", description="", **fields)
+    engine.execute_card_effect(game, player_id, card, compile_card(card))
+
+def money(game):
+    return {player.id: player.money for player in game.players}
+
+def test_collect_and_pay_from_all(engine, game):
+    play(engine, game, "p0", type="collect", amount=100, from_all=True)
+    assert money(game) == {"p0": 5200, "p1": 4900, "p2": 4900}
+    play(engine, game, "p0", type="pay", amount=300, from_all=True)
+    assert money(game) == {"p0": 4600, "p1": 5200, "p2": 5200}
+
+def test_paying_another_player_more_than_held_is_bankruptcy_to_them(engine, game):
+    engine.buy_property(ROOM, "p1", 1)
+    play(engine, game, "p1", type="pay", amount=5000, from_all=True)
+    assert [player.id for player in game.players] == ["p0", "p2"]
+    assert game._board.owners[1] == "p0"
+
+@pytest.mark.parametrize("card", [
+    {"type": "pay", "amount": 6000},
+    {"type": "repairs", "house": 2000, "hotel": 0},
+])
+def test_paying_the_bank_more_than_held_is_bankruptcy(engine, game, card):
+    for position in (1, 3):
+        engine.buy_property(ROOM, "p0", position)
+    engine.build_house(ROOM, "p0", 1)
+    engine.build_house(ROOM, "p0", 3)
+    play(engine, game, "p0", **card)
+
+    assert "p0" not in [player.id for player in game.players]
+    assert all(player.money >= 0 for player in game.players)
+    assert game._board.owners[1] is None and game._board.houses[1] == 0 and game.houses_remaining == 32
+
+def test_repairs_charge_per_house_and_hotel(engine, game):
+    game._index.player("p0").money = 30000
+    for position in (1, 3):
+        engine.buy_property(ROOM, "p0", position)
+    game._index.set_buildings(game._board, 1, 3)
+    game._index.set_buildings(game._board, 3, 0, True)
+    before = game._index.player("p0").money
+    play(engine, game, "p0", type="repairs", house=250, hotel=1000)
+    assert game._index.player("p0").money == before - 3 * 250 - 1000
+
+def test_move_to_nearest_target_pays_double_rent(engine, game):
+    engine.buy_property(ROOM, "p1", 15)
+    player = game._index.player("p0")
+    player.position = 7
+    play(engine, game, "p0", type="move", target="railroad", pay_double=True)
+    assert player.position == 15
+    assert money(game) == {"p0": 5000 - 500, "p1": 5000 - 2000 + 500, "p2": 5000}
+
+    # Past the last railroad the nearest one is round the board, collecting GO on the way
+    player.position = 36
+    play(engine, game, "p0", type="move", target="railroad", collect_go=True)
+    assert player.position == 5 and player.money == 4500 + 2000
+
+def test_move_by_spaces(engine, game):
+    player = game._index.player("p0")
+    player.position = 38
+    play(engine, game, "p0", type="move", spaces=3, collect_go=True)
+    assert (player.position, player.money) == (1, 7000)
+    play(engine, game, "p0", type="move", spaces=-3)
+    assert (player.position, player.money) == (38, 7000)
+
+def test_jail_cards(engine, game):
+    play(engine, game, "p0", type="jailFree")
+    play(engine, game, "p0", type="goToJail")
+    player = game._index.player("p0")
+    assert player.get_out_of_jail_cards == 1 and player.in_jail and player.position == 10
+
+def test_unknown_cards_are_refused():
+    with pytest.raises(ValueError, match="Unknown card type"):
+        compile_card({"id": 1, "title": "", "description": "", "type": "teleport"})
+    with pytest.raises(ValueError, match="no position, spaces or target"):
+        compile_card({"id": 1, "title": "", "description": "", "type": "move"})
+
+def test_draws_advance_the_deck_in_patches(engine, game):
+    engine.collect_patch(ROOM)
+    engine.draw_chance_card(ROOM, "p0")
+    engine.draw_community_chest_card(ROOM, "p1")
+    patch = engine.collect_patch(ROOM)
+    assert patch["fields"]["chance_index"] == game.chance_index == 1
+    assert patch["fields"]["community_chest_index"] == game.community_chest_index == 1
@@ -0,0 +1,110 @@
+"""Inbound dispatch: rate limits, schema checks, backlog bounds and coalescing"""
+import asyncio
+import time
+
+import pytest
+
+from dispatch import RATE_LIMITS, ConnectionLimits, Dispatcher, Inbox, RejectedMessage, TokenBucket
+from messages import BuyPropertyMessage, CreateRoomMessage
+
+async def noop(room_code: str, player_id: str, message: dict):
+    pass
+
+@pytest.fixture
+def dispatcher():
+    dispatcher = Dispatcher()
+    dispatcher.handles("create-room", CreateRoomMessage, bucket="lobby")(noop)
+    dispatcher.handles("buy-property", BuyPropertyMessage)(noop)
+    dispatcher.handles("sync-state", bucket="room", coalesce=True)(noop)
+    return dispatcher
+
+def test_a_burst_over_capacity_is_refused_until_tokens_refill():
+    bucket = TokenBucket(rate=2, burst=3)
+    now = bucket.updated
+    assert [bucket.take(now) for _ in range(4)] == [True, True, True, False]
+    assert not bucket.take(now + 0.25)
+    assert bucket.take(now + 0.5) and not bucket.take(now + 0.5)
+    # Idle time refills only up to the burst
+    assert [bucket.take(now + 100) for _ in range(4)] == [True, True, True, False]
+
+def test_every_message_also_draws_from_the_connection_bucket():
+    limits = ConnectionLimits(scale=1)
+    now = time.monotonic()
+    _, lobby_burst = RATE_LIMITS["lobby"]
+    assert all(limits.allow("lobby", now) for _ in range(int(lobby_burst)))
+    assert not limits.allow("lobby", now)
+    # Other buckets still have tokens until the shared connection bucket runs dry
+    assert limits.allow("game", now)
+    limits.buckets["connection"].tokens = 0
+    assert not limits.allow("game", now) and not limits.allow("chat", now)
+    assert limits.buckets["game"].tokens == RATE_LIMITS["game"][1] - 1
+    assert all(ConnectionLimits(scale=0).allow("lobby", now) for _ in range(1000))
+
+def test_rate_limited_messages_are_rejected(dispatcher):
+    limits = ConnectionLimits(scale=1)
+    _, burst = RATE_LIMITS["lobby"]
+    message = {"type": "create-room", "player_name": "Ann"}
+    for _ in range(int(burst)):
+        dispatcher.accept(message, limits)
+    with pytest.raises(RejectedMessage) as rejected:
+        dispatcher.accept(message, limits)
+    assert rejected.value.reason == "rate_limited"
+
+def test_invalid_and_unknown_payloads_are_rejected(dispatcher):
+    limits = ConnectionLimits(scale=0)
+    spec, payload = dispatcher.accept({"type": "buy-property", "property_id": 5, "roomCode": "X"}, limits)
+    assert spec.message_type == "buy-property" and payload == {"type": "buy-property", "property_id": 5}
+    assert dispatcher.accept({"type": "sync-state", "extra": 1}, limits)[1] == {"type": "sync-state"}
+
+    for message, reason, text in (
+        ({"type": "buy-property", "property_id": 40}, "invalid", "property_id"),
+        ({"type": "create-room", "player_name": ""}, "invalid", "player_name"),
+        ({"type": "nope"}, "unknown", "nope"),
+        (["not", "a", "dict"], "unknown", "None"),
+    ):
+        with pytest.raises(RejectedMessage, match=text) as rejected:
+            dispatcher.accept(message, limits)
+        assert rejected.value.reason == reason
+
+def test_invalid_payloads_come_back_to_the_socket_as_errors():
+    server = pytest.importorskip("server")
+    from fastapi.testclient import TestClient
+    with TestClient(server.app).websocket_connect("/ws/temp/temp-dispatch") as websocket:
+        websocket.send_json({"type": "create-room", "player_name": ""})
+        assert websocket.receive_json() == {
+            "type": "error", "message": "Invalid create-room: player_name: String should have at least 1 character"}
+        websocket.send_text("not json")
+        assert websocket.receive_json()["message"].startswith("Malformed frame")
+
+def test_the_inbox_coalesces_and_bounds_its_backlog(dispatcher):
+    limits = ConnectionLimits(scale=0)
+    sync, _ = dispatcher.accept({"type": "sync-state"}, limits)
+    buy, _ = dispatcher.accept({"type": "buy-property", "property_id": 1}, limits)
+
+    async def run():
+        handled = []
+        release = asyncio.Event()
+
+        async def handle(message):
+            await release.wait()
+            handled.append(message)
+
+        inbox = Inbox(handle, max_pending=3)
+        inbox.put(buy, {"n": 0})
+        await asyncio.sleep(0)
+        # The first message is running, so these queue behind it
+        inbox.put(sync, {"n": 1})
+        inbox.put(sync, {"n": 2})
+        inbox.put(buy, {"n": 3})
+        inbox.put(sync, {"n": 4})
+        with pytest.raises(RejectedMessage) as rejected:
+            inbox.put(buy, {"n": 5})
+        # A coalescing message only replaces the one right before it
+        inbox.put(sync, {"n": 6})
+        release.set()
+        await inbox.close()
+        return handled, rejected.value.reason
+
+    handled, reason = asyncio.run(run())
+    assert [message["n"] for message in handled] == [0, 2, 3, 6]
+    assert reason == "backlog"
@@ -0,0 +1,109 @@
+"""Copy-on-write forks: commands on a fork never reach the original game; fork benchmarks"""
+import random
+
+import pytest
+
+from bots import make_bot, play_turn
+from game_engine import MonopolyGameEngine
+from replay import verify_replay
+
+from .benchmarking import measure
+
+ROOM = "FORKS"
+
+@pytest.fixture
+def engine():
+    return MonopolyGameEngine(rng=random.Random(0))
+
+@pytest.fixture
+def game(engine):
+    game = engine.create_game(ROOM, [make_bot(seat, "") for seat in range(4)], seed=2)
+    for _ in range(120):
+        play_turn(engine, ROOM, game.players[game.current_player].id)
+    return game
+
+def state(game):
+    return game.dict(), game._rng.getstate(), len(game._commands), game._log.next_seq
+
+def test_fork_shares_what_commands_never_change(engine, game):
+    fork = engine.fork_game(ROOM, "FORK")
+    assert fork.room_code == "FORK" and engine.get_game(ROOM) is game
+    assert fork.chance_cards is game.chance_cards
+    assert fork._commands.players is game._commands.players
+    assert fork._commands.events == game._commands.events and fork._commands.events is not game._commands.events
+    assert all(mine is not theirs for mine, theirs in zip(fork.players, game.players))
+    assert fork._board.owners is not game._board.owners
+    assert fork.dict() == {**game.dict(), "room_code": "FORK"}
+
+def test_commands_on_a_fork_leave_the_game_alone(engine, game):
+    before = state(game)
+    fork = engine.fork_game(ROOM, "FORK")
+    for _ in range(60):
+        play_turn(engine, "FORK", fork.players[fork.current_player].id)
+    bankrupt = fork.players[0].id
+    owned = sorted(fork._index.owned_by(bankrupt))
+    engine.declare_bankruptcy("FORK", bankrupt)
+
+    assert state(game) == before
+    assert len(fork.players) == len(game.players) - 1
+    assert owned and all(fork._board.owners[position] is None for position in owned)
+    assert verify_replay(fork) and verify_replay(game)
+
+def test_fork_plays_out_like_the_game(engine, game):
+    """The fork starts from the game's RNG state, so the same commands give the same result"""
+    fork = engine.fork_game(ROOM, "FORK")
+    for _ in range(20):
+        play_turn(engine, ROOM, game.players[game.current_player].id)
+        play_turn(engine, "FORK", fork.players[fork.current_player].id)
+    assert fork.dict() == {**game.dict(), "room_code": "FORK"}
+
+def test_forks_follow_the_game_as_it_moves_on(engine, game):
+    first = game.fork()
+    play_turn(engine, ROOM, game.players[game.current_player].id)
+    second = game.fork()
+    assert first._rng.getstate() != second._rng.getstate() == game._rng.getstate()
+
+    # A fork of a fork is a fork of the same game
+    nested = second.fork("NESTED")
+    assert nested.dict() == {**game.dict(), "room_code": "NESTED"}
+
+def test_removing_a_fork_keeps_the_games_trades(engine, game):
+    sender, recipient = game.players[0].id, game.players[1].id
+    engine.propose_trade(ROOM, "live", sender, recipient, [], [], 1, 0)
+    fork = engine.fork_game(ROOM, "FORK")
+    engine.propose_trade("FORK", "tried", sender, recipient, [], [], 1, 0)
+
+    # The game's offers are out of the fork's reach
+    with pytest.raises(ValueError, match="Trade not found"):
+        engine.respond_trade("FORK", recipient, "live", True)
+    engine.declare_bankruptcy("FORK", sender)
+    assert "tried" not in engine.trades and "live" in engine.trades
+
+    engine.propose_trade(ROOM, "live2", sender, recipient, [], [], 1, 0)
+    fork = engine.fork_game(ROOM, "FORK2")
+    engine.propose_trade("FORK2", "tried2", sender, recipient, [], [], 1, 0)
+    assert engine.remove_game("FORK2") is fork
+    assert [trade.id for trade in engine.trades.for_player(sender)] == ["live", "live2"]
+
+def test_fork_codes_must_be_free(engine, game):
+    with pytest.raises(ValueError, match="already exists"):
+        engine.fork_game(ROOM, ROOM)
+    with pytest.raises(ValueError, match="Game not found"):
+        engine.fork_game("MISSING", "FORK")
+
+@pytest.mark.parametrize("action", ["discard", "turn"])
+def test_fork(recorder, engine, action):
+    """Fork a game mid-play, optionally play a turn on the fork, and drop it; forks per second is 1 / time"""
+    game = engine.create_game("BENCH", [make_bot(seat, "") for seat in range(4)], seed=1)
+    for _ in range(200):
+        play_turn(engine, "BENCH", game.players[game.current_player].id)
+    snapshot = game.dict()
+
+    def fork():
+        forked = engine.fork_game("BENCH", "FORK")
+        if action == "turn":
+            play_turn(engine, "FORK", forked.players[forked.current_player].id)
+        engine.remove_game("FORK")
+
+    recorder.check(f"fork[4,{action}]", measure(fork))
+    assert game.dict() == snapshot
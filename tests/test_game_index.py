@@ -0,0 +1,71 @@
+"""GameIndex kept up incrementally agrees with one rebuilt from the game"""
+import random
+
+import pytest
+
+from bots import make_bot, play_turn
+from board import BOARD
+from game_engine import MonopolyGameEngine
+from game_index import GameIndex
+
+ROOM = "INDEX"
+TABLES = ("owned", "group_counts", "property_values", "building_values", "monopolies")
+
+def tables(index: GameIndex) -> dict:
+    # Emptied entries may linger incrementally, so compare what is non-empty
+    tables = {name: {key: value for key, value in getattr(index, name).items() if value} for name in TABLES}
+    tables["players"] = {player_id: id(player) for player_id, player in index.players.items()}
+    return tables
+
+def assert_matches_rebuild(game):
+    assert tables(game._index) == tables(GameIndex(game))
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_index_matches_a_rebuild_through_a_game(seed):
+    engine = MonopolyGameEngine(rng=random.Random(seed))
+    game = engine.create_game(ROOM, [make_bot(seat, "") for seat in range(4)], seed=seed)
+    for turn in range(300):
+        play_turn(engine, ROOM, game.players[game.current_player].id)
+        assert_matches_rebuild(game)
+
+    # Mortgages, trades and a bankruptcy all move squares between owners
+    owner = next(player.id for player in game.players if game._index.owned_by(player.id))
+    position = next(position for position in sorted(game._index.owned_by(owner))
+                    if not game._board.houses[position] and not game._board.hotel[position])
+    engine.mortgage_property(ROOM, owner, position)
+    assert_matches_rebuild(game)
+    other = next(player.id for player in game.players if player.id != owner)
+    engine.propose_trade(ROOM, "swap", owner, other, [position], [], 0, 0)
+    engine.respond_trade(ROOM, other, "swap", True)
+    assert game._board.owners[position] == other
+    assert_matches_rebuild(game)
+    engine.declare_bankruptcy(ROOM, other)
+    assert_matches_rebuild(game)
+
+def test_net_worth_reads_the_aggregates():
+    engine = MonopolyGameEngine(rng=random.Random(0))
+    game = engine.create_game(ROOM, [make_bot(seat, "") for seat in range(2)], seed=1)
+    player = game.players[0]
+    for position in (1, 3):
+        engine.buy_property(ROOM, player.id, position)
+    engine.build_house(ROOM, player.id, 1)
+    assert game._index.monopolies_of(player.id) == ["brown"]
+    assert game._index.net_worth(player) == player.money + BOARD[1].price + BOARD[3].price + BOARD[1].house_cost
+
+def test_bankruptcy_to_a_player_moves_the_totals_whole():
+    engine = MonopolyGameEngine(rng=random.Random(0))
+    game = engine.create_game(ROOM, [make_bot(seat, "") for seat in range(3)], seed=1)
+    bankrupt, creditor = game.players[0], game.players[1]
+    for position in (1, 3, 5, 6, 8):
+        engine.buy_property(ROOM, bankrupt.id, position)
+    engine.buy_property(ROOM, creditor.id, 9)
+    engine.build_house(ROOM, bankrupt.id, 1)
+    engine.mortgage_property(ROOM, bankrupt.id, 5)
+    assets = game._index.asset_value(bankrupt.id) + game._index.asset_value(creditor.id)
+
+    engine.handle_bankruptcy(game, bankrupt, creditor)
+    assert sorted(creditor.properties) == [1, 3, 5, 6, 8, 9]
+    assert game._index.asset_value(creditor.id) == assets
+    assert sorted(game._index.monopolies_of(creditor.id)) == ["brown", "lightblue"]
+    assert game._board.houses[1] == 1 and game._board.mortgaged[5]
+    assert_matches_rebuild(game)
@@ -0,0 +1,80 @@
+"""Bounded game log: eviction, paging boundaries and the dict round trip"""
+import asyncio
+
+import pytest
+
+from bots import make_bot, play_turn
+from game_log import GameLog, LogEvent
+
+def filled(count: int, capacity: int = 10) -> GameLog:
+    log = GameLog(capacity)
+    for n in range(count):
+        log.add("collected", "p0", n, name="Ann")
+    return log
+
+def seqs(events):
+    return [event.seq for event in events]
+
+def test_oldest_events_drop_out_at_capacity():
+    log = filled(25)
+    assert (len(log), log.first_seq, log.next_seq) == (10, 15, 25)
+    assert seqs(log.since(0)) == list(range(15, 25))
+    assert seqs(log.since(20)) == list(range(20, 25))
+    assert log.since(25) == [] and seqs(log.recent(3)) == [22, 23, 24]
+
+@pytest.mark.parametrize("before, expected", [
+    (None, [21, 22, 23, 24]),
+    (25, [21, 22, 23, 24]),
+    (99, [21, 22, 23, 24]),
+    (20, [16, 17, 18, 19]),
+    (17, [15, 16]),
+    (15, []),
+    (3, []),
+])
+def test_page_boundaries(before, expected):
+    assert seqs(filled(25).page(before, 4)) == expected
+
+def test_pages_walk_back_over_every_retained_event_once():
+    log = filled(25)
+    seen, before = [], None
+    while True:
+        page = log.page(before, 3)
+        if not page:
+            break
+        seen = seqs(page) + seen
+        before = page[0].seq
+    assert seen == list(range(15, 25))
+
+def test_api_pages_stop_at_the_oldest_event():
+    server = pytest.importorskip("server")
+    engine = server.game_engine
+    game = engine.create_game("LOGPAGES", [make_bot(seat, "") for seat in range(2)], seed=1)
+    try:
+        for _ in range(30):
+            play_turn(engine, "LOGPAGES", game.players[game.current_player].id)
+        entries, before = [], None
+        while True:
+            page = asyncio.run(server.get_local_game_log({"room_code": "LOGPAGES", "before": before, "limit": 7}))
+            entries = page["entries"] + entries
+            before = page["next_before"]
+            if before is None:
+                break
+        assert [entry["seq"] for entry in entries] == list(range(game._log.first_seq, game._log.next_seq))
+    finally:
+        engine.remove_game("LOGPAGES")
+
+def test_events_round_trip_through_dicts_and_text():
+    log = filled(3)
+    restored = GameLog(10)
+    restored.load([event.to_dict() for event in log.since(0)] + ["Legacy line"])
+    assert restored.since(0)[:3] == log.since(0)
+    assert restored.since(0)[3].text == "Legacy line" and restored.next_seq == 4
+    assert LogEvent(0, "collected", "p0", 5, {"name": "Ann"}).text == "Ann collected ₹5"
+
+def test_forks_and_copies_keep_the_sequence():
+    log = filled(25, capacity=500)
+    fork, copy = log.fork(), log.copy()
+    log.add("message", message="only in the original")
+    assert fork.next_seq == copy.next_seq == 25
+    assert len(copy) == 25 and len(fork) < 25
+    assert fork.add("message", message="fork").seq == 25
@@ -0,0 +1,74 @@
+"""Landing chain: card redirects and a Monte Carlo check against the engine"""
+import random
+
+import numpy as np
+import pytest
+
+from board import BOARD, BOARD_SIZE
+from bots import make_bot
+from game_engine import MonopolyGameEngine
+from landing_analysis import GO_TO_JAIL_POSITION, landing_frequencies, redirect_matrices
+
+ROOM = "LANDINGS"
+
+def engine_landings(turns: int, seed: int = 0) -> np.ndarray:
+    """Landings per turn of two tokens played on the engine, leaving jail before every roll"""
+    engine = MonopolyGameEngine(rng=random.Random(seed))
+    game = engine.create_game(ROOM, [make_bot(seat, "") for seat in range(2)], seed=seed)
+    counts = np.zeros(BOARD_SIZE)
+    done = 0
+    while done < turns:
+        player = game.players[game.current_player]
+        if player.in_jail:
+            engine.pay_jail_fine(ROOM, player.id)
+        _, _, total = engine.roll_dice(ROOM, player.id)
+        position = engine.move_player(ROOM, player.id, total) if game.turn_phase == "move" else None
+        while position is not None:
+            square = BOARD[position]
+            if position == GO_TO_JAIL_POSITION:
+                engine.send_to_jail(ROOM, player.id)
+                break
+            if square.type not in ("chance", "community"):
+                counts[position] += 1
+                break
+            draw = engine.draw_chance_card if square.type == "chance" else engine.draw_community_chest_card
+            card = draw(ROOM, player.id)
+            if player.in_jail:
+                break
+            # Moves by position or spaces land on the new square; everything else ends here
+            if card.type == "move" and card.target is None and player.position != position:
+                position = player.position
+            else:
+                counts[player.position] += 1
+                break
+        engine.end_turn(ROOM, player.id)
+        if game.players[game.current_player] is not player:
+            done += 1
+    return counts / turns
+
+def test_stationary_landings_match_engine_play():
+    landings, _ = landing_frequencies()
+    played = engine_landings(25000)
+    assert np.abs(played - landings).max() < 0.005
+    # Card moves credit the squares they send the token to
+    assert landings[GO_TO_JAIL_POSITION] == 0 and landings[0] > 1.4 * landings[1]
+
+def test_every_kind_of_move_card_is_followed():
+    chance = [
+        {"type": "move", "spaces": -3},
+        {"type": "move", "target": "railroad"},
+        {"type": "move", "position": GO_TO_JAIL_POSITION},
+        {"type": "collect", "amount": 100},
+    ]
+    community = [{"type": "move", "position": 0}]
+    free, jail = redirect_matrices(chance, community)
+    assert free.sum(axis=1) + jail == pytest.approx(np.ones(BOARD_SIZE))
+    # Chance on 7: back three to the tax square, on to the railroad at 15, or stay
+    assert free[7, 4] == free[7, 15] == free[7, 7] == 0.25 and jail[7] == 0.25
+    # Chance on 36 goes back to community chest on 33, whose card moves on to GO
+    assert free[36, 0] == 0.25 and free[36, 33] == 0
+    assert free[2, 0] == 1.0 and jail[GO_TO_JAIL_POSITION] == 1.0
+
+def test_card_moves_that_loop_are_refused():
+    with pytest.raises(ValueError, match="loop"):
+        redirect_matrices([{"type": "move", "spaces": 0}], [{"type": "collect", "amount": 100}])
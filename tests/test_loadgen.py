@@ -0,0 +1,62 @@
+"""Load generator sessions against the app served in-process"""
+import asyncio
+import random
+import socket
+
+import pytest
+
+server = pytest.importorskip("server")
+uvicorn = pytest.importorskip("uvicorn")
+loadgen = pytest.importorskip("loadgen")
+
+class ScriptedDice(random.Random):
+    """Random whose first randint calls return scripted dice"""
+
+    def __init__(self, rolls):
+        super().__init__(0)
+        self.rolls = list(rolls)
+
+    def randint(self, a, b):
+        return self.rolls.pop(0) if self.rolls else super().randint(a, b)
+
+async def play_room(turns: int) -> loadgen.LoadStats:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    # Startup would restore from MongoDB; the handlers need none of it
+    app_server = uvicorn.Server(uvicorn.Config(server.app, host="127.0.0.1", port=port,
+                                               lifespan="off", log_level="warning"))
+    serving = asyncio.create_task(app_server.serve())
+    while not app_server.started:
+        await asyncio.sleep(0.01)
+    stats = loadgen.LoadStats()
+    session = loadgen.RoomSession(f"ws://127.0.0.1:{port}", stats, 2, turns, random.Random(0))
+    try:
+        await session.run()
+    finally:
+        app_server.should_exit = True
+        await serving
+        server.game_engine.remove_game(session.room_code)
+        server.rooms.pop(session.room_code, None)
+    return stats
+
+def test_a_third_double_ends_the_turn_without_a_move(monkeypatch):
+    monkeypatch.setattr(loadgen, "RESPONSE_TIMEOUT", 5.0)
+    monkeypatch.setattr(server.store, "mark_room", lambda *args: None)
+    jailed = []
+    create_game = server.game_engine.create_game
+
+    def scripted_game(*args, **kwargs):
+        game = create_game(*args, **kwargs)
+        object.__setattr__(game, "_rng", ScriptedDice([3, 3, 4, 4, 5, 5]))
+        jailed.append(game.players[game.current_player])
+        return game
+
+    monkeypatch.setattr(server.game_engine, "create_game", scripted_game)
+    stats = asyncio.run(play_room(turns=4))
+
+    assert stats.errors == {} and stats.rooms_completed == 1 and stats.turns == 4
+    assert jailed[0].in_jail
+    # Four rolls, and a move for every roll but the third
+    assert len(stats.latencies["roll-dice"]) == 4
+    assert len(stats.broadcast_lag["player-moved"]) == 3
@@ -0,0 +1,59 @@
+"""Lobby listing: joinable rooms, filters and page-cache invalidation"""
+import json
+
+from lobby import LobbyIndex
+from models import Player, Room
+
+def room(code: str, players: int = 1, max_players: int = 4) -> Room:
+    return Room(code=code, host_id="host", max_players=max_players,
+                players=[Player(name=f"P{n}", avatar="", color="") for n in range(players)])
+
+def listing(lobby: LobbyIndex, **filters) -> dict:
+    return json.loads(lobby.page(**filters))
+
+def test_only_joinable_rooms_are_listed_in_creation_order():
+    lobby = LobbyIndex()
+    started = room("STARTED")
+    started.game_started = True
+    for entry in (room("A"), room("FULL", players=4), started, room("B", players=2)):
+        lobby.update(entry)
+    page = listing(lobby)
+    assert [entry["code"] for entry in page["rooms"]] == ["A", "B"] and page["total"] == 2
+
+def test_filters_and_paging():
+    lobby = LobbyIndex()
+    for n in range(5):
+        lobby.update(room(f"R{n}", players=n % 3 + 1, max_players=6 if n == 4 else 4))
+    assert [entry["code"] for entry in listing(lobby, min_free_seats=3)["rooms"]] == ["R0", "R3", "R4"]
+    assert [entry["code"] for entry in listing(lobby, max_players=4)["rooms"]] == ["R0", "R1", "R2", "R3"]
+    page = listing(lobby, offset=3, limit=2)
+    assert [entry["code"] for entry in page["rooms"]] == ["R3", "R4"] and page["total"] == 5
+
+def test_pages_are_cached_until_a_room_changes():
+    lobby = LobbyIndex()
+    lobby.update(room("A"))
+    first = lobby.page()
+    assert lobby.page() is first and (lobby.hits, lobby.misses) == (1, 1)
+
+    # A change that leaves a room unlisted still drops the cached pages
+    full = room("A", players=4)
+    lobby.update(full)
+    assert listing(lobby)["rooms"] == [] and listing(lobby)["version"] == 2
+
+    # Updating a room that is not listed changes nothing
+    lobby.update(full)
+    lobby.remove("MISSING")
+    cached = lobby.page()
+    assert lobby.version == 2 and lobby.page() is cached
+
+    lobby.update(room("B"))
+    assert [entry["code"] for entry in listing(lobby)["rooms"]] == ["B"]
+    lobby.remove("B")
+    assert listing(lobby)["total"] == 0 and lobby.version == 4
+
+def test_the_cache_is_bounded():
+    lobby = LobbyIndex(cache_size=2)
+    lobby.update(room("A"))
+    for offset in range(5):
+        lobby.page(offset=offset)
+    assert lobby.stats()["cached_pages"] <= 2
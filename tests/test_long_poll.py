@@ -0,0 +1,39 @@
+"""ETags and the gzip body cache behind the game state endpoint"""
+import gzip
+import random
+
+from game_engine import MonopolyGameEngine
+from long_poll import GzipCache, etag_matches, gzip_etag, state_etag
+from models import Player
+
+ROOM = "POLL"
+
+def new_game():
+    engine = MonopolyGameEngine(rng=random.Random(0))
+    players = [Player(id=f"p{seat}", name=f"Player {seat}", avatar="", color="") for seat in range(2)]
+    return engine, engine.create_game(ROOM, players, seed=1)
+
+def test_encodings_get_their_own_strong_etags():
+    _, game = new_game()
+    etag = state_etag(game)
+    assert etag.startswith('"') and etag.endswith('"') and not etag.startswith("W/")
+    assert gzip_etag(etag) != etag and gzip_etag(etag).endswith('-gzip"')
+
+def test_if_none_match_accepts_either_encoding_of_the_current_state():
+    engine, game = new_game()
+    etag = state_etag(game)
+    for header in (etag, gzip_etag(etag), f"W/{gzip_etag(etag)}", f'"other", {etag}', "*"):
+        assert etag_matches(header, etag)
+    assert not etag_matches(None, etag)
+
+    engine.buy_property(ROOM, "p0", 1)
+    assert state_etag(game) != etag
+    assert not etag_matches(gzip_etag(etag), state_etag(game))
+
+def test_gzip_cache_reuses_the_body_until_the_etag_moves_on():
+    cache = GzipCache(size=1)
+    first = cache.compress(ROOM, '"a"', '{"n":1}')
+    assert cache.compress(ROOM, '"a"', "ignored") is first
+    assert gzip.decompress(cache.compress(ROOM, '"b"', '{"n":2}')) == b'{"n":2}'
+    cache.compress("OTHER", '"a"', "{}")
+    assert list(cache.bodies) == ["OTHER"]
@@ -0,0 +1,76 @@
+"""Bus delivery: channels are handled concurrently, each in publish order"""
+import asyncio
+
+import pytest
+
+from message_bus import LocalBus, UnixSocketBus, UnixSocketHub
+
+async def slow_room_does_not_block_others(bus, publisher):
+    release = asyncio.Event()
+    handled = []
+
+    async def slow(message):
+        await release.wait()
+        handled.append(("slow", message["n"]))
+
+    async def fast(message):
+        handled.append(("fast", message["n"]))
+
+    await bus.subscribe("room:SLOW", slow)
+    await bus.subscribe("room:FAST", fast)
+    await bus.start()
+    if publisher is not bus:
+        await publisher.start()
+    for n in range(2):
+        await publisher.publish("room:SLOW", {"n": n})
+    await publisher.publish("room:FAST", {"n": 0})
+    # The fast room is served while the slow handler is still waiting
+    for _ in range(100):
+        if handled:
+            break
+        await asyncio.sleep(0.01)
+    assert handled == [("fast", 0)]
+    release.set()
+    for _ in range(100):
+        if len(handled) == 3:
+            break
+        await asyncio.sleep(0.01)
+    assert handled == [("fast", 0), ("slow", 0), ("slow", 1)]
+    await bus.stop()
+    if publisher is not bus:
+        await publisher.stop()
+
+def test_a_slow_handler_does_not_block_other_channels_locally():
+    async def run():
+        bus = LocalBus()
+        await slow_room_does_not_block_others(bus, bus)
+    asyncio.run(run())
+
+def test_a_slow_handler_does_not_block_other_channels_over_the_socket(tmp_path):
+    path = str(tmp_path / "bus.sock")
+
+    async def run():
+        hub = UnixSocketHub(path)
+        await hub.start()
+        try:
+            await slow_room_does_not_block_others(UnixSocketBus(path), UnixSocketBus(path))
+        finally:
+            await hub.stop()
+    asyncio.run(asyncio.wait_for(run(), 10))
+
+def test_stopping_cancels_handlers_still_running():
+    async def run():
+        bus = LocalBus()
+        started = asyncio.Event()
+
+        async def hang(message):
+            started.set()
+            await asyncio.Event().wait()
+
+        await bus.subscribe("room:HANG", hang)
+        await bus.start()
+        await bus.publish("room:HANG", {})
+        await asyncio.wait_for(started.wait(), 1)
+        await bus.stop()
+        return bus._drains, bus._backlogs
+    assert asyncio.run(run()) == (set(), {})
@@ -0,0 +1,60 @@
+"""Prometheus text exposition of counters, gauges and histograms"""
+import pytest
+
+from metrics import MetricsRegistry
+
+def test_histogram_buckets_are_cumulative_with_inclusive_bounds():
+    registry = MetricsRegistry()
+    latency = registry.histogram("op_seconds", "Op time", ("op",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 1.0, 3.0):
+        latency.observe(value, "read")
+    # A value equal to a bound counts towards that bucket, as Prometheus le means
+    assert latency.samples() == [
+        'op_seconds_bucket{op="read",le="0.1"} 2',
+        'op_seconds_bucket{op="read",le="1.0"} 4',
+        'op_seconds_bucket{op="read",le="+Inf"} 5',
+        'op_seconds_sum{op="read"} 4.65',
+        'op_seconds_count{op="read"} 5',
+    ]
+
+def test_child_series_are_the_ones_observe_updates():
+    registry = MetricsRegistry()
+    latency = registry.histogram("op_seconds", "Op time", ("op",), buckets=(1,))
+    latency.child("write").observe(2)
+    latency.observe(0.5, "write")
+    assert latency.child("write").counts == [1, 1] and len(latency.series) == 1
+    assert 'op_seconds_bucket{op="write",le="1"} 1' in latency.samples()
+
+def test_render_writes_help_type_and_escaped_labels():
+    registry = MetricsRegistry()
+    errors = registry.counter("errors_total", "Errors seen", ("type",))
+    errors.inc('say "hi"\\now\n')
+    errors.inc("plain", amount=2)
+    registry.histogram("unlabelled_seconds", "No labels", buckets=(1.0,)).observe(0.5)
+    assert registry.render() == "\n".join([
+        "# HELP errors_total Errors seen",
+        "# TYPE errors_total counter",
+        'errors_total{type="plain"} 2',
+        'errors_total{type="say \\"hi\\"\\\\now\\n"} 1',
+        "# HELP unlabelled_seconds No labels",
+        "# TYPE unlabelled_seconds histogram",
+        'unlabelled_seconds_bucket{le="1.0"} 1',
+        'unlabelled_seconds_bucket{le="+Inf"} 1',
+        "unlabelled_seconds_sum 0.5",
+        "unlabelled_seconds_count 1",
+    ]) + "\n"
+
+def test_gauge_callbacks_are_read_at_scrape_time():
+    registry = MetricsRegistry()
+    readings = [3, 7]
+    registry.gauge("rooms", "Open rooms", callback=lambda: readings.pop(0))
+    assert registry.render().splitlines()[-1] == "rooms 3"
+    assert registry.render().splitlines()[-1] == "rooms 7"
+    # A failing callback keeps the last value instead of breaking the scrape
+    assert registry.render().splitlines()[-1] == "rooms 7"
+
+def test_names_register_once():
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests")
+    with pytest.raises(ValueError, match="already registered"):
+        registry.gauge("requests_total", "Requests again")
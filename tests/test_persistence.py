@@ -0,0 +1,129 @@
+"""Write-behind flushes to a mongomock database and rehydration from it"""
+import asyncio
+import random
+import threading
+
+import mongomock
+import pytest
+
+import persistence
+from bots import make_bot, play_turn
+from game_engine import MonopolyGameEngine
+from persistence import WriteBehindStore
+from models import Room
+
+ROOM = "STORED"
+
+@pytest.fixture
+def engine():
+    return MonopolyGameEngine(rng=random.Random(0))
+
+@pytest.fixture
+def game(engine):
+    game = engine.create_game(ROOM, [make_bot(seat, "") for seat in range(3)], seed=4)
+    for _ in range(40):
+        play_turn(engine, ROOM, game.players[game.current_player].id)
+    return game
+
+@pytest.fixture
+def store(engine):
+    return WriteBehindStore(mongomock.MongoClient().db, engine.trades)
+
+def flush(store):
+    return asyncio.run(store.flush())
+
+def test_flushed_games_rehydrate_with_their_open_trades(engine, game, store):
+    sender, recipient = game.players[0].id, game.players[1].id
+    engine.propose_trade(ROOM, "offer", sender, recipient, [], [], 1, 0)
+    store.mark_game(game)
+    store.mark_room(Room(code=ROOM, host_id=sender))
+    assert flush(store) == 2
+
+    [loaded] = asyncio.run(store.load_games())
+    assert loaded.dict() == game.dict() and loaded._rng.getstate() == game._rng.getstate()
+    # BSON dates keep milliseconds only
+    [trade] = asyncio.run(store.load_trades())
+    assert trade.dict(exclude={"created_at"}) == engine.trades.get("offer").dict(exclude={"created_at"})
+    assert [room.code for room in asyncio.run(store.load_rooms())] == [ROOM]
+
+def test_changes_from_any_path_are_written_once_marked(engine, game, store):
+    store.mark_game(game)
+    flush(store)
+    assert flush(store) == 0
+
+    # Bot turns and trade expiry never mark the game themselves
+    play_turn(engine, ROOM, game.players[game.current_player].id)
+    engine.propose_trade(ROOM, "offer", game.players[0].id, game.players[1].id, [], [], 1, 0)
+    assert store.pending == 1 and flush(store) == 1
+    engine.expire_trade(ROOM, "offer")
+    assert flush(store) == 1
+
+    [loaded] = asyncio.run(store.load_games())
+    assert loaded.dict() == game.dict()
+    assert asyncio.run(store.load_trades()) == []
+
+def test_loaded_games_are_only_written_after_they_change(engine, game, store):
+    store.mark_game(game)
+    flush(store)
+    [loaded] = asyncio.run(store.load_games())
+    store.track_game(loaded)
+    assert store.pending == 0
+    engine.games[ROOM] = loaded
+    play_turn(engine, ROOM, loaded.players[loaded.current_player].id)
+    assert flush(store) == 1
+
+def test_games_serialize_off_the_loop_from_a_copy(engine, game, store, monkeypatch):
+    threads = []
+    document = persistence.game_document
+
+    def recording_document(game, trades=()):
+        threads.append(threading.current_thread())
+        return document(game, trades)
+
+    monkeypatch.setattr(persistence, "game_document", recording_document)
+    store.mark_game(game)
+    flush(store)
+    assert threads and threading.main_thread() not in threads
+    stored = store.games.find_one({"_id": ROOM})
+    assert [entry["seq"] for entry in stored["game_log"]] == [event.seq for event in game._log.since(0)]
+
+def test_failed_flushes_are_retried_and_deletes_win(engine, game, store, monkeypatch):
+    store.mark_game(game)
+    writes = store.games.bulk_write
+
+    def failing(ops, ordered=True):
+        raise RuntimeError("database down")
+
+    monkeypatch.setattr(store.games, "bulk_write", failing)
+    assert flush(store) == 0 and store.stats.failures == 1 and store.pending == 1
+    monkeypatch.setattr(store.games, "bulk_write", writes)
+    assert flush(store) == 1 and store.games.count_documents({}) == 1
+
+    store.archive_game(game)
+    flush(store)
+    assert store.games.count_documents({}) == 0 and store.archived_games.count_documents({"_id": ROOM}) == 1
+    play_turn(engine, ROOM, game.players[game.current_player].id)
+    assert flush(store) == 0
+
+def test_flushes_only_look_at_games_touched_since_the_last_write(engine, game, store, monkeypatch):
+    idle = engine.create_game("IDLE", [make_bot(seat, "") for seat in range(2)], seed=1)
+    store.mark_game(game)
+    store.mark_game(idle)
+    assert flush(store) == 2
+    keyed = []
+    snapshot_key = type(game).snapshot_key
+
+    def recording_key(self):
+        keyed.append(self.room_code)
+        return snapshot_key(self)
+
+    monkeypatch.setattr(type(game), "snapshot_key", recording_key)
+    assert store.pending == 0 and flush(store) == 0 and keyed == []
+    play_turn(engine, ROOM, game.players[game.current_player].id)
+    assert store.pending == 1 and flush(store) == 1
+    assert set(keyed) == {ROOM}
+    # Copies and forks report nowhere, and deleted games stop reporting
+    game.fork().touch()
+    store.delete_game("IDLE")
+    idle.touch()
+    assert store._changed == set()
@@ -0,0 +1,57 @@
+"""Reaper: lazy expiry heap, kept objects and eviction errors"""
+import asyncio
+import time
+
+from reaper import ExpiryTracker, Reaper
+
+def test_touching_later_leaves_one_live_heap_entry():
+    tracker = ExpiryTracker()
+    tracker.touch("a", 10)
+    for deadline in (20, 30, 40):
+        tracker.touch("a", deadline)
+    # Later deadlines are not pushed; the early entry is rescheduled when it comes due
+    assert len(tracker._heap) == 1
+    assert tracker.expired(15) == [] and tracker._heap == [(40, "a")]
+    assert tracker.expired(40) == ["a"] and "a" not in tracker and tracker._heap == []
+
+def test_touching_earlier_leaves_stale_entries_that_are_skipped():
+    tracker = ExpiryTracker()
+    tracker.touch("a", 50)
+    tracker.touch("a", 10)
+    assert len(tracker._heap) == 2
+    assert tracker.expired(10) == ["a"]
+    # The stale entry goes when it surfaces, without expiring the key again
+    tracker.touch("a", 100)
+    assert tracker.expired(60) == [] and tracker._heap == [(100, "a")]
+
+def test_discarded_keys_never_expire():
+    tracker = ExpiryTracker()
+    for n, key in enumerate("abc"):
+        tracker.touch(key, n)
+    tracker.discard("b")
+    assert tracker.expired(10) == ["a", "c"] and len(tracker) == 0 and tracker._heap == []
+
+def test_reap_evicts_keeps_and_survives_errors():
+    evicted = []
+
+    async def evict(key: str) -> bool:
+        if key == "broken":
+            raise RuntimeError("boom")
+        if key == "busy":
+            return False
+        evicted.append(key)
+        return True
+
+    reaper = Reaper()
+    reaper.register("room", 60, evict)
+    for key in ("idle", "busy", "broken", "fresh"):
+        reaper.touch("room", key)
+    reaper.touch("room", "fresh", 600)
+
+    count = asyncio.run(reaper.reap(time.monotonic() + 120))
+    kind = reaper.kinds["room"]
+    assert count == 1 and evicted == ["idle"]
+    assert (kind.evicted, kind.kept, kind.errors) == (1, 1, 1)
+    # Kept objects and failed evictions are tried again after another TTL
+    assert all(reaper.is_tracked("room", key) for key in ("busy", "broken", "fresh"))
+    assert not reaper.is_tracked("room", "idle")
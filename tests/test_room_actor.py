@@ -0,0 +1,95 @@
+"""Room actors: commands of a room run one at a time in arrival order"""
+import asyncio
+
+import pytest
+
+from room_actor import RoomActorRegistry, RoomBusyError
+
+def test_commands_of_a_room_run_in_order_without_interleaving():
+    registry = RoomActorRegistry()
+    events = []
+
+    def command(n: int):
+        async def run():
+            events.append(("start", n))
+            await asyncio.sleep(0.001 * (5 - n % 5))
+            events.append(("end", n))
+            return n
+        return run
+
+    async def run():
+        results = await asyncio.gather(*(registry.submit("ROOM", command(n)) for n in range(20)))
+        await registry.shutdown()
+        return results
+
+    assert asyncio.run(run()) == list(range(20))
+    assert events == [(step, n) for n in range(20) for step in ("start", "end")]
+
+def test_rooms_do_not_wait_for_each_other():
+    registry = RoomActorRegistry()
+    finished = []
+
+    async def slow():
+        await asyncio.sleep(0.2)
+        finished.append("slow")
+
+    async def fast():
+        finished.append("fast")
+
+    async def run():
+        await asyncio.gather(registry.submit("SLOW", slow), registry.submit("FAST", fast))
+        await registry.shutdown()
+
+    asyncio.run(run())
+    assert finished == ["fast", "slow"]
+
+def test_failures_reach_their_caller_and_the_queue_goes_on():
+    registry = RoomActorRegistry()
+
+    async def fail():
+        raise ValueError("bad move")
+
+    async def ok():
+        return "ok"
+
+    async def run():
+        failed = registry.submit("ROOM", fail)
+        with pytest.raises(ValueError, match="bad move"):
+            await failed
+        result = await registry.submit("ROOM", ok)
+        stats = registry.stats("ROOM")
+        await registry.shutdown()
+        return result, stats
+
+    result, stats = asyncio.run(run())
+    assert result == "ok" and stats["processed"] == 2 and stats["failed"] == 1
+
+def test_full_queues_refuse_and_idle_actors_stop():
+    registry = RoomActorRegistry(max_depth=2, idle_timeout=0.05)
+
+    async def run():
+        release = asyncio.Event()
+
+        async def blocked():
+            await release.wait()
+
+        async def ok():
+            return "ok"
+
+        # The first command runs, so two more fit in the queue
+        futures = [registry.actor("ROOM").submit(blocked)]
+        await asyncio.sleep(0.01)
+        futures += [registry.actor("ROOM").submit(blocked) for _ in range(2)]
+        with pytest.raises(RoomBusyError):
+            registry.actor("ROOM").submit(blocked)
+        release.set()
+        await asyncio.gather(*futures)
+
+        actor = registry.actor("ROOM")
+        await asyncio.sleep(0.2)
+        assert actor.closed and "ROOM" not in registry.actors
+        # The next command starts a new actor
+        assert await registry.submit("ROOM", ok) == "ok" and registry.actor("ROOM") is not actor
+        await registry.shutdown()
+
+    asyncio.run(run())
@@ -0,0 +1,84 @@
+"""Room ownership on the hash ring and requests between workers over the bus"""
+import asyncio
+
+import pytest
+
+from message_bus import LocalBus, LocalHub
+from sharding import HashRing, RemoteError, ShardRouter
+
+WORKERS = ["w0", "w1", "w2"]
+CODES = [f"ROOM{n:04d}" for n in range(600)]
+
+def test_ring_spreads_rooms_and_removal_only_moves_the_removed_workers():
+    ring = HashRing(WORKERS)
+    owners = {code: ring.owner(code) for code in CODES}
+    assert all(list(owners.values()).count(worker) > len(CODES) / 6 for worker in WORKERS)
+    assert HashRing(list(reversed(WORKERS))).owner(CODES[0]) == owners[CODES[0]]
+
+    ring.remove("w1")
+    moved = [code for code in CODES if ring.owner(code) != owners[code]]
+    assert moved and all(owners[code] == "w1" for code in moved)
+    ring.add("w1")
+    assert {code: ring.owner(code) for code in CODES} == owners
+
+    with pytest.raises(ValueError, match="no workers"):
+        HashRing([]).owner("ROOM")
+
+def test_requests_round_trip_to_the_owner():
+    async def run():
+        hub = LocalHub()
+        routers = {worker: ShardRouter(LocalBus(hub), worker, WORKERS, request_timeout=1) for worker in WORKERS}
+        for worker, router in routers.items():
+            async def echo(payload, worker=worker):
+                if payload.get("fail"):
+                    raise ValueError("refused")
+                return {"worker": worker, **payload}
+            router.register("echo", echo)
+            await router.start()
+
+        caller = routers["w0"]
+        remote = next(code for code in CODES if caller.owner(code) != "w0")
+        local = next(code for code in CODES if caller.owns(code))
+        assert await caller.call(remote, "echo", {"n": 1}) == {"worker": caller.owner(remote), "n": 1}
+        assert await caller.call(local, "echo", {"n": 2}) == {"worker": "w0", "n": 2}
+        assert await caller.call_all("echo", {}) == [{"worker": worker} for worker in WORKERS]
+        with pytest.raises(RemoteError, match="refused"):
+            await caller.call(remote, "echo", {"fail": True})
+
+        stats = caller.stats()
+        for router in routers.values():
+            await router.stop()
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats["forwarded"] == 4 and stats["pending"] == 0
+
+def test_lobby_rooms_are_created_on_the_worker_holding_the_socket(monkeypatch):
+    server = pytest.importorskip("server")
+    monkeypatch.setattr(server, "rooms", {})
+    monkeypatch.setattr(server, "players_data", {})
+    monkeypatch.setattr(server.store, "mark_room", lambda room: None)
+    hub = LocalHub()
+
+    async def create_rooms(worker: str):
+        router = ShardRouter(LocalBus(hub), worker, WORKERS, request_timeout=0.2)
+        router.handlers = server.shards.handlers
+        monkeypatch.setattr(server, "shards", router)
+        for n in range(3):
+            await server.submit_room_request(server.LOBBY_ROOM_CODE, f"{worker}-{n}", "command", {
+                "room_code": server.LOBBY_ROOM_CODE,
+                "player_id": f"{worker}-{n}",
+                "message": {"type": "create-room", "player_name": "Host"}
+            })
+        return router.forwarded
+
+    try:
+        forwarded = [asyncio.run(create_rooms(worker)) for worker in WORKERS]
+        ring = HashRing(WORKERS)
+        owners = [ring.owner(code) for code in server.rooms]
+        assert forwarded == [0, 0, 0]
+        assert sorted(owners) == sorted(WORKERS * 3)
+    finally:
+        for code in list(server.rooms):
+            server.lobby.remove(code)
+            server.reaper.forget("room", code)
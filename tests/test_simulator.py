@@ -0,0 +1,38 @@
+"""Self-play simulator: games run to a winner and statistics merge across workers"""
+import random
+
+from board import BOARD
+from bots import make_bot
+from game_engine import MonopolyGameEngine
+from simulator import AlwaysBuyPolicy, SimulationConfig, Simulator, run_simulation
+
+def test_games_end_in_bankruptcies_and_a_winner():
+    config = SimulationConfig(players=4, max_turns=1000)
+    stats = Simulator(config).run(range(8))
+    finished = stats.games - stats.timeouts
+    assert stats.games == 8 and finished >= 2
+    assert sum(stats.winners.values()) == finished
+    # Every finished game knocked out all but one player
+    assert sum(stats.bankruptcies.values()) >= finished * (config.players - 1)
+    assert min(stats.lengths) < config.max_turns
+
+def test_statistics_are_the_same_with_any_number_of_workers():
+    config = SimulationConfig(players=3, policies=("always", "reserve:3000"), max_turns=300)
+    single = run_simulation(config, games=8, seed=5, workers=1, batch_size=3)
+    pooled = run_simulation(config, games=8, seed=5, workers=2, batch_size=3)
+    for key in ("games", "timeouts", "winners", "game_length", "bankruptcy_causes"):
+        assert pooled[key] == single[key]
+    assert pooled["games"] == 8 and pooled["workers"] == 2
+
+def test_mortgages_are_planned_only_when_they_cover_the_payment():
+    engine = MonopolyGameEngine(rng=random.Random(0))
+    game = engine.create_game("SIM", [make_bot(seat, "") for seat in range(2)], seed=1)
+    player = game.players[0]
+    for position in (1, 5, 6):
+        engine.buy_property("SIM", player.id, position)
+    player.money = 0
+    policy = AlwaysBuyPolicy()
+    half = {position: BOARD[position].price // 2 for position in (1, 5, 6)}
+    assert policy.plan_mortgages(game, player, half[1], engine.rng) == [1]
+    assert policy.plan_mortgages(game, player, half[1] + half[6], engine.rng) == [1, 6]
+    assert policy.plan_mortgages(game, player, sum(half.values()) + 1, engine.rng) == []
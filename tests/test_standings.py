@@ -0,0 +1,146 @@
+"""Net worth, monopolies and standings kept by the engine agree with a full recomputation, and their benchmark"""
+import random
+
+import pytest
+
+from board import BOARD, GROUP_MEMBERS
+from game_engine import MonopolyGameEngine
+from game_index import GameIndex
+from models import GameState, Player
+from simulator import SimulationConfig, Simulator
+
+from .benchmarking import give, make_game, measure
+
+def recompute(game: GameState) -> dict:
+    """Standings derived from scratch from the property views and player lists"""
+    properties = {prop.id: prop for prop in game.properties}
+    result = {}
+    for player in game.players:
+        owned = [properties[position] for position in player.properties]
+        property_value = sum(prop.price // 2 if prop.mortgaged else prop.price for prop in owned)
+        building_value = sum((BOARD[prop.id].house_cost or 0) * (5 if prop.hotel else prop.houses) for prop in owned)
+        monopolies = sorted(
+            group for group, members in GROUP_MEMBERS.items()
+            if BOARD[members[0]].type == "property" and all(properties[m].owner == player.id for m in members)
+        )
+        result[player.id] = {
+            "money": player.money,
+            "property_value": property_value,
+            "building_value": building_value,
+            "net_worth": player.money + property_value + building_value,
+            "monopolies": monopolies,
+        }
+    return result
+
+def assert_consistent(game: GameState):
+    expected = recompute(game)
+    standings = game.standings
+    assert {entry["player_id"]: {key: entry[key] for key in expected[entry["player_id"]]}
+            for entry in standings} == expected
+    assert [entry["rank"] for entry in standings] == list(range(1, len(standings) + 1))
+    assert [entry["net_worth"] for entry in standings] == sorted((entry["net_worth"] for entry in standings),
+                                                                  reverse=True)
+
+    # The index matches one rebuilt from the board
+    index = game._index
+    rebuilt = GameIndex(game)
+    assert rebuilt.property_values == index.property_values
+    assert rebuilt.building_values == index.building_values
+    assert rebuilt.monopolies == index.monopolies
+
+def mutate_assets(engine: MonopolyGameEngine, game: GameState, rng: random.Random):
+    """Random mortgages, buildings and trades on top of normal play"""
+    board, index = game._board, game._index
+    owned = [position for position, owner in enumerate(board.owners) if owner]
+    if not owned:
+        return
+    position = rng.choice(owned)
+    action = rng.randrange(3)
+    if action == 0:
+        index.set_mortgaged(board, position, not board.mortgaged[position])
+    elif action == 1 and BOARD[position].house_cost:
+        if rng.random() < 0.2:
+            index.set_buildings(board, position, 0, True)
+        else:
+            index.set_buildings(board, position, rng.randint(0, 4))
+    elif len(game.players) > 1:
+        owner_id = board.owners[position]
+        partner = rng.choice([player for player in game.players if player.id != owner_id])
+        try:
+            trade = engine.propose_trade(game.room_code, f"t{rng.random()}", owner_id, partner.id,
+                                         [position], [], 0, rng.randint(0, 50))
+            engine.respond_trade(game.room_code, partner.id, trade.id, True)
+        except ValueError:
+            pass
+
+@pytest.mark.parametrize("seed", range(8))
+def test_standings_match_recomputation_through_play(seed):
+    simulator = Simulator(SimulationConfig(players=4, starting_money=8000))
+    engine = simulator.engine
+    rng = random.Random(seed)
+    players = [Player(id=f"seat{seat}", name=f"Seat {seat}", avatar="", color="", money=8000) for seat in range(4)]
+    game = engine.create_game(f"STAND{seed}", players, seed=seed)
+
+    for _ in range(400):
+        if game.game_ended:
+            break
+        seat = int(game.players[game.current_player].id[4:])
+        simulator._take_turn(game, seat)
+        if not game.game_ended:
+            mutate_assets(engine, game, rng)
+        assert_consistent(game)
+
+def test_patches_carry_standings():
+    engine = MonopolyGameEngine(rng=random.Random(0))
+    players = [Player(id=f"p{seat}", name=f"Player {seat}", avatar="", color="") for seat in range(2)]
+    game = engine.create_game("PATCH", players, seed=1)
+
+    engine.buy_property("PATCH", "p1", 1)
+    engine.buy_property("PATCH", "p1", 3)
+    patch = engine.collect_patch("PATCH")
+    assert patch["standings"] == game.standings
+    assert patch["standings"][0]["player_id"] == "p0"
+    assert patch["standings"][1]["monopolies"] == [BOARD[1].group]
+
+    # Mortgaging and building reach the state and the restored copy agrees
+    game._index.set_buildings(game._board, 1, 2)
+    game._index.set_mortgaged(game._board, 3, True)
+    restored = GameState(**game.dict())
+    assert restored.standings == game.standings
+    assert_consistent(restored)
+
+def test_mortgages_go_through_commands_and_standings():
+    engine = MonopolyGameEngine(rng=random.Random(0))
+    players = [Player(id=f"p{seat}", name=f"Player {seat}", avatar="", color="") for seat in range(2)]
+    game = engine.create_game("MORTGAGE", players, seed=1)
+    for position in (1, 3):
+        engine.buy_property("MORTGAGE", "p0", position)
+    engine.build_house("MORTGAGE", "p0", 1)
+    with pytest.raises(ValueError, match="buildings"):
+        engine.mortgage_property("MORTGAGE", "p0", 3)
+    with pytest.raises(ValueError, match="don't own"):
+        engine.mortgage_property("MORTGAGE", "p1", 1)
+
+    game._index.set_buildings(game._board, 1, 0)
+    money = game._index.player("p0").money
+    assert engine.mortgage_property("MORTGAGE", "p0", 3) == BOARD[3].price // 2
+    assert game._index.player("p0").money == money + BOARD[3].price // 2
+    assert engine.square_rent(game, 3) == 0
+    with pytest.raises(ValueError, match="Lift the mortgages"):
+        engine.build_house("MORTGAGE", "p0", 1)
+    assert_consistent(game)
+
+    assert engine.unmortgage_property("MORTGAGE", "p0", 3) == BOARD[3].price // 2 * 110 // 100
+    with pytest.raises(ValueError, match="not mortgaged"):
+        engine.unmortgage_property("MORTGAGE", "p0", 3)
+    assert not game._board.mortgaged[3]
+    assert_consistent(game)
+
+@pytest.mark.parametrize("players", [2, 6])
+def test_standings(recorder, players):
+    game = make_game(MonopolyGameEngine(rng=random.Random(0)), players)
+    purchasable = [square.id for square in BOARD if square.price]
+    for seat in range(players):
+        give(game, f"p{seat}", purchasable[seat::players])
+    assert len(game.standings) == players
+    recorder.check(f"standings[{players}]", measure(lambda: game.standings))
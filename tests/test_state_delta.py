@@ -0,0 +1,78 @@
+"""Versioned game patches: applied in order they rebuild the snapshot"""
+import copy
+import random
+
+import pytest
+
+from bots import make_bot, play_turn
+from game_engine import MonopolyGameEngine
+from game_log import LIVE_LOG_SIZE
+
+ROOM = "PATCHES"
+
+@pytest.fixture
+def engine():
+    return MonopolyGameEngine(rng=random.Random(0))
+
+@pytest.fixture
+def game(engine):
+    game = engine.create_game(ROOM, [make_bot(seat, "") for seat in range(4)], seed=3)
+    engine.collect_patch(ROOM)
+    return game
+
+def apply_patch(state: dict, patch: dict) -> dict:
+    """Apply a patch the way the client does; refuses patches out of order"""
+    if patch["base_version"] != state["version"]:
+        raise ValueError("Out of order; resync")
+    removed = set(patch.get("removed_players", ()))
+    players = {player["id"]: player for player in patch.get("players", ())}
+    state["players"] = [players.get(player["id"], player) for player in state["players"]
+                        if player["id"] not in removed]
+    properties = {square["id"]: square for square in patch.get("properties", ())}
+    state["properties"] = [properties.get(square["id"], square) for square in state["properties"]]
+    state.update(patch.get("fields", {}))
+    if "standings" in patch:
+        state["standings"] = patch["standings"]
+    state["game_log"] = (state["game_log"] + patch.get("log", []))[-LIVE_LOG_SIZE:]
+    state["version"] = patch["version"]
+    return state
+
+def play(engine, game, turns: int):
+    patches = []
+    for _ in range(turns):
+        if game.game_ended:
+            break
+        play_turn(engine, ROOM, game.players[game.current_player].id)
+        patch = engine.collect_patch(ROOM)
+        if patch:
+            patches.append(patch)
+    return patches
+
+def test_patches_in_order_rebuild_the_snapshot(engine, game):
+    state = copy.deepcopy(game.snapshot())
+    patches = play(engine, game, 400)
+    engine.declare_bankruptcy(ROOM, game.players[1].id)
+    patches.append(engine.collect_patch(ROOM))
+    assert patches[-1]["removed_players"] and patches[-1]["properties"]
+    assert [patch["base_version"] for patch in patches] == [patch["version"] - 1 for patch in patches]
+    assert [patch["version"] for patch in patches] == list(range(state["version"] + 1, game.version + 1))
+    for patch in patches:
+        apply_patch(state, patch)
+    assert state == game.snapshot()
+
+def test_nothing_changed_means_no_patch_and_no_version(engine, game):
+    version = game.version
+    assert engine.collect_patch(ROOM) is None and game.version == version
+
+def test_a_missed_patch_forces_a_resync_from_the_snapshot(engine, game):
+    state = copy.deepcopy(game.snapshot())
+    first, missed, *rest = play(engine, game, 30)
+    apply_patch(state, first)
+    with pytest.raises(ValueError, match="resync"):
+        apply_patch(state, rest[0])
+
+    # The snapshot carries the version, so the patches after it apply on top
+    state = copy.deepcopy(game.snapshot())
+    for patch in play(engine, game, 30):
+        apply_patch(state, patch)
+    assert state == game.snapshot()
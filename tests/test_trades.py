@@ -0,0 +1,212 @@
+"""Trade offers: validation, atomic settlement, indexes, replay and their benchmarks"""
+import asyncio
+import random
+import time
+
+import pytest
+
+from board import BOARD
+from game_engine import MonopolyGameEngine
+from models import Player
+from reaper import Reaper
+from replay import verify_replay
+
+from .benchmarking import give, measure
+
+ROOM = "TRADES"
+
+@pytest.fixture
+def engine():
+    return MonopolyGameEngine(rng=random.Random(0))
+
+@pytest.fixture
+def game(engine):
+    players = [Player(id=f"p{seat}", name=f"Player {seat}", avatar="", color="") for seat in range(3)]
+    game = engine.create_game(ROOM, players, seed=1)
+    # Owned through buy_property so the ownership is in the command log too
+    for player_id, position in (("p0", 1), ("p0", 3), ("p1", 6), ("p1", 8), ("p2", 11)):
+        engine.buy_property(ROOM, player_id, position)
+    return game
+
+def money(game):
+    return {player.id: player.money for player in game.players}
+
+def test_accept_swaps_properties_and_money(engine, game):
+    before = money(game)
+    engine.propose_trade(ROOM, "t1", "p0", "p1", [1, 3], [6], 200, 50)
+    trade = engine.respond_trade(ROOM, "p1", "t1", True)
+
+    assert trade.status == "accepted"
+    assert [game._board.owners[position] for position in (1, 3, 6)] == ["p1", "p1", "p0"]
+    assert sorted(game._index.player("p0").properties) == [6]
+    assert sorted(game._index.player("p1").properties) == [1, 3, 8]
+    assert game._index.owns_group("p1", BOARD[1].owner_group)
+    after = money(game)
+    assert after["p0"] == before["p0"] - 150 and after["p1"] == before["p1"] + 150
+    assert "t1" not in engine.trades
+    assert verify_replay(game)
+
+def test_reject_and_cancel_change_nothing(engine, game):
+    before = (money(game), list(game._board.owners))
+    engine.propose_trade(ROOM, "t1", "p0", "p1", [1], [], 0, 0)
+    engine.propose_trade(ROOM, "t2", "p0", "p2", [], [11], 100, 0)
+
+    with pytest.raises(ValueError):
+        engine.respond_trade(ROOM, "p0", "t1", False)
+    with pytest.raises(ValueError):
+        engine.cancel_trade(ROOM, "p1", "t1")
+
+    assert engine.respond_trade(ROOM, "p1", "t1", False).status == "rejected"
+    assert engine.cancel_trade(ROOM, "p0", "t2").status == "cancelled"
+    assert (money(game), list(game._board.owners)) == before
+    assert len(engine.trades) == 0
+
+@pytest.mark.parametrize("args, error", [
+    (("p0", "p0", [1], [], 0, 0), "yourself"),
+    (("p0", "p1", [], [], 0, 0), "nothing"),
+    (("p0", "p1", [6], [], 0, 0), "does not own"),
+    (("p0", "p1", [1, 1], [], 0, 0), "twice"),
+    (("p0", "p1", [40], [], 0, 0), "not found"),
+    (("p0", "p1", [], [], -5, 0), "amount"),
+    (("p0", "p1", [], [], 10 ** 9, 0), "funds"),
+    (("p0", "p9", [1], [], 0, 0), "Player not found"),
+])
+def test_invalid_offers_are_refused(engine, game, args, error):
+    with pytest.raises(ValueError, match=error):
+        engine.propose_trade(ROOM, "t1", *args)
+    assert len(engine.trades) == 0
+
+def test_acceptance_rechecks_and_is_all_or_nothing(engine, game):
+    engine.propose_trade(ROOM, "t1", "p0", "p1", [1], [6], 0, 0)
+    engine.propose_trade(ROOM, "t2", "p0", "p2", [1], [], 0, 0)
+    engine.respond_trade(ROOM, "p1", "t1", True)
+    state = (money(game), list(game._board.owners))
+
+    # p0 no longer owns square 1, so t2 fails without moving anything
+    with pytest.raises(ValueError, match="does not own"):
+        engine.respond_trade(ROOM, "p2", "t2", True)
+    assert (money(game), list(game._board.owners)) == state
+    assert "t2" in engine.trades
+
+    # Buildings anywhere in a square's group block trading it
+    engine.propose_trade(ROOM, "t3", "p1", "p2", [1], [], 0, 0)
+    game._index.set_buildings(game._board, 3, 1)
+    with pytest.raises(ValueError, match="buildings"):
+        engine.respond_trade(ROOM, "p2", "t3", True)
+
+def test_indexes_follow_offers(engine, game):
+    engine.propose_trade(ROOM, "t1", "p0", "p1", [1], [], 0, 0)
+    engine.propose_trade(ROOM, "t2", "p0", "p2", [3], [], 0, 0)
+    engine.propose_trade(ROOM, "t3", "p2", "p0", [], [], 10, 0)
+
+    assert engine.trades.sent_by("p0") == {"t1", "t2"}
+    assert engine.trades.received_by("p0") == {"t3"}
+    assert [trade.id for trade in engine.trades.for_player("p2")] == ["t2", "t3"]
+
+    assert engine.expire_trade(ROOM, "t2").status == "expired"
+    assert engine.expire_trade(ROOM, "t2") is None
+    assert engine.trades.sent_by("p0") == {"t1"}
+
+    # Bankruptcy drops every offer the player sent or received
+    engine.declare_bankruptcy(ROOM, "p0")
+    assert len(engine.trades) == 0
+    assert not engine.trades.by_sender and not engine.trades.by_recipient
+
+def test_pending_offers_are_capped_per_sender(engine, game, monkeypatch):
+    monkeypatch.setattr("game_engine.MAX_PENDING_PER_PLAYER", 2)
+    engine.propose_trade(ROOM, "t1", "p0", "p1", [], [], 1, 0)
+    engine.propose_trade(ROOM, "t2", "p0", "p2", [], [], 1, 0)
+    with pytest.raises(ValueError, match="Too many"):
+        engine.propose_trade(ROOM, "t3", "p0", "p1", [], [], 1, 0)
+    engine.respond_trade(ROOM, "p1", "t1", False)
+    engine.propose_trade(ROOM, "t3", "p0", "p1", [], [], 1, 0)
+
+def test_remove_game_drops_its_offers(engine, game):
+    other = engine.create_game("OTHER", [Player(id=f"q{seat}", name="Q", avatar="", color="") for seat in range(2)])
+    engine.propose_trade(ROOM, "t1", "p0", "p1", [1], [], 0, 0)
+    engine.propose_trade(other.room_code, "u1", "q0", "q1", [], [], 5, 0)
+
+    engine.remove_game(ROOM)
+    assert [trade.id for trade in engine.trades] == ["u1"]
+
+def open_trade_games(games: int, offers_per_player: int = 5):
+    """An engine with many 6-player games and one full round of concurrent offers for them
+
+    Every player owns 4 squares and offers each of them, plus cash, to a
+    different opponent, so all the offers can be accepted together.
+    """
+    engine = MonopolyGameEngine(rng=random.Random(0))
+    purchasable = [square.id for square in BOARD if square.price]
+    offers = []
+    for number in range(games):
+        room_code = f"TRADE{number}"
+        players = [Player(id=f"{room_code}-p{seat}", name=f"Player {seat}", avatar="", color="")
+                   for seat in range(6)]
+        game = engine.create_game(room_code, players, seed=number)
+        for seat, player in enumerate(players):
+            owned = purchasable[seat * 4:(seat + 1) * 4]
+            give(game, player.id, owned)
+            for k in range(offers_per_player):
+                recipient = players[(seat + 1 + k) % len(players)]
+                offers.append((room_code, f"{player.id}-t{k}", player.id, recipient.id,
+                               owned[k:k + 1], [], 100, 0))
+    return engine, offers
+
+@pytest.mark.parametrize("games", [10, 100])
+def test_trade_propose(recorder, games):
+    """Per-offer cost of opening offers must not grow with the number already open"""
+    _, offers = open_trade_games(games)
+
+    def setup():
+        return open_trade_games(games)
+
+    def propose(engine, offers):
+        for offer in offers:
+            engine.propose_trade(*offer)
+        assert len(engine.trades) == len(offers)
+
+    recorder.check(f"trade_propose[{len(offers)}]", measure(propose, setup) / len(offers))
+
+@pytest.mark.parametrize("accept", [True, False])
+def test_trade_respond(recorder, accept):
+    _, offers = open_trade_games(100)
+
+    def setup():
+        engine, offers = open_trade_games(100)
+        for offer in offers:
+            engine.propose_trade(*offer)
+        return engine, offers
+
+    def respond(engine, offers):
+        for room_code, trade_id, _, to_player_id, *_ in offers:
+            engine.respond_trade(room_code, to_player_id, trade_id, accept)
+        assert not engine.trades.offers and not engine.trades.by_sender
+
+    label = "accept" if accept else "reject"
+    recorder.check(f"trade_respond[{len(offers)},{label}]", measure(respond, setup) / len(offers))
+
+def test_trade_expiry(recorder):
+    """One reaper pass over the trade heap closes every overdue offer"""
+    _, offers = open_trade_games(100)
+
+    def setup():
+        engine, offers = open_trade_games(100)
+        reaper = Reaper()
+
+        async def evict(trade_id):
+            trade = engine.trades.get(trade_id)
+            if trade:
+                engine.expire_trade(trade.room_code, trade_id)
+            return True
+
+        reaper.register("trade", 60, evict)
+        for offer in offers:
+            engine.propose_trade(*offer)
+            reaper.touch("trade", offer[1])
+        return engine, reaper
+
+    def expire(engine, reaper):
+        assert asyncio.run(reaper.reap(now=time.monotonic() + 120)) == len(offers)
+        assert not engine.trades.offers
+
+    recorder.check(f"trade_expiry[{len(offers)}]", measure(expire, setup) / len(offers))
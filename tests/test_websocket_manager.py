@@ -0,0 +1,61 @@
+"""Fan-out in ConnectionManager: one encoding per message and bounded sends"""
+import asyncio
+import json
+import time
+
+from websocket_manager import ConnectionManager
+
+class FakeSocket:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.frames = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        await asyncio.sleep(self.delay)
+        self.frames.append(data)
+
+    async def send_bytes(self, data: bytes):
+        await asyncio.sleep(self.delay)
+        self.frames.append(data)
+
+async def connected(manager: ConnectionManager, sockets):
+    for player_id, socket in sockets.items():
+        await manager.connect(socket, "ROOM", player_id)
+
+def test_broadcast_sends_one_frame_to_every_socket_but_the_excluded():
+    manager = ConnectionManager()
+    sockets = {f"p{seat}": FakeSocket() for seat in range(3)}
+
+    async def run():
+        await connected(manager, sockets)
+        await manager.broadcast_to_room({"type": "ping", "n": 1}, "ROOM", exclude_player="p2")
+
+    asyncio.run(run())
+    assert [json.loads(frame) for frame in sockets["p0"].frames] == [{"type": "ping", "n": 1}]
+    # The same encoded frame object goes to every socket
+    assert sockets["p0"].frames[0] is sockets["p1"].frames[0]
+    assert sockets["p2"].frames == []
+
+def test_stalled_sockets_time_out_and_are_dropped():
+    manager = ConnectionManager(send_timeout=0.05)
+    sockets = {"fast": FakeSocket(), "stalled": FakeSocket(delay=1.0)}
+
+    async def run():
+        await connected(manager, sockets)
+        start = time.perf_counter()
+        await manager.broadcast_to_room({"type": "ping"}, "ROOM")
+        await manager.send_personal_message({"type": "pong"}, "fast")
+        broadcast = time.perf_counter() - start
+
+        await manager.connect(sockets["stalled"], "ROOM", "stalled")
+        start = time.perf_counter()
+        await manager.send_personal_message({"type": "error", "message": "nope"}, "stalled")
+        return broadcast, time.perf_counter() - start
+
+    broadcast, personal = asyncio.run(run())
+    assert broadcast < 0.5 and personal < 0.5
+    assert len(sockets["fast"].frames) == 2
+    assert not manager.is_player_connected("stalled")
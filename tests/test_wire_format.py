@@ -0,0 +1,80 @@
+"""Wire formats: negotiation fallback, the compression threshold and frame headers"""
+import json
+import zlib
+from datetime import datetime
+
+import pytest
+
+import wire_format
+from wire_format import (COMPRESS_MIN_BYTES, DEFLATE_HEADER, ENCODINGS, JSON_FORMAT, RAW_HEADER, OutboundFrame,
+                         WireFormat, encode_json, negotiate)
+
+needs_msgpack = pytest.mark.skipif("msgpack" not in ENCODINGS, reason="msgpack is not installed")
+
+def sized(size: int) -> dict:
+    """A message whose JSON encoding is exactly size bytes"""
+    message = {"type": "chat-message", "message": ""}
+    message["message"] = "x" * (size - len(encode_json(message)))
+    return message
+
+@pytest.mark.parametrize("encoding, compression", [
+    (None, None), ("bogus", None), ("JSON", None), (None, "gzip"), ("bogus", "bogus"),
+])
+def test_unknown_choices_fall_back_to_plain_json(encoding, compression):
+    assert negotiate(encoding, compression) is JSON_FORMAT
+
+def test_supported_choices_are_kept():
+    assert negotiate("bogus", "deflate").key == ("json", "deflate")
+    if "msgpack" in ENCODINGS:
+        assert negotiate("msgpack", None).key == ("msgpack", None)
+
+def test_only_frames_at_the_threshold_are_compressed():
+    deflate = WireFormat("json", "deflate")
+    below = deflate.encode(sized(COMPRESS_MIN_BYTES - 1))
+    at = deflate.encode(sized(COMPRESS_MIN_BYTES))
+    # Small JSON frames stay text frames without a header
+    assert isinstance(below, str) and len(below) == COMPRESS_MIN_BYTES - 1
+    assert at[:1] == DEFLATE_HEADER and json.loads(zlib.decompress(at[1:])) == sized(COMPRESS_MIN_BYTES)
+    assert deflate.decode(below) == sized(COMPRESS_MIN_BYTES - 1)
+    assert deflate.decode(at) == sized(COMPRESS_MIN_BYTES)
+
+@needs_msgpack
+def test_binary_frames_carry_a_header_only_with_compression():
+    message = {"type": "player-moved", "new_position": 7}
+    plain, deflate = WireFormat("msgpack"), WireFormat("msgpack", "deflate")
+    assert plain.encode(message)[:1] != RAW_HEADER and plain.decode(plain.encode(message)) == message
+    framed = deflate.encode(message)
+    assert framed[:1] == RAW_HEADER and framed[1:] == plain.encode(message)
+    assert deflate.decode(framed) == message
+    big = sized(2 * COMPRESS_MIN_BYTES)
+    assert deflate.encode(big)[:1] == DEFLATE_HEADER and deflate.decode(deflate.encode(big)) == big
+
+def test_inbound_frames_follow_the_same_rules():
+    deflate = WireFormat("json", "deflate")
+    payload = json.dumps({"type": "roll-dice"}).encode()
+    assert deflate.decode(RAW_HEADER + payload) == {"type": "roll-dice"}
+    assert deflate.decode(DEFLATE_HEADER + zlib.compress(payload)) == {"type": "roll-dice"}
+    with pytest.raises(ValueError, match="Unknown frame header"):
+        deflate.decode(b"\x02" + payload)
+    # Text frames are JSON whatever was negotiated
+    assert WireFormat("msgpack", "deflate").decode('{"type": "roll-dice"}') == {"type": "roll-dice"}
+
+def test_datetimes_are_sent_as_iso_strings():
+    when = datetime(2024, 1, 2, 3, 4, 5)
+    assert json.loads(encode_json({"at": when})) == {"at": "2024-01-02T03:04:05"}
+
+def test_outbound_frames_encode_once_per_format(monkeypatch):
+    message = sized(2 * COMPRESS_MIN_BYTES)
+    frame = OutboundFrame(encode_json(message), message)
+    assert frame.for_format(JSON_FORMAT) is frame.text
+    deflate = WireFormat("json", "deflate")
+    first = frame.for_format(deflate)
+    monkeypatch.setattr(wire_format.zlib, "compress", None)
+    assert frame.for_format(WireFormat("json", "deflate")) is first
+
+def test_an_unknown_encoding_query_gets_json_text_frames():
+    server = pytest.importorskip("server")
+    from fastapi.testclient import TestClient
+    with TestClient(server.app).websocket_connect("/ws/temp/temp-wire?encoding=bogus") as websocket:
+        assert websocket.receive_text() == encode_json(
+            {"type": "wire-format", "encoding": "json", "compression": None})